@@ -1,5 +1,13 @@
 """Jedi Language Server."""
 
-from importlib.metadata import version
+from typing import Any
 
-__version__ = version("jedi-language-server")
+
+def __getattr__(name: str) -> Any:
+    # importlib.metadata is slow to import and the version is only needed by
+    # --version, so it is looked up on first access.
+    if name == "__version__":
+        from importlib.metadata import version
+
+        return version("jedi-language-server")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
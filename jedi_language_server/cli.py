@@ -2,14 +2,17 @@
 
 import argparse
 import logging
+import os
 import sys
 
-from . import __version__
-from .server import SERVER
+from . import instrumentation
+from .profiler import PROFILE_DIR_ENV, SamplingProfiler
 
 
 def get_version() -> str:
     """Get the program version."""
+    from . import __version__
+
     return __version__
 
 
@@ -68,6 +71,19 @@ Notes:
         help="redirect logs to file specified",
         type=str,
     )
+    parser.add_argument(
+        "--stats-interval",
+        help="log request statistics every N seconds",
+        type=float,
+        metavar="N",
+    )
+    parser.add_argument(
+        "--profile-dir",
+        help="write sampled stacks of the server to this directory every"
+        f" minute, in collapsed stack format (default ${PROFILE_DIR_ENV})",
+        type=str,
+        default=os.environ.get(PROFILE_DIR_ENV),
+    )
     parser.add_argument(
         "-v",
         "--verbose",
@@ -85,6 +101,10 @@ Notes:
             file=sys.stderr,
         )
         sys.exit(1)
+    # Importing the server takes most of the startup time, so --version,
+    # --help, and argument errors don't.
+    from .server import SERVER
+
     log_level = {0: logging.WARN, 1: logging.INFO, 2: logging.DEBUG}.get(
         args.verbose,
         logging.DEBUG,
@@ -99,6 +119,14 @@ Notes:
     else:
         logging.basicConfig(stream=sys.stderr, level=log_level)
 
+    if args.stats_interval:
+        # Statistics were asked for, so log them whatever the verbosity
+        logging.getLogger(instrumentation.__name__).setLevel(logging.INFO)
+        SERVER.stats.log_every(args.stats_interval)
+
+    if args.profile_dir:
+        SamplingProfiler(args.profile_dir).start()
+
     if args.tcp:
         SERVER.start_tcp(host=args.host, port=args.port)
     elif args.ws:
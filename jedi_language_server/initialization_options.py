@@ -7,7 +7,7 @@ initialization options.
 import re
 import sys
 from dataclasses import dataclass, field, fields, is_dataclass
-from typing import Any, List, Optional, Pattern, Set
+from typing import Any, List, Literal, Optional, Pattern, Set
 
 from cattrs import Converter
 from cattrs.gen import make_dict_structure_fn, override
@@ -38,6 +38,10 @@ class Diagnostics:
     did_open: bool = True
     did_save: bool = True
     did_change: bool = True
+    workspace: bool = False
+    debounce_min: float = 0.1
+    debounce_max: float = 2.0
+    backend: Literal["compile", "parso"] = "compile"
 
 
 @light_dataclass
@@ -78,8 +82,10 @@ class Hover:
 @light_dataclass
 class JediSettings:
     auto_import_modules: List[str] = field(default_factory=list)
+    cache_directory: Optional[str] = None
     case_insensitive_completion: bool = True
     debug: bool = False
+    preload_modules: List[str] = field(default_factory=list)
 
 
 @light_dataclass
@@ -102,6 +108,28 @@ class SemanticTokens:
     enable: bool = False
 
 
+@light_dataclass
+class SlowRequests:
+    log_file: Optional[str] = None
+    threshold: float = 1.0
+
+
+@light_dataclass
+class TextDocuments:
+    storage: Literal["string", "lines"] = "string"
+
+
+@light_dataclass
+class Memory:
+    soft_limit: Optional[int] = None
+    hard_limit: Optional[int] = None
+
+
+@light_dataclass
+class Workers:
+    count: int = 0
+
+
 @light_dataclass
 class InitializationOptions:
     code_action: CodeAction = field(default_factory=CodeAction)
@@ -109,9 +137,13 @@ class InitializationOptions:
     diagnostics: Diagnostics = field(default_factory=Diagnostics)
     hover: Hover = field(default_factory=Hover)
     jedi_settings: JediSettings = field(default_factory=JediSettings)
+    memory: Memory = field(default_factory=Memory)
     markup_kind_preferred: Optional[MarkupKind] = None
     workspace: Workspace = field(default_factory=Workspace)
     semantic_tokens: SemanticTokens = field(default_factory=SemanticTokens)
+    slow_requests: SlowRequests = field(default_factory=SlowRequests)
+    text_documents: TextDocuments = field(default_factory=TextDocuments)
+    workers: Workers = field(default_factory=Workers)
 
 
 initialization_options_converter = Converter()
@@ -0,0 +1,173 @@
+"""Latency statistics of the language server.
+
+Requests are timed by the protocol when their handlers are executed:
+
+- queue: waiting for a thread of the pool (threaded handlers only)
+- jedi: inside the main Jedi call of the handler, see `jedi_call`
+- conversion: the rest of the handler, mostly converting Jedi's results to
+  LSP types
+- serialization: serializing and writing the response
+- total: from receiving the request to sending the response
+"""
+
+import contextlib
+import logging
+import threading
+import time
+from collections import deque
+from types import FrameType
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+@contextlib.contextmanager
+def jedi_call() -> Iterator[None]:
+    """Count the time spent in the block as time spent in Jedi."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _local.jedi_seconds = (
+            getattr(_local, "jedi_seconds", 0.0) + time.perf_counter() - start
+        )
+
+
+def reset_jedi_seconds() -> None:
+    """Start counting the Jedi time of a handler on this thread."""
+    _local.jedi_seconds = 0.0
+
+
+def jedi_seconds() -> float:
+    """Get the Jedi time counted on this thread since the last reset."""
+    return getattr(_local, "jedi_seconds", 0.0)
+
+
+def collapse_stack(frame: Optional[FrameType]) -> str:
+    """Format the stack of a frame as in collapsed stack files.
+
+    Functions are separated by semicolons, outermost first, which is the
+    format read by flame graph tools.
+    """
+    functions: List[str] = []
+    while frame is not None:
+        code = frame.f_code
+        functions.append(
+            f"{code.co_name} ({code.co_filename}:{frame.f_lineno})"
+        )
+        frame = frame.f_back
+    return ";".join(reversed(functions))
+
+
+class Histogram:
+    """Durations of one kind of event.
+
+    Percentiles are computed from the most recent max_samples durations, so
+    they follow the current behavior of the server.
+    """
+
+    def __init__(self, max_samples: int = 1000) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._samples: Deque[float] = deque(maxlen=max_samples)
+
+    def add(self, seconds: float) -> None:
+        """Record one duration."""
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self._samples.append(seconds)
+
+    def percentile(self, fraction: float) -> float:
+        """Get the duration below which fraction of the samples are."""
+        samples = sorted(self._samples)
+        if not samples:
+            return 0.0
+        return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+    def summary(self) -> Dict[str, float]:
+        """Summarize the durations, in milliseconds."""
+        return {
+            "count": self.count,
+            "mean": 1000 * self.total / self.count if self.count else 0.0,
+            "p50": 1000 * self.percentile(0.5),
+            "p95": 1000 * self.percentile(0.95),
+            "p99": 1000 * self.percentile(0.99),
+            "max": 1000 * self.max,
+        }
+
+
+class CacheStats:
+    """Hits and misses of a cache."""
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit: bool) -> None:
+        """Record one lookup."""
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def summary(self) -> Dict[str, float]:
+        """Summarize the lookups."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class Stats:
+    """Latency histograms per LSP method and cache statistics."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[str, Histogram]] = {}
+        self._caches: Dict[str, CacheStats] = {}
+        self._log_timer: Optional[threading.Timer] = None
+
+    def record(self, method: str, kind: str, seconds: float) -> None:
+        """Record a duration of a kind for an LSP method."""
+        with self._lock:
+            histograms = self._histograms.setdefault(method, {})
+            histograms.setdefault(kind, Histogram()).add(seconds)
+
+    def cache(self, name: str) -> CacheStats:
+        """Get the statistics of the cache called name."""
+        with self._lock:
+            return self._caches.setdefault(name, CacheStats())
+
+    def summary(self) -> Dict[str, Any]:
+        """Summarize all statistics, durations in milliseconds."""
+        with self._lock:
+            return {
+                "requests": {
+                    method: {
+                        kind: histogram.summary()
+                        for kind, histogram in sorted(histograms.items())
+                    }
+                    for method, histograms in sorted(self._histograms.items())
+                },
+                "caches": {
+                    name: cache.summary()
+                    for name, cache in sorted(self._caches.items())
+                },
+            }
+
+    def log_every(self, interval_s: float) -> None:
+        """Log the summary every interval_s seconds at info level."""
+
+        def log() -> None:
+            logger.info("Statistics: %s", self.summary())
+            self.log_every(interval_s)
+
+        self._log_timer = threading.Timer(interval_s, log)
+        self._log_timer.daemon = True
+        self._log_timer.start()
@@ -5,13 +5,25 @@ Translates pygls types back and forth with Jedi
 
 import functools
 import inspect
+import itertools
+import os
 import sys
 import threading
 from ast import PyCF_ONLY_AST
+from bisect import bisect_left
 from inspect import Parameter
-from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
-import docstring_to_markdown
 import jedi.api.errors
 import jedi.settings
 from jedi import Project, Script
@@ -23,6 +35,9 @@ from jedi.api.classes import (
     ParamName,
     Signature,
 )
+from jedi.api.environment import Environment, get_cached_default_environment
+from jedi.api.refactoring import RefactoringError
+from jedi.api.refactoring.extract import _find_nodes, _is_expression_with_error
 from lsprotocol.types import (
     CompletionItem,
     CompletionItemKind,
@@ -34,14 +49,19 @@ from lsprotocol.types import (
     MarkupContent,
     MarkupKind,
     Position,
+    PositionEncodingKind,
     Range,
     SymbolInformation,
     SymbolKind,
 )
+from parso import split_lines
+from parso.python.tree import Name as TreeName
+from parso.tree import BaseNode, search_ancestor
 from pygls.workspace import TextDocument
 
 from .constants import MAX_CONCURRENT_DEBOUNCE_CALLS
 from .initialization_options import HoverDisableOptions, InitializationOptions
+from .projects import Projects
 from .type_map import get_lsp_completion_type, get_lsp_symbol_type
 
 if sys.version_info < (3, 10):
@@ -57,10 +77,14 @@ _debounce_semaphore = threading.Semaphore(MAX_CONCURRENT_DEBOUNCE_CALLS)
 
 
 def debounce(
-    interval_s: float, keyed_by: Optional[str] = None
+    interval_s: Union[float, Callable[P, float]],
+    keyed_by: Optional[str] = None,
 ) -> Callable[[Callable[P, None]], Callable[P, None]]:
     """Debounce calls to this function until interval_s seconds have passed.
 
+    interval_s may also be a function, which is called with the arguments of
+    each call to get its interval.
+
     Decorator adapted from https://github.com/python-lsp/python-lsp-server
     """
 
@@ -75,6 +99,11 @@ def debounce(
             sig = inspect.signature(func)
             call_args = sig.bind(*args, **kwargs)
             key = call_args.arguments[keyed_by] if keyed_by else None
+            interval = (
+                interval_s(*args, **kwargs)
+                if callable(interval_s)
+                else interval_s
+            )
 
             def run() -> None:
                 try:
@@ -89,7 +118,7 @@ def debounce(
                 if old_timer:
                     old_timer.cancel()
                     _debounce_semaphore.release()
-                timer = threading.Timer(interval_s, run)
+                timer = threading.Timer(interval, run)
                 timers[key] = timer
                 timer.start()
 
@@ -125,14 +154,117 @@ def set_jedi_settings(
     )
     if initialization_options.jedi_settings.debug:
         jedi.set_debug_function(func_cb=_jedi_debug_function)
+    # Jedi pickles the parse trees of imported modules there, see parso.cache
+    cache_directory = initialization_options.jedi_settings.cache_directory
+    if cache_directory is not None:
+        jedi.settings.cache_directory = os.path.expanduser(cache_directory)
+
+
+@functools.lru_cache(maxsize=4096)
+def _utf16_offsets(line: str) -> Tuple[int, ...]:
+    """Get the UTF-16 offset of each code point of a line and of its end."""
+    return tuple(
+        itertools.accumulate(
+            (2 if ord(char) > 0xFFFF else 1 for char in line), initial=0
+        )
+    )
+
+
+def lsp_character(line: str, column: int, encoding: str) -> int:
+    """Convert Jedi's column in a line to an LSP character.
+
+    encoding is the position encoding negotiated with the client. Columns
+    only differ from UTF-16 characters after characters outside of the
+    Basic Multilingual Plane, so ASCII lines are never converted, nor any
+    line in UTF-32. The offsets of other lines are cached.
+    """
+    if encoding == PositionEncodingKind.Utf32 or line.isascii():
+        return column
+    offsets = _utf16_offsets(line)
+    if column >= len(line):
+        return offsets[-1] + column - len(line)
+    return offsets[column]
+
+
+def jedi_column(line: str, character: int, encoding: str) -> int:
+    """Convert an LSP character in a line to Jedi's column.
+
+    The inverse of `lsp_character`. A character in the middle of a
+    surrogate pair is rounded to the end of its code point.
+    """
+    if encoding == PositionEncodingKind.Utf32 or line.isascii():
+        return character
+    offsets = _utf16_offsets(line)
+    if character >= offsets[-1]:
+        return len(line) + character - offsets[-1]
+    return bisect_left(offsets, character)
+
+
+def _line(lines: Sequence[str], line: int) -> str:
+    """Get a 0-based line, or an empty string if it doesn't exist."""
+    return lines[line] if 0 <= line < len(lines) else ""
+
+
+def _lsp_position(
+    lines: Sequence[str], line: int, column: int, encoding: str
+) -> Position:
+    """Convert Jedi's line and column in lines to an LSP position."""
+    return Position(
+        line=line - 1,
+        character=lsp_character(_line(lines, line - 1), column, encoding),
+    )
+
+
+def script_lines(script_: Script) -> Sequence[str]:
+    """Get the lines of the code of a Jedi Script.
+
+    Split like Jedi numbers them, see `parso.split_lines`.
+    """
+    return script_._code_lines
+
+
+def script(projects: Projects, document: TextDocument) -> Script:
+    """Simplifies getting jedi Script, in the project of the document."""
+    return Script(
+        code=document.source,
+        path=document.path,
+        project=projects.get(document.path),
+    )
+
+
+def warm_environment(project: Optional[Project]) -> Environment:
+    """Find the Python environment of a project and start its interpreter.
+
+    Jedi otherwise does both on the first request, which then waits for the
+    interpreter to start.
+    """
+    environment = (
+        get_cached_default_environment()
+        if project is None
+        else project.get_environment()
+    )
+    environment.get_sys_path()
+    return environment
+
 
+def warm_module(project: Optional[Project], name: str) -> bool:
+    """Load a module and its attributes into Jedi's caches.
 
-def script(project: Optional[Project], document: TextDocument) -> Script:
-    """Simplifies getting jedi Script."""
-    return Script(code=document.source, path=document.path, project=project)
+    name is a dotted module name, like os.path. Returns whether the module
+    was found.
+    """
+    if not all(part.isidentifier() for part in name.split(".")):
+        return False
+    jedi_script = Script(f"import {name}\n{name}.", project=project)
+    if not jedi_script.infer(1, len(f"import {name}")):
+        return False
+    jedi_script.complete(2, len(name) + 1)
+    return True
 
 
-def lsp_range(name: Name) -> Optional[Range]:
+def lsp_range(
+    name: Name, encoding: str, lines: Optional[Sequence[str]] = None
+) -> Optional[Range]:
     """Get LSP range from Jedi definition.
 
     - jedi is 1-indexed for lines and 0-indexed for columns
@@ -142,20 +274,36 @@ def lsp_range(name: Name) -> Optional[Range]:
     Not all jedi Names have their location defined.  Module attributes
     (e.g. __name__ or __file__) have a Name that represents their
     implicit definition, and that Name does not have a location.
+
+    lines, the `script_lines` of the module of the name if given, spare
+    looking up the line of the name to convert its columns to encoding.
     """
     if name.line is None or name.column is None:
         return None
 
+    if encoding == PositionEncodingKind.Utf32:
+        line = ""
+    elif lines is None:
+        line = name.get_line_code()
+    else:
+        line = _line(lines, name.line - 1)
     return Range(
-        start=Position(line=name.line - 1, character=name.column),
+        start=Position(
+            line=name.line - 1,
+            character=lsp_character(line, name.column, encoding),
+        ),
         end=Position(
             line=name.line - 1,
-            character=name.column + len(name.name),
+            character=lsp_character(
+                line, name.column + len(name.name), encoding
+            ),
         ),
     )
 
 
-def lsp_location(name: Name, uri: Optional[str] = None) -> Optional[Location]:
+def lsp_location(
+    name: Name, encoding: str, uri: Optional[str] = None
+) -> Optional[Location]:
     """Get LSP location from Jedi definition."""
     if uri is None:
         module_path = name.module_path
@@ -163,7 +311,7 @@ def lsp_location(name: Name, uri: Optional[str] = None) -> Optional[Location]:
             return None
         uri = module_path.as_uri()
 
-    lsp = lsp_range(name)
+    lsp = lsp_range(name, encoding)
     if lsp is None:
         return None
 
@@ -171,10 +319,10 @@ def lsp_location(name: Name, uri: Optional[str] = None) -> Optional[Location]:
 
 
 def lsp_symbol_information(
-    name: Name, uri: Optional[str] = None
+    name: Name, encoding: str, uri: Optional[str] = None
 ) -> Optional[SymbolInformation]:
     """Get LSP SymbolInformation from Jedi definition."""
-    location = lsp_location(name, uri)
+    location = lsp_location(name, encoding, uri)
     if location is None:
         return None
 
@@ -188,124 +336,203 @@ def lsp_symbol_information(
     )
 
 
-def _document_symbol_range(name: Name) -> Optional[Range]:
+def _document_symbol_range(
+    name: Name,
+    tree_name: TreeName,
+    definition: Optional[BaseNode],
+    lines: Sequence[str],
+    encoding: str,
+) -> Range:
     """Get accurate full range of function.
 
     Thanks <https://github.com/CXuesong> from
     <https://github.com/palantir/python-language-server/pull/537/files> for the
     inspiration!
 
-    Note: I add tons of extra space to make dictionary completions work. Jedi
-    cuts off the end sometimes before the final function statement. This may be
-    the cause of bugs at some point.
+    Computed from the parse tree like `Name.get_definition_start_position`
+    and `Name.get_definition_end_position`, but without looking up the
+    definition twice.
     """
-    start = name.get_definition_start_position()
-    end = name.get_definition_end_position()
-    if start is None or end is None:
-        return lsp_range(name)
-    (start_line, start_column) = start
-    (end_line, end_column) = end
+    if definition is None:
+        start = tree_name.start_pos
+        end = tree_name.end_pos
+    else:
+        start = definition.start_pos
+        end = definition.end_pos
+        if name.type in ("function", "class"):
+            last_leaf = definition.get_last_leaf()
+            if last_leaf.type == "newline":
+                last_leaf = last_leaf.get_previous_leaf()
+            end = last_leaf.end_pos
     return Range(
-        start=Position(line=start_line - 1, character=start_column),
-        end=Position(line=end_line - 1, character=end_column),
+        start=_lsp_position(lines, *start, encoding),
+        end=_lsp_position(lines, *end, encoding),
     )
 
 
-def lsp_document_symbols(names: List[Name]) -> List[DocumentSymbol]:
+_DOCUMENT_SYMBOL_SCOPES = ("funcdef", "classdef", "file_input")
+
+_SCOPE_TYPES = {
+    "funcdef": "function",
+    "lambdef": "function",
+    "classdef": "class",
+    "file_input": "module",
+}
+
+_COMPREHENSIONS = ("comp_for", "sync_comp_for")
+
+
+def _document_symbol_parent(
+    name_type: str, tree_name: TreeName, definition: Optional[BaseNode]
+) -> BaseNode:
+    """Get the parso node of the scope returned by `Name.parent`.
+
+    Avoids `Name.parent`, which creates Jedi values and contexts for every
+    name just to find out the enclosing function, class, or module.
+
+    NOTE: this follows how Jedi assigns names to scopes, in `Name.parent`
+    and `ModuleContext.create_context`. Functions, classes and parameters
+    belong to the scope around their definition. Other names belong to the
+    innermost function, lambda, class or module around them. Names before
+    the colon of a function or class, like decorators, defaults and base
+    classes, belong to the scope around it, unless they are in a
+    comprehension. Comprehensions are scopes too, but unnamed, so names in
+    them belong to the scope around the comprehension. Check this function
+    when upgrading Jedi.
+    """
+    if name_type in ("function", "class", "param"):
+        parent = search_ancestor(
+            definition or tree_name, *_DOCUMENT_SYMBOL_SCOPES
+        )
+        assert parent is not None
+        return parent
+    scope = search_ancestor(tree_name, *_SCOPE_TYPES, *_COMPREHENSIONS)
+    assert scope is not None
+    if scope.type in _COMPREHENSIONS:
+        scope = search_ancestor(scope, *_SCOPE_TYPES)
+        assert scope is not None
+    elif scope.type in ("funcdef", "classdef"):
+        colon = next(
+            child
+            for child in scope.children
+            if child.type == "operator" and child.value == ":"
+        )
+        if tree_name.start_pos < colon.start_pos:
+            parent = tree_name.parent
+            if not (parent.type == "param" and parent.name == tree_name):
+                scope = search_ancestor(scope, *_SCOPE_TYPES)
+                assert scope is not None
+    return scope
+
+
+def lsp_document_symbols(
+    names: List[Name], lines: Sequence[str], encoding: str
+) -> List[DocumentSymbol]:
     """Get hierarchical symbols.
 
     We do some cleaning here. Names from scopes that aren't directly
     accessible with dot notation are removed from display. See comments
     inline for cleaning steps.
+
+    Parents and ranges are read from the names' parse tree nodes, and
+    children are appended in place, so the tree is built in linear time.
+    lines are the `script_lines` of the module of the names.
     """
-    _name_lookup: Dict[Name, DocumentSymbol] = {}
+    _scope_lookup: Dict[BaseNode, DocumentSymbol] = {}
     results: List[DocumentSymbol] = []
     for name in names:
-        symbol_range = _document_symbol_range(name)
-        if symbol_range is None:
+        tree_name = name._name.tree_name
+        if tree_name is None:
             continue
-
-        selection_range = lsp_range(name)
-        if selection_range is None:
-            continue
-
+        definition = tree_name.get_definition()
+        name_type = name.type
+        selection_range = Range(
+            start=_lsp_position(lines, *tree_name.start_pos, encoding),
+            end=_lsp_position(lines, *tree_name.end_pos, encoding),
+        )
         symbol = DocumentSymbol(
             name=name.name,
-            kind=get_lsp_symbol_type(name.type),
-            range=symbol_range,
+            kind=get_lsp_symbol_type(name_type),
+            range=_document_symbol_range(
+                name, tree_name, definition, lines, encoding
+            ),
             selection_range=selection_range,
             detail=name.description,
             children=[],
         )
-        parent = name.parent()
-        if parent.type == "module":
+        parent = _document_symbol_parent(name_type, tree_name, definition)
+        parent_type = _SCOPE_TYPES[parent.type]
+        if parent_type == "module":
             # add module-level variables to list
             results.append(symbol)
 
-        if name.type in ["class", "function"]:
+        if name_type in ["class", "function"] and definition is not None:
             # if they're a class, they can also be a namespace
-            _name_lookup[name] = symbol
+            _scope_lookup[definition] = symbol
 
         if (
-            parent.type == "class"
-            and name.type == "function"
+            parent_type == "class"
+            and name_type == "function"
             and name.name in {"__init__"}
         ):
             # special case for __init__ method in class; names defined here
             symbol.kind = SymbolKind.Method
-            parent_symbol = _name_lookup[parent]
+            parent_symbol = _scope_lookup[parent]
             assert parent_symbol.children is not None
-            parent_symbol.children = [*parent_symbol.children, symbol]
-            _name_lookup[name] = symbol
-        elif parent not in _name_lookup:
+            parent_symbol.children.append(symbol)
+        elif parent not in _scope_lookup:
             # unqualified names are not included in the tree
             continue
         elif (
             name.is_side_effect()
-            and parent.name == "__init__"
+            and parent.name.value == "__init__"
             and name.get_line_code().strip().startswith("self.")
         ):
             # handle attribute creation on __init__ method
             symbol.kind = SymbolKind.Property
-            grandparent_symbol = _name_lookup.get(parent.parent())
+            grandparent_symbol = _scope_lookup.get(
+                search_ancestor(parent, *_DOCUMENT_SYMBOL_SCOPES)
+            )
             if grandparent_symbol is not None and (
                 grandparent_symbol.kind == SymbolKind.Class
             ):
                 assert grandparent_symbol.children is not None
-                grandparent_symbol.children = [
-                    *grandparent_symbol.children,
-                    symbol,
-                ]
-        elif parent.type == "class":
+                grandparent_symbol.children.append(symbol)
+        elif parent_type == "class":
             # children are added for class scopes
-            if name.type == "function":
+            if name_type == "function":
                 # No way to identify @property decorated items. That said, as
                 # far as code is concerned, @property-decorated items should be
                 # considered "methods" since do more than just assign a value.
                 symbol.kind = SymbolKind.Method
-            elif name.type != "class":
+            elif name_type != "class":
                 symbol.kind = SymbolKind.Property
-            parent_symbol = _name_lookup[parent]
+            parent_symbol = _scope_lookup[parent]
             assert parent_symbol.children is not None
-            parent_symbol.children = [*parent_symbol.children, symbol]
-        elif parent.type == "function":
+            parent_symbol.children.append(symbol)
+        elif parent_type == "function":
             # only show nested classes and functions to avoid excessive info
             # could be controlled by an initialization option
-            if name.type in ["class", "function"]:
-                parent_symbol = _name_lookup[parent]
+            if name_type in ["class", "function"]:
+                parent_symbol = _scope_lookup[parent]
                 assert parent_symbol.children is not None
-                parent_symbol.children = [*parent_symbol.children, symbol]
+                parent_symbol.children.append(symbol)
 
     return results
 
 
-def lsp_diagnostic(error: jedi.api.errors.SyntaxError) -> Diagnostic:
-    """Get LSP Diagnostic from Jedi SyntaxError."""
+def lsp_diagnostic(
+    error: jedi.api.errors.SyntaxError, lines: Sequence[str], encoding: str
+) -> Diagnostic:
+    """Get LSP Diagnostic from Jedi SyntaxError.
+
+    lines are the `script_lines` of the Script with the error.
+    """
     return Diagnostic(
         range=Range(
-            start=Position(line=error.line - 1, character=error.column),
-            end=Position(
-                line=error.until_line - 1, character=error.until_column
+            start=_lsp_position(lines, error.line, error.column, encoding),
+            end=_lsp_position(
+                lines, error.until_line, error.until_column, encoding
             ),
         ),
         message=error.get_message(),
@@ -314,7 +541,22 @@ def lsp_diagnostic(error: jedi.api.errors.SyntaxError) -> Diagnostic:
     )
 
 
-def lsp_python_diagnostic(uri: str, source: str) -> Optional[Diagnostic]:
+def lsp_diagnostics(script_: Script, encoding: str) -> List[Diagnostic]:
+    """Get LSP Diagnostics for all syntax errors of a Jedi Script.
+
+    Parso recovers from errors, so unlike compile this finds every syntax
+    error in one pass. The parse tree is shared with Jedi's other requests.
+    """
+    lines = script_lines(script_)
+    return [
+        lsp_diagnostic(error, lines, encoding)
+        for error in script_.get_syntax_errors()
+    ]
+
+
+def lsp_python_diagnostic(
+    uri: str, source: str, encoding: str
+) -> Optional[Diagnostic]:
     """Get LSP Diagnostic using the compile builtin."""
     try:
         compile(source, uri, "exec", PyCF_ONLY_AST)
@@ -333,10 +575,13 @@ def lsp_python_diagnostic(uri: str, source: str) -> Optional[Diagnostic]:
         if (line, column) >= (until_line, until_column):
             until_column, until_line = column, line
             column = 0
+        lines = split_lines(source)
         return Diagnostic(
             range=Range(
-                start=Position(line=line, character=column),
-                end=Position(line=until_line, character=until_column),
+                start=_lsp_position(lines, line + 1, column, encoding),
+                end=_lsp_position(
+                    lines, until_line + 1, until_column, encoding
+                ),
             ),
             message=err.__class__.__name__ + ": " + str(err),
             severity=DiagnosticSeverity.Error,
@@ -344,7 +589,7 @@ def lsp_python_diagnostic(uri: str, source: str) -> Optional[Diagnostic]:
         )
 
 
-def line_column(position: Position) -> Tuple[int, int]:
+def line_column(position: Position, document: TextDocument) -> Tuple[int, int]:
     """Translate pygls Position to Jedi's line/column.
 
     Returns a tuple because this return result should be unpacked as a function
@@ -364,11 +609,25 @@ def line_column(position: Position) -> Tuple[int, int]:
     Sources:
     https://microsoft.github.io/language-server-protocol/specification#position
     https://github.com/palantir/python-language-server/pull/201/files
+
+    The character is converted to a column of the line in the document, see
+    `jedi_column`.
     """
-    return (position.line + 1, position.character)
+    encoding = document.position_codec.encoding
+    line = (
+        ""
+        if encoding == PositionEncodingKind.Utf32
+        else _line(document.lines, position.line)
+    )
+    return (
+        position.line + 1,
+        jedi_column(line, position.character, encoding),
+    )
 
 
-def line_column_range(pygls_range: Range) -> Dict[str, int]:
+def line_column_range(
+    pygls_range: Range, document: TextDocument
+) -> Dict[str, int]:
     """Translate pygls range to Jedi's line/column/until_line/until_column.
 
     Returns a dictionary because this return result should be unpacked
@@ -378,11 +637,13 @@ def line_column_range(pygls_range: Range) -> Dict[str, int]:
     0-indexed for lines and 0-indexed for columns. Therefore, add 1 to
     LSP's request for the line.
     """
+    line, column = line_column(pygls_range.start, document)
+    until_line, until_column = line_column(pygls_range.end, document)
     return {
-        "line": pygls_range.start.line + 1,
-        "column": pygls_range.start.character,
-        "until_line": pygls_range.end.line + 1,
-        "until_column": pygls_range.end.character,
+        "line": line,
+        "column": column,
+        "until_line": until_line,
+        "until_column": until_column,
     }
 
 
@@ -487,6 +748,117 @@ def is_import(script_: Script, line: int, column: int) -> bool:
     return name_is_import
 
 
+def _is_inline_definition(tree_name: TreeName) -> bool:
+    """Check that a name is defined by a plain assignment of it alone."""
+    if not tree_name.is_definition():
+        return False
+    definition = tree_name.get_definition()
+    if definition is None or definition.type != "expr_stmt":
+        return False
+    if len(definition.get_defined_names(include_setitem=True)) > 1:
+        return False
+    operator = definition.children[1]
+    if operator.type == "annassign" and len(operator.children) == 4:
+        operator = operator.children[2]
+    return operator == "="
+
+
+def is_inline_candidate(script_: Script, line: int, column: int) -> bool:
+    """Cheaply check whether `Script.inline` may apply at a position.
+
+    `line` and `column` are Jedi lines and columns. Jedi only inlines names
+    defined by a plain assignment, `x = ...`. Without inference, the name
+    under the cursor must be such an assignment, or a reference to a name
+    assigned like that in the same module. This is a purely syntactic
+    check: a `True` result does not guarantee that the inline refactoring
+    succeeds, and names only assigned in other modules are not offered.
+
+    NOTE: like `is_import`, this relies on Jedi internals, and the checks
+    mirror the first ones of `jedi.api.refactoring.inline`.
+    """
+    module_node = script_._module_node
+    tree_name = module_node.get_name_of_position((line, column))
+    if tree_name is None:
+        return False
+    if tree_name.is_definition():
+        return _is_inline_definition(tree_name)
+    return any(
+        _is_inline_definition(name)
+        for name in module_node.get_used_names().get(tree_name.value, ())
+    )
+
+
+def _in_blank_space(
+    module_node: BaseNode, pos: Tuple[int, int], until_pos: Tuple[int, int]
+) -> bool:
+    """Check whether a range only covers indentation, comments, blank lines.
+
+    Positions between the leaves of a line, like around operators, are not
+    blank space: Jedi extracts the expression around them.
+    """
+    leaf = module_node.get_leaf_for_position(pos, include_prefixes=True)
+    if leaf is not None and leaf.type == "newline" and leaf.end_pos == pos:
+        # The start of a line, parso returns the line break before it
+        leaf = leaf.get_next_leaf()
+    if pos != until_pos:
+        while leaf is not None and leaf.type == "newline":
+            leaf = leaf.get_next_leaf()
+        return (
+            leaf is None
+            or leaf.type == "endmarker"
+            or (leaf.start_pos >= until_pos)
+        )
+    if leaf is None or leaf.type in ("newline", "endmarker"):
+        return True
+    if leaf.start_pos <= pos:
+        return False
+    previous = leaf.get_previous_leaf()
+    return (
+        previous is None
+        or previous.type == "newline"
+        or previous.end_pos[0] < pos[0]
+    )
+
+
+def is_extract_candidate(
+    script_: Script,
+    line: int,
+    column: int,
+    until_line: int,
+    until_column: int,
+    statements: bool = False,
+) -> bool:
+    """Cheaply check whether the extract refactorings may apply to a range.
+
+    Arguments are Jedi lines and columns, as returned by
+    `line_column_range`. The range must select an expression, which is
+    what `extract_variable` extracts; with statements, a non-empty range
+    may also select whole statements, which `extract_function` extracts
+    too. Ranges in blank space or comments never select anything.
+
+    NOTE: this calls the syntactic part of Jedi's extract refactorings,
+    which is private to Jedi, so that both agree on what gets extracted.
+    It doesn't infer anything, so the refactoring itself may still fail.
+    """
+    module_node = script_._module_node
+    pos, until_pos = (line, column), (until_line, until_column)
+    if _in_blank_space(module_node, pos, until_pos):
+        return False
+    try:
+        nodes = _find_nodes(module_node, pos, until_pos)
+    except (RefactoringError, AttributeError, IndexError, ValueError):
+        return False
+    if not nodes:
+        return False
+    if _is_expression_with_error(nodes)[0]:
+        return True
+    return (
+        statements
+        and pos != until_pos
+        and all(node.parent.type in ("suite", "file_input") for node in nodes)
+    )
+
+
 _LSP_TYPE_FOR_SNIPPET = {
     CompletionItemKind.Class,
     CompletionItemKind.Function,
@@ -591,6 +963,10 @@ def convert_docstring(docstring: str, markup_kind: MarkupKind) -> str:
     if docstring_stripped == "":
         return docstring_stripped
     if markup_kind == MarkupKind.Markdown:
+        # Imported on first use, it is slow to import and plain text clients
+        # never need it.
+        import docstring_to_markdown
+
         try:
             return docstring_to_markdown.convert(docstring_stripped).strip()
         except docstring_to_markdown.UnknownFormatError:
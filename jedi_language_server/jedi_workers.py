@@ -0,0 +1,381 @@
+"""Jedi requests in worker processes.
+
+With `workers.count` set, the Jedi requests of documents run in worker
+processes instead of the server process, so heavy requests run in parallel
+rather than compete for the server's interpreter. Requests on a document
+always go to the same worker, whose Jedi caches are then warm for it. A
+worker keeps the text of the open documents it was sent, so a document is
+only sent again once it changed.
+
+Workers evict their Jedi caches past the soft memory limit, like the
+server. A worker past the hard memory limit is replaced by a new one, which
+is warmed up with the open documents it serves.
+"""
+
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import BrokenExecutor, Executor, Future
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from jedi import Project, Script
+from pygls.workspace import TextDocument
+
+from . import jedi_utils, memory
+from .initialization_options import InitializationOptions
+from .projects import Projects
+
+T = TypeVar("T")
+
+
+def _watch_parent(parent_pid: int) -> None:
+    """Exit the worker process once the server process is gone."""
+    while os.getppid() == parent_pid:
+        time.sleep(1)
+    os._exit(1)
+
+
+def init_worker(parent_pid: int) -> None:
+    """Prepare a worker process.
+
+    The worker must not hold on to the server's stdin and stdout: they carry
+    the language server protocol, and the client waits for them to close
+    when the server exits. If the server is killed before it can stop the
+    workers, they exit on their own.
+    """
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    os.close(devnull)
+    threading.Thread(
+        target=_watch_parent, args=(parent_pid,), daemon=True
+    ).start()
+
+
+# The state of a Jedi worker process. Documents are (path, source) by uri.
+_projects: Optional[Projects] = None
+_documents: Dict[str, Tuple[str, str]] = {}
+_memory_limit: Optional[memory.MemoryLimit] = None
+
+
+def _init_jedi_worker(
+    parent_pid: int,
+    initialization_options: InitializationOptions,
+    projects: Projects,
+) -> None:
+    """Prepare a Jedi worker process with the settings of the server."""
+    global _projects, _memory_limit
+    init_worker(parent_pid)
+    jedi_utils.set_jedi_settings(initialization_options)
+    _projects = projects
+    soft_limit = initialization_options.memory.soft_limit
+    if soft_limit is not None:
+        _memory_limit = memory.MemoryLimit(soft_limit * memory.MEGABYTE)
+
+
+def _project(path: Optional[str]) -> Optional[Project]:
+    """Get the Jedi project of a path in a worker process."""
+    return None if _projects is None else _projects.get(path)
+
+
+def _run_script(
+    uri: str,
+    path: str,
+    version: Optional[int],
+    source: Optional[str],
+    function: Callable[..., T],
+    args: Tuple[Any, ...],
+) -> Tuple[T, Optional[int]]:
+    """Call function with a Jedi Script of a document, in a worker process.
+
+    The source is None if the worker already has this version of the
+    document. Documents without a version are not kept. Also returns the
+    resident set size of the worker afterwards.
+    """
+    if source is None:
+        _, source = _documents[uri]
+    elif version is not None:
+        _documents[uri] = (path, source)
+    result = function(
+        Script(code=source, path=path, project=_project(path)), *args
+    )
+    if _memory_limit is not None:
+        _memory_limit.check(lambda: [path for path, _ in _documents.values()])
+    return result, memory.rss()
+
+
+def _warm(jedi_script: Script) -> None:
+    """Load the modules imported by a document into Jedi's caches."""
+    for name in jedi_script.get_names():
+        if name.type == "module":
+            name.infer()
+
+
+def warm_modules(names: List[str]) -> None:
+    """Load modules into the Jedi caches of a worker process."""
+    for name in names:
+        jedi_utils.warm_module(_project(None), name)
+
+
+def prepare(names: List[str]) -> None:
+    """Start the Python environment and preload modules in a worker."""
+    jedi_utils.warm_environment(_project(None))
+    warm_modules(names)
+
+
+def _set_folders(folders: List[str]) -> None:
+    """Change the workspace folders of a worker process."""
+    if _projects is not None:
+        _projects.set_folders(folders)
+
+
+def _forget(uri: str) -> None:
+    """Drop a closed document from a worker process."""
+    _documents.pop(uri, None)
+
+
+class JediWorkers:
+    """Run Jedi requests in worker processes, each serving some documents.
+
+    Workers are started on their first request. A worker that crashed is
+    replaced on the next request; the requests it was running raise.
+    documents gets
+    the open documents, to warm up the workers that replace those past the
+    hard memory limit.
+    """
+
+    def __init__(
+        self,
+        count: int,
+        initialization_options: InitializationOptions,
+        projects: Projects,
+        documents: Callable[[], Iterable[TextDocument]] = tuple,
+    ) -> None:
+        hard_limit = initialization_options.memory.hard_limit
+        self._hard_limit = (
+            None if hard_limit is None else hard_limit * memory.MEGABYTE
+        )
+        self._documents = documents
+        self.recycled = 0
+        self._initargs = (
+            os.getpid(),
+            initialization_options,
+            projects,
+        )
+        self._executors: List[Optional[Executor]] = [None] * count
+        # The version of each document that each worker has
+        self._versions: List[Dict[str, int]] = [{} for _ in range(count)]
+        self._lock = threading.Lock()
+
+    def _index(self, uri: str) -> int:
+        """Get the worker of a document, the same in every session."""
+        return zlib.crc32(uri.encode()) % len(self._executors)
+
+    def _get_executor(self, index: int) -> Executor:
+        # Must be called with the lock held. multiprocessing is only
+        # imported once a worker is needed.
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        executor = self._executors[index]
+        if executor is None:
+            # Forking would copy the server's threads and the locks they
+            # hold, which can deadlock the workers.
+            executor = ProcessPoolExecutor(
+                1,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_jedi_worker,
+                initargs=self._initargs,
+            )
+            self._executors[index] = executor
+        return executor
+
+    def _discard(self, index: int, executor: Executor) -> None:
+        # Must be called with the lock held. The next request starts a new
+        # worker, which has no documents yet.
+        if self._executors[index] is executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+            self._executors[index] = None
+            self._versions[index].clear()
+
+    def _result(
+        self, index: int, executor: Executor, future: "Future[T]"
+    ) -> T:
+        """Wait for the result of a worker, replacing it if it crashed."""
+        try:
+            return future.result()
+        except BrokenExecutor:
+            with self._lock:
+                self._discard(index, executor)
+            raise
+
+    def _submit_to(
+        self, index: int, submit: Callable[[Executor], "Future[T]"]
+    ) -> Tuple[Executor, "Future[T]"]:
+        """Submit a call to a worker, replacing it if it crashed while idle.
+
+        Must be called with the lock held. submit is called with the
+        executor of the worker, and again with a new one if it is broken.
+        """
+        executor = self._get_executor(index)
+        try:
+            return executor, submit(executor)
+        except BrokenExecutor:
+            self._discard(index, executor)
+        executor = self._get_executor(index)
+        return executor, submit(executor)
+
+    def _submit(
+        self,
+        index: int,
+        document: TextDocument,
+        function: Callable[..., T],
+        args: Tuple[Any, ...],
+    ) -> Tuple[Executor, "Future[Tuple[T, Optional[int]]]"]:
+        # Must be called with the lock held, so that the worker receives the
+        # source of a document before any request relying on it.
+        uri = document.uri
+        version = document.version
+        versions = self._versions[index]
+
+        def submit(executor: Executor) -> "Future[Tuple[T, Optional[int]]]":
+            # A new worker doesn't have the document yet
+            cached = version is not None and versions.get(uri) == version
+            future = executor.submit(
+                _run_script,
+                uri,
+                document.path,
+                version,
+                None if cached else document.source,
+                function,
+                args,
+            )
+            if version is not None:
+                versions[uri] = version
+            return future
+
+        return self._submit_to(index, submit)
+
+    def _recycle(self, index: int, executor: Executor) -> None:
+        """Replace a worker by a new one, warmed up with its documents."""
+        with self._lock:
+            if self._executors[index] is not executor:
+                return
+            # Requests already sent to the old worker are still answered
+            executor.shutdown(wait=False)
+            self._executors[index] = None
+            self._versions[index].clear()
+            self.recycled += 1
+            for document in self._documents():
+                if self._index(document.uri) == index:
+                    self._submit(index, document, _warm, ())
+
+    def run(
+        self, document: TextDocument, function: Callable[..., T], *args: Any
+    ) -> T:
+        """Call function with a Jedi Script of the document and args.
+
+        Runs in the worker of the document. function must be defined at the
+        top level of a module, and its arguments and result must be
+        picklable.
+        """
+        index = self._index(document.uri)
+        with self._lock:
+            executor, future = self._submit(index, document, function, args)
+        result, rss = self._result(index, executor, future)
+        if (
+            self._hard_limit is not None
+            and rss is not None
+            and rss > self._hard_limit
+        ):
+            self._recycle(index, executor)
+        return result
+
+    def call(self, uri: str, function: Callable[..., T], *args: Any) -> T:
+        """Call function with args in the worker of a document."""
+        index = self._index(uri)
+        with self._lock:
+            executor, future = self._submit_to(
+                index, lambda executor: executor.submit(function, *args)
+            )
+        return self._result(index, executor, future)
+
+    def broadcast(
+        self, function: Callable[..., T], *args: Any, start: bool = False
+    ) -> List[T]:
+        """Call function with args in every worker, in parallel.
+
+        Only the workers already started are called, unless start is set.
+        """
+        submitted = []
+        with self._lock:
+            for index in range(len(self._executors)):
+                if self._executors[index] is None and not start:
+                    continue
+                executor, future = self._submit_to(
+                    index, lambda executor: executor.submit(function, *args)
+                )
+                submitted.append((index, executor, future))
+        return [
+            self._result(index, executor, future)
+            for index, executor, future in submitted
+        ]
+
+    def restart(self, projects: Projects) -> None:
+        """Replace the workers by new ones using other Jedi projects.
+
+        The new workers are started on their next request. Requests already
+        sent to the old workers are still answered.
+        """
+        with self._lock:
+            self._initargs = (*self._initargs[:2], projects)
+            for index, executor in enumerate(self._executors):
+                if executor is not None:
+                    executor.shutdown(wait=False)
+                self._executors[index] = None
+                self._versions[index].clear()
+
+    def set_folders(self, folders: List[str]) -> None:
+        """Change the workspace folders of the started workers.
+
+        Workers started later get the folders of the server's projects.
+        """
+        with self._lock:
+            for index, executor in enumerate(self._executors):
+                if executor is not None:
+                    try:
+                        executor.submit(_set_folders, folders)
+                    except BrokenExecutor:
+                        self._discard(index, executor)
+
+    def forget(self, uri: str) -> None:
+        """Drop a closed document from its worker."""
+        index = self._index(uri)
+        with self._lock:
+            if self._versions[index].pop(uri, None) is not None:
+                executor = self._executors[index]
+                if executor is not None:
+                    try:
+                        executor.submit(_forget, uri)
+                    except BrokenExecutor:
+                        self._discard(index, executor)
+
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        with self._lock:
+            for executor in self._executors:
+                if executor is not None:
+                    executor.shutdown(cancel_futures=True)
+            self._executors = [None] * len(self._executors)
+            for versions in self._versions:
+                versions.clear()
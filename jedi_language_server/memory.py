@@ -0,0 +1,135 @@
+"""Memory use of the process and eviction of Jedi's caches.
+
+Jedi keeps the parse tree of every module it ever loaded, including those
+of site-packages, so a server grows during long editing sessions. The
+resident set size is only measured on Linux, from /proc; elsewhere, memory
+limits have no effect.
+"""
+
+import gc
+import os
+import threading
+import time
+from typing import Callable, Collection, Dict, Optional
+
+import parso.cache
+from jedi.cache import clear_time_caches
+
+MEGABYTE = 1024 * 1024
+
+try:
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, OSError, ValueError):
+    _PAGE_SIZE = 4096
+
+
+def rss() -> Optional[int]:
+    """Get the resident set size of this process in bytes, if known."""
+    try:
+        with open("/proc/self/statm", "rb") as statm:
+            return int(statm.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def jedi_module_count() -> int:
+    """Get the number of parse trees cached by Jedi."""
+    return sum(len(modules) for modules in parso.cache.parser_cache.values())
+
+
+def evict_jedi_caches(keep_paths: Collection[str]) -> int:
+    """Drop Jedi's caches, except the parse trees of the modules to keep.
+
+    Returns the number of parse trees dropped. Safe to call while another
+    thread uses Jedi: a dropped module is only parsed again.
+    """
+    keep = {os.path.normcase(path) for path in keep_paths}
+    evicted = 0
+    for modules in list(parso.cache.parser_cache.values()):
+        for path in list(modules):
+            if path is None or os.path.normcase(str(path)) not in keep:
+                modules.pop(path, None)
+                evicted += 1
+    # Not delete_all, which would also drop the parse trees to keep
+    clear_time_caches()
+    gc.collect()
+    return evicted
+
+
+def clear_jedi_caches() -> Dict[str, Optional[int]]:
+    """Drop all of Jedi's caches, including the default environment.
+
+    Returns the number of parse trees dropped as jediModules, and the
+    decrease of the resident set size as freedBytes, None if unknown. The
+    interpreter may keep freed memory for later, so freedBytes is often
+    less than what the caches used.
+    """
+    before = rss()
+    modules = jedi_module_count()
+    clear_time_caches(delete_all=True)
+    gc.collect()
+    after = rss()
+    freed = None if before is None or after is None else before - after
+    return {"jediModules": modules, "freedBytes": freed}
+
+
+class MemoryLimit:
+    """Evict Jedi's caches when the process uses more than a soft limit.
+
+    The memory use is checked at most every interval_s seconds, since the
+    caches only grow with the requests in between. The interpreter often
+    keeps the memory freed by an eviction, so the process may stay past
+    the soft limit afterwards. The caches are then only evicted again once
+    the process grows past its size after the last eviction.
+    """
+
+    def __init__(self, soft_limit: int, interval_s: float = 10.0) -> None:
+        self.soft_limit = soft_limit
+        self.evictions = 0
+        self._interval_s = interval_s
+        self._next_check = 0.0
+        self._threshold = soft_limit
+        self._lock = threading.Lock()
+
+    def due(self) -> bool:
+        """Check whether `check` would measure the memory use now."""
+        return time.monotonic() >= self._next_check
+
+    def check(self, keep_paths: Callable[[], Collection[str]]) -> bool:
+        """Evict Jedi's caches if over the limit, returns whether it did.
+
+        keep_paths gets the paths of the modules to keep, usually the open
+        documents. It is only called on eviction, which collects garbage and
+        can take a while.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_check:
+                return False
+            self._next_check = now + self._interval_s
+            size = rss()
+            if size is None or size <= self._threshold:
+                return False
+            evict_jedi_caches(keep_paths())
+            self.evictions += 1
+            size = rss()
+            self._threshold = (
+                self.soft_limit if size is None else max(self.soft_limit, size)
+            )
+            return True
+
+
+def summary(memory_limit: Optional[MemoryLimit] = None) -> Dict[str, int]:
+    """Summarize the memory use of this process.
+
+    rss is in bytes, -1 if unknown. jediModules is the number of cached
+    parse trees.
+    """
+    size = rss()
+    result = {
+        "rss": -1 if size is None else size,
+        "jediModules": jedi_module_count(),
+    }
+    if memory_limit is not None:
+        result["evictions"] = memory_limit.evictions
+    return result
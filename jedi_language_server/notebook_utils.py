@@ -46,6 +46,8 @@ from lsprotocol.types import (
 from pygls.lsp.server import LanguageServer
 from pygls.workspace import TextDocument, Workspace
 
+from .pygls_utils import IndexedTextDocument
+
 
 def notebook_coordinate_mapper(
     workspace: Workspace,
@@ -288,6 +290,9 @@ class ServerWrapper(LanguageServer):
 class WorkspaceWrapper(Workspace):
     def __init__(self, workspace: Workspace):
         self._wrapped = workspace
+        # A wrapper lives for one request, during which the notebook can't
+        # change, so its concatenated document is only built once.
+        self._concatenated_documents: Dict[str, TextDocument] = {}
 
     def __getattr__(self, name: str) -> Any:
         return getattr(self._wrapped, name)
@@ -296,9 +301,13 @@ class WorkspaceWrapper(Workspace):
         mapper = notebook_coordinate_mapper(self._wrapped, cell_uri=doc_uri)
         if mapper is None:
             return self._wrapped.get_text_document(doc_uri)
-        return TextDocument(
-            uri=mapper.notebook_uri, source=mapper.notebook_source
-        )
+        document = self._concatenated_documents.get(mapper.notebook_uri)
+        if document is None:
+            document = IndexedTextDocument(
+                uri=mapper.notebook_uri, source=mapper.notebook_source
+            )
+            self._concatenated_documents[mapper.notebook_uri] = document
+        return document
 
 
 def _notebook_params(
@@ -0,0 +1,132 @@
+"""Sampling profiler for the server process.
+
+Takes the stack of every busy thread at a fixed interval, without tracing
+the code, so it can stay enabled during a real editing session. Threads
+waiting on a lock, a queue or a pipe, like idle pool threads, are skipped:
+the profile shows where the server spends CPU time. Waits inside slow
+handlers are in the slow request log. The samples are
+written periodically to a new file in a directory, in the collapsed stack
+format that flame graph tools (flamegraph.pl, speedscope, inferno) read: one
+line per stack, functions separated by semicolons, then the sample count.
+"""
+
+import atexit
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+from .instrumentation import collapse_stack
+
+PROFILE_DIR_ENV = "JEDI_LANGUAGE_SERVER_PROFILE_DIR"
+"""Environment variable enabling the profiler, like --profile-dir."""
+
+_BUSY_FRACTION = 0.01
+"""The fraction of the time between samples a busy thread runs, at least."""
+
+
+def _cpu_time(thread_id: int) -> Optional[float]:
+    """Get the CPU time of a thread, None if the platform can't tell."""
+    try:
+        return time.clock_gettime(time.pthread_getcpuclockid(thread_id))
+    except (AttributeError, OSError):
+        return None
+
+
+class SamplingProfiler:
+    """Write the stacks of the busy threads to directory.
+
+    Stacks are sampled every interval_s seconds. Every write_interval_s
+    seconds, and when the process exits, the samples taken since the last
+    write are written to a new file.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        interval_s: float = 0.01,
+        write_interval_s: float = 60.0,
+    ) -> None:
+        self.directory = directory
+        self.interval_s = interval_s
+        self.write_interval_s = write_interval_s
+        self._stacks: Counter[str] = Counter()
+        self._lock = threading.Lock()
+        self._files_written = 0
+        # The CPU time of each thread at the previous sample
+        self._cpu_times: Dict[int, float] = {}
+        self._last_sample = time.monotonic()
+        self._thread = threading.Thread(
+            target=self._run, name="sampling-profiler", daemon=True
+        )
+
+    def start(self) -> None:
+        """Start sampling in a background thread."""
+        os.makedirs(self.directory, exist_ok=True)
+        atexit.register(self.write)
+        self._thread.start()
+
+    def _run(self) -> None:
+        last_write = time.monotonic()
+        while True:
+            time.sleep(self.interval_s)
+            self.sample()
+            if time.monotonic() - last_write >= self.write_interval_s:
+                self.write()
+                last_write = time.monotonic()
+
+    def sample(self) -> None:
+        """Take the stack of every busy thread but the profiler's.
+
+        A thread is busy if it ran for a fraction of the time since the
+        previous sample. Threads are only skipped once their CPU time is
+        known, so on platforms without per-thread CPU clocks every thread
+        is sampled.
+        """
+        own_thread = threading.get_ident()
+        now = time.monotonic()
+        min_cpu_time = _BUSY_FRACTION * (now - self._last_sample)
+        self._last_sample = now
+        frames = sys._current_frames()
+        cpu_times = {}
+        busy = []
+        for thread_id in frames:
+            if thread_id == own_thread:
+                continue
+            cpu_time = _cpu_time(thread_id)
+            previous = self._cpu_times.get(thread_id)
+            if cpu_time is not None:
+                cpu_times[thread_id] = cpu_time
+                if previous is None or cpu_time - previous < min_cpu_time:
+                    continue
+            busy.append(thread_id)
+        self._cpu_times = cpu_times
+        if not busy:
+            return
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        stacks = [
+            f"{names.get(thread_id, thread_id)};"
+            f"{collapse_stack(frames[thread_id])}"
+            for thread_id in busy
+        ]
+        del frames
+        with self._lock:
+            self._stacks.update(stacks)
+
+    def write(self) -> None:
+        """Write the samples taken since the last write to a new file."""
+        with self._lock:
+            stacks, self._stacks = self._stacks, Counter()
+            if not stacks:
+                return
+            self._files_written += 1
+            path = os.path.join(
+                self.directory,
+                f"jedi-language-server-{os.getpid()}"
+                f"-{self._files_written:04d}.collapsed",
+            )
+        with open(path, "w") as profile_file:
+            for stack, count in stacks.most_common():
+                profile_file.write(f"{stack} {count}\n")
@@ -0,0 +1,134 @@
+"""The Jedi projects of the folders of a workspace.
+
+A multi-root workspace gets one Jedi project per folder, so that each folder
+has its own sys.path. A document uses the project of the innermost folder
+containing it; documents outside of every folder use the project of the
+first folder. Projects are created once per folder and kept while the
+folder stays in the workspace. All of them share one environment, so that
+a single interpreter is started for the workspace.
+"""
+
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from jedi import Project
+from jedi.api.environment import (
+    Environment,
+    create_environment,
+    get_cached_default_environment,
+)
+
+from .initialization_options import Workspace
+
+
+class _FolderProject(Project):
+    """A Jedi project using the environment shared by its `Projects`."""
+
+    def __init__(self, projects: "Projects", **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self._projects = projects
+
+    def get_environment(self) -> Environment:
+        if self._environment is None:
+            self._environment = self._projects.get_environment()
+        return self._environment
+
+
+class Projects:
+    """The Jedi projects of the folders of a workspace, by folder path.
+
+    Pickling keeps the folders and options but not the environment, which
+    cannot be pickled once used.
+    """
+
+    def __init__(
+        self, folders: Iterable[str], workspace_options: Workspace
+    ) -> None:
+        self._workspace_options = workspace_options
+        self._projects: Dict[str, Project] = {}
+        self._environment: Optional[Environment] = None
+        self._lock = threading.Lock()
+        self.set_folders(folders)
+
+    def get_environment(self) -> Environment:
+        """Get the environment of all projects, found on first use.
+
+        Like `Project.get_environment`, without starting an interpreter per
+        folder.
+        """
+        with self._lock:
+            if self._environment is None:
+                environment_path = self._workspace_options.environment_path
+                self._environment = (
+                    get_cached_default_environment()
+                    if environment_path is None
+                    else create_environment(environment_path, safe=False)
+                )
+            return self._environment
+
+    def _create(self, folder: str) -> Project:
+        return _FolderProject(
+            self,
+            path=folder,
+            environment_path=self._workspace_options.environment_path,
+            added_sys_path=self._workspace_options.extra_paths,
+            smart_sys_path=True,
+            load_unsafe_extensions=False,
+        )
+
+    def set_folders(self, folders: Iterable[str]) -> None:
+        """Change the folders, keeping the projects of unchanged ones."""
+        # Replaced at once, so that other threads see the old or new projects
+        self._projects = {
+            folder: self._projects.get(folder) or self._create(folder)
+            for folder in dict.fromkeys(os.path.normpath(f) for f in folders)
+        }
+
+    @property
+    def folders(self) -> List[str]:
+        """The folders, in the order of the workspace."""
+        return list(self._projects)
+
+    def items(self) -> List[Tuple[str, Project]]:
+        """The folders and their projects."""
+        return list(self._projects.items())
+
+    @property
+    def default(self) -> Optional[Project]:
+        """The project of the first folder, None without folders."""
+        return next(iter(self._projects.values()), None)
+
+    def folder_of(self, path: str) -> Optional[str]:
+        """Get the innermost folder containing a path, if any."""
+        projects = self._projects
+        directory = os.path.dirname(os.path.normpath(path))
+        while directory not in projects:
+            parent = os.path.dirname(directory)
+            if parent == directory:
+                return None
+            directory = parent
+        return directory
+
+    def get(self, path: Optional[str]) -> Optional[Project]:
+        """Get the project of a path, or the default project."""
+        projects = self._projects
+        folder = None if path is None else self.folder_of(path)
+        if folder is not None:
+            project = projects.get(folder)
+            if project is not None:
+                return project
+        return next(iter(projects.values()), None)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {
+            "folders": self.folders,
+            "workspace_options": self._workspace_options,
+        }
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self._workspace_options = state["workspace_options"]
+        self._projects = {}
+        self._environment = None
+        self._lock = threading.Lock()
+        self.set_folders(state["folders"])
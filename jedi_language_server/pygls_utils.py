@@ -3,10 +3,242 @@
 Helper functions that simplify working with pygls
 """
 
-from typing import Optional
+import itertools
+import threading
+from bisect import bisect_right
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TypeVar,
+)
 
-from lsprotocol.types import Position, Range
-from pygls.workspace import TextDocument
+from lsprotocol.types import (
+    Position,
+    PositionEncodingKind,
+    Range,
+    TextDocumentContentChangeEvent,
+    TextDocumentContentChangePartial,
+)
+from pygls.workspace import TextDocument, Workspace
+from pygls.workspace.text_document import ServerTextPosition
+
+from .instrumentation import CacheStats
+from .jedi_utils import jedi_column, lsp_character
+
+T = TypeVar("T")
+
+
+class _LineIndex:
+    """The lines of a source and the offset at which each of them starts."""
+
+    def __init__(self, source: str) -> None:
+        self.source = source
+        self.lines = tuple(source.splitlines(True))
+        self._offsets: Optional[List[int]] = None
+
+    @property
+    def offsets(self) -> List[int]:
+        # Computed on demand, the lines are needed far more often.
+        if self._offsets is None:
+            self._offsets = list(
+                itertools.accumulate(
+                    (len(line) for line in self.lines[:-1]), initial=0
+                )
+            )
+        return self._offsets
+
+
+class IndexedTextDocument(TextDocument):
+    """Text document splitting its source in lines once per change.
+
+    pygls splits the whole source on every access to `lines`, and converts
+    positions to offsets by summing the lengths of the preceding lines. Here
+    the lines and the offset of each of them are computed on the first
+    access after a change and reused, so line access and position to offset
+    conversions don't depend on the size of the document.
+    """
+
+    _index: Optional[_LineIndex] = None
+
+    def _line_index(self) -> _LineIndex:
+        source = self.source
+        index = self._index
+        # Every change assigns a new source string, the index holds the
+        # previous one, so it can't be another object with the same id.
+        if index is None or index.source is not source:
+            index = _LineIndex(source)
+            # Documents read from disk may change without notice.
+            if self._source is not None:
+                self._index = index
+        return index
+
+    @property
+    def lines(self) -> Sequence[str]:
+        return self._line_index().lines
+
+    def offset_at_server_position(
+        self, server_position: ServerTextPosition
+    ) -> int:
+        index = self._line_index()
+        if server_position.line >= len(index.offsets):
+            return len(index.source) + server_position.character
+        return index.offsets[server_position.line] + server_position.character
+
+    def server_position_at_offset(self, offset: int) -> ServerTextPosition:
+        index = self._line_index()
+        line = bisect_right(index.offsets, offset) - 1
+        if line < 0 or offset >= len(index.source):
+            # Beyond the end of the last line, like pygls.
+            return ServerTextPosition(len(index.lines), 0)
+        return ServerTextPosition(line, offset - index.offsets[line])
+
+
+def _ends_with_line_break(text: str) -> bool:
+    return len((text[-1:] + "x").splitlines()) == 2
+
+
+class LineArrayTextDocument(IndexedTextDocument):
+    """Text document stored as a list of lines.
+
+    pygls rebuilds the whole source on every incremental change. Here a
+    change only replaces the lines it touches in a list, and the source is
+    joined when it is first needed after changes, so a burst of keystrokes
+    in a huge file costs one join instead of one copy each. `lines` is the
+    list itself, not a copy.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._line_array: Optional[List[str]] = None
+        self._source_stale = False
+        self._lock = threading.Lock()
+
+    @property
+    def source(self) -> str:
+        with self._lock:
+            if self._source_stale:
+                assert self._line_array is not None
+                self._source = "".join(self._line_array)
+                self._source_stale = False
+        return super().source
+
+    @property
+    def lines(self) -> Sequence[str]:
+        if self._line_array is not None:
+            return self._line_array
+        if self._source is None:
+            # Read from disk on every access, like pygls.
+            return super().lines
+        self._line_array = list(super().lines)
+        return self._line_array
+
+    def _apply_incremental_change(
+        self, change: TextDocumentContentChangePartial
+    ) -> None:
+        lines = self.lines
+        if not isinstance(lines, list):
+            super()._apply_incremental_change(change)
+            return
+        change_range = self.position_codec.range_from_client_units(
+            lines, change.range
+        )
+        start, end = change_range.start, change_range.end
+        with self._lock:
+            if start.line >= len(lines):
+                # pygls appends changes past the end to the source.
+                first = len(lines)
+                if lines and not _ends_with_line_break(lines[-1]):
+                    first -= 1
+                new_text = "".join(lines[first:]) + change.text
+                last = len(lines)
+            else:
+                first = start.line
+                if end.line < len(lines):
+                    last = end.line + 1
+                    suffix = lines[end.line][end.character :]
+                else:
+                    last, suffix = len(lines), ""
+                new_text = (
+                    lines[first][: start.character] + change.text + suffix
+                )
+            # Keep the lines as splitting the whole source would: a line
+            # without a break is joined with the next one, and a carriage
+            # return before a new line ends a single line.
+            while last < len(lines) and (
+                not _ends_with_line_break(new_text)
+                or (new_text.endswith("\r") and lines[last].startswith("\n"))
+            ):
+                new_text += lines[last]
+                last += 1
+            if (
+                first
+                and new_text.startswith("\n")
+                and lines[first - 1].endswith("\r")
+            ):
+                first -= 1
+                new_text = lines[first] + new_text
+            lines[first:last] = new_text.splitlines(True)
+            self._source_stale = True
+
+    def _apply_full_change(
+        self, change: TextDocumentContentChangeEvent
+    ) -> None:
+        with self._lock:
+            self._line_array = None
+            self._source_stale = False
+            super()._apply_full_change(change)
+
+
+class IndexedWorkspace(Workspace):
+    """Workspace whose documents are `IndexedTextDocument`."""
+
+    document_class: Type[IndexedTextDocument] = IndexedTextDocument
+
+    @classmethod
+    def from_workspace(
+        cls,
+        workspace: Workspace,
+        position_encoding: Optional[PositionEncodingKind] = None,
+    ) -> "IndexedWorkspace":
+        """Create an empty workspace with the settings of another one.
+
+        The position encoding of the other workspace is kept, unless given.
+        """
+        return cls(
+            workspace.root_uri,
+            workspace._sync_kind,
+            list(workspace.folders.values()),
+            position_encoding or workspace.position_encoding,
+        )
+
+    def _create_text_document(
+        self,
+        doc_uri: str,
+        source: Optional[str] = None,
+        version: Optional[int] = None,
+        language_id: Optional[str] = None,
+    ) -> TextDocument:
+        return self.document_class(
+            doc_uri,
+            source=source,
+            version=version,
+            language_id=language_id,
+            sync_kind=self._sync_kind,
+            position_codec=self.position_codec,
+        )
+
+
+class LineArrayWorkspace(IndexedWorkspace):
+    """Workspace whose documents are `LineArrayTextDocument`."""
+
+    document_class = LineArrayTextDocument
 
 
 def char_before_cursor(
@@ -32,20 +264,72 @@ def char_after_cursor(
 def current_word_range(
     document: TextDocument, position: Position
 ) -> Optional[Range]:
-    """Get the range of the word under the cursor."""
+    """Get the range of the word under the cursor.
+
+    The word is searched by code points, like Jedi's columns, and its range
+    converted to the position encoding of the document.
+    """
     word = document.word_at_position(position)
     word_len = len(word)
     line: str = document.lines[position.line]
+    encoding = document.position_codec.encoding
+    character = jedi_column(line, position.character, encoding)
     start = 0
     for _ in range(1000):  # prevent infinite hanging in case we hit edge case
         begin = line.find(word, start)
         if begin == -1:
             return None
         end = begin + word_len
-        if begin <= position.character <= end:
+        if begin <= character <= end:
             return Range(
-                start=Position(line=position.line, character=begin),
-                end=Position(line=position.line, character=end),
+                start=Position(
+                    line=position.line,
+                    character=lsp_character(line, begin, encoding),
+                ),
+                end=Position(
+                    line=position.line,
+                    character=lsp_character(line, end, encoding),
+                ),
             )
         start = end
     return None
+
+
+class DocumentCache(Generic[T]):
+    """Cache a value computed from a text document, per document version.
+
+    Only the value for the most recent version of each document is kept.
+    Documents without a version (not opened by the client) are never cached
+    because their source may change on disk without notice. Lookups are
+    counted in stats, if given.
+    """
+
+    def __init__(self, stats: Optional[CacheStats] = None) -> None:
+        self._values: Dict[str, Tuple[int, T]] = {}
+        self._stats = stats
+
+    def get(self, document: TextDocument, compute: Callable[[], T]) -> T:
+        """Get the cached value for the document, computing it if needed."""
+        version = document.version
+        if version is None:
+            return compute()
+        cached = self._values.get(document.uri)
+        if cached is not None and cached[0] == version:
+            self._record(hit=True)
+            return cached[1]
+        self._record(hit=False)
+        value = compute()
+        self._values[document.uri] = (version, value)
+        return value
+
+    def _record(self, hit: bool) -> None:
+        if self._stats is not None:
+            self._stats.record(hit)
+
+    def pop(self, uri: str) -> None:
+        """Forget the cached value of a document."""
+        self._values.pop(uri, None)
+
+    def clear(self) -> None:
+        """Forget the cached values of all documents."""
+        self._values.clear()
@@ -6,31 +6,50 @@ Official language server spec:
     https://microsoft.github.io/language-server-protocol/specification
 """
 
+import asyncio
+import contextlib
+import functools
+import inspect
 import itertools
+import logging
+import threading
+import time
+import uuid
 from collections.abc import Generator
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import (
     Any,
+    Callable,
+    Dict,
     List,
     NamedTuple,
     Optional,
+    Pattern,
+    Tuple,
+    TypeVar,
     Union,
 )
 
 import cattrs
-from jedi import Project, Script, __version__
+from jedi import Script, __version__
 from jedi.api.classes import Name
+from jedi.api.environment import InvalidPythonEnvironment
 from jedi.api.refactoring import RefactoringError
 from lsprotocol.types import (
+    CODE_ACTION_RESOLVE,
     COMPLETION_ITEM_RESOLVE,
     INITIALIZE,
+    INITIALIZED,
     NOTEBOOK_DOCUMENT_DID_CHANGE,
     NOTEBOOK_DOCUMENT_DID_CLOSE,
     NOTEBOOK_DOCUMENT_DID_OPEN,
     NOTEBOOK_DOCUMENT_DID_SAVE,
+    SHUTDOWN,
     TEXT_DOCUMENT_CODE_ACTION,
     TEXT_DOCUMENT_COMPLETION,
     TEXT_DOCUMENT_DECLARATION,
     TEXT_DOCUMENT_DEFINITION,
+    TEXT_DOCUMENT_DIAGNOSTIC,
     TEXT_DOCUMENT_DID_CHANGE,
     TEXT_DOCUMENT_DID_CLOSE,
     TEXT_DOCUMENT_DID_OPEN,
@@ -44,8 +63,11 @@ from lsprotocol.types import (
     TEXT_DOCUMENT_SEMANTIC_TOKENS_RANGE,
     TEXT_DOCUMENT_SIGNATURE_HELP,
     TEXT_DOCUMENT_TYPE_DEFINITION,
+    WORKSPACE_DIAGNOSTIC,
     WORKSPACE_DID_CHANGE_CONFIGURATION,
+    WORKSPACE_DID_CHANGE_WORKSPACE_FOLDERS,
     WORKSPACE_SYMBOL,
+    ClientCapabilities,
     CodeAction,
     CodeActionKind,
     CodeActionOptions,
@@ -54,19 +76,27 @@ from lsprotocol.types import (
     CompletionList,
     CompletionOptions,
     CompletionParams,
+    CreateFile,
+    DeleteFile,
+    Diagnostic,
+    DiagnosticOptions,
     DidChangeConfigurationParams,
     DidChangeNotebookDocumentParams,
     DidChangeTextDocumentParams,
+    DidChangeWorkspaceFoldersParams,
     DidCloseNotebookDocumentParams,
     DidCloseTextDocumentParams,
     DidOpenNotebookDocumentParams,
     DidOpenTextDocumentParams,
     DidSaveNotebookDocumentParams,
     DidSaveTextDocumentParams,
+    DocumentDiagnosticParams,
+    DocumentDiagnosticReport,
     DocumentHighlight,
     DocumentSymbol,
     DocumentSymbolParams,
     Hover,
+    InitializedParams,
     InitializeParams,
     InitializeResult,
     Location,
@@ -79,8 +109,13 @@ from lsprotocol.types import (
     NotebookDocumentSyncOptions,
     ParameterInformation,
     Position,
+    PositionEncodingKind,
+    ProgressParams,
     PublishDiagnosticsParams,
     Range,
+    RelatedFullDocumentDiagnosticReport,
+    RelatedUnchangedDocumentDiagnosticReport,
+    RenameFile,
     RenameParams,
     SemanticTokens,
     SemanticTokensLegend,
@@ -91,16 +126,40 @@ from lsprotocol.types import (
     SignatureHelpOptions,
     SignatureInformation,
     SymbolInformation,
+    TextDocumentEdit,
     TextDocumentPositionParams,
+    WorkDoneProgressBegin,
+    WorkDoneProgressEnd,
+    WorkDoneProgressReport,
+    WorkspaceDiagnosticParams,
+    WorkspaceDiagnosticReport,
+    WorkspaceDiagnosticReportPartialResult,
+    WorkspaceDocumentDiagnosticReport,
     WorkspaceEdit,
+    WorkspaceFullDocumentDiagnosticReport,
     WorkspaceSymbolParams,
+    WorkspaceUnchangedDocumentDiagnosticReport,
 )
 from lsprotocol.validators import INTEGER_MAX_VALUE
 from pygls.capabilities import get_capability
+from pygls.feature_manager import get_help_attrs, is_thread_function
 from pygls.lsp.server import LanguageServer
 from pygls.protocol import LanguageServerProtocol, lsp_method
-
-from . import jedi_utils, notebook_utils, pygls_utils, text_edit_utils
+from pygls.uris import to_fs_path
+from pygls.workspace import TextDocument
+
+from . import (
+    instrumentation,
+    jedi_utils,
+    jedi_workers,
+    memory,
+    notebook_utils,
+    projects,
+    pygls_utils,
+    slow_requests,
+    text_edit_utils,
+    workspace_diagnostics,
+)
 from .constants import (
     SEMANTIC_TO_TOKEN_ID,
     SUPPORTED_SEMANTIC_TYPES,
@@ -110,12 +169,138 @@ from .initialization_options import (
     initialization_options_converter,
 )
 
+logger = logging.getLogger(__name__)
+
+
+_WORKER_METHODS = frozenset(
+    {
+        COMPLETION_ITEM_RESOLVE,
+        TEXT_DOCUMENT_COMPLETION,
+        TEXT_DOCUMENT_DECLARATION,
+        TEXT_DOCUMENT_DEFINITION,
+        TEXT_DOCUMENT_HOVER,
+        TEXT_DOCUMENT_REFERENCES,
+        TEXT_DOCUMENT_SEMANTIC_TOKENS_FULL,
+        TEXT_DOCUMENT_SEMANTIC_TOKENS_RANGE,
+        TEXT_DOCUMENT_TYPE_DEFINITION,
+    }
+)
+"""Methods using Jedi in the workers with `workers.count` set."""
+
+_SERVER_JEDI_METHODS = frozenset(
+    {
+        CODE_ACTION_RESOLVE,
+        TEXT_DOCUMENT_CODE_ACTION,
+        TEXT_DOCUMENT_DOCUMENT_HIGHLIGHT,
+        TEXT_DOCUMENT_DOCUMENT_SYMBOL,
+        TEXT_DOCUMENT_RENAME,
+        TEXT_DOCUMENT_SIGNATURE_HELP,
+        WORKSPACE_SYMBOL,
+    }
+)
+"""Methods always using Jedi in the server process."""
+
 
 class JediLanguageServerProtocol(LanguageServerProtocol):
     """Override some built-in functions."""
 
     _server: "JediLanguageServer"
 
+    def _execute_handler(
+        self,
+        msg_id: Any,
+        handler: Callable[..., Any],
+        callback: Callable[[Future], None],
+        args: Optional[Tuple[Any, ...]] = None,
+        kwargs: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Record the latency of every registered feature.
+
+        Every handler, including those that built-in features hand over to,
+        is executed here. See the instrumentation module for the recorded
+        durations. Slow handlers are also written to the slow request log,
+        if enabled.
+
+        Handlers using Jedi in the server process run on server.jedi_thread,
+        the others as pygls runs them.
+        """
+        method, _ = get_help_attrs(handler)
+        if method is None:
+            super()._execute_handler(msg_id, handler, callback, args, kwargs)
+            return
+        server = self._server
+        stats = server.stats
+        slow_request_log = server.slow_request_log
+        received = time.perf_counter()
+        is_request = (
+            getattr(callback, "func", None) == self._send_handler_result
+        )
+
+        if not (
+            asyncio.iscoroutinefunction(handler)
+            or inspect.isgeneratorfunction(handler)
+        ):
+            untimed_handler = handler
+
+            @functools.wraps(untimed_handler)
+            def handler(*args: Any, **kwargs: Any) -> Any:
+                started = time.perf_counter()
+                if is_thread_function(untimed_handler):
+                    stats.record(method, "queue", started - received)
+                instrumentation.reset_jedi_seconds()
+                watch = (
+                    slow_request_log.watch(
+                        method,
+                        slow_requests.request_details(
+                            server, args[0] if args else None
+                        ),
+                    )
+                    if slow_request_log is not None
+                    else contextlib.nullcontext()
+                )
+                try:
+                    with watch:
+                        return untimed_handler(*args, **kwargs)
+                finally:
+                    elapsed = time.perf_counter() - started
+                    stats.record(method, "handler", elapsed)
+                    jedi_seconds = instrumentation.jedi_seconds()
+                    if jedi_seconds:
+                        stats.record(method, "jedi", jedi_seconds)
+                        stats.record(
+                            method, "conversion", elapsed - jedi_seconds
+                        )
+
+        untimed_callback = callback
+
+        def callback(future: Future) -> None:
+            done = time.perf_counter()
+            untimed_callback(future)
+            sent = time.perf_counter()
+            if is_request:
+                stats.record(method, "serialization", sent - done)
+            stats.record(method, "total", sent - received)
+            memory_limit = server.memory_limit
+            if memory_limit is not None and memory_limit.due():
+                # Evicting collects garbage, which must not block the loop
+                server.thread_pool.submit(
+                    memory_limit.check, server.open_document_paths
+                )
+
+        if method in _SERVER_JEDI_METHODS or (
+            method in _WORKER_METHODS and server.jedi_workers is None
+        ):
+            # Jedi handles one request at a time in the server process, so
+            # its requests queue up for one thread instead of taking over
+            # the thread pool, which also reads the client's messages
+            future = server.jedi_thread.submit(
+                handler, *(args or ()), **(kwargs or {})
+            )
+            self._request_futures[msg_id] = future
+            future.add_done_callback(callback)
+            return
+        super()._execute_handler(msg_id, handler, callback, args, kwargs)
+
     @lsp_method(INITIALIZE)
     def lsp_initialize(
         self, params: InitializeParams
@@ -150,46 +335,65 @@ class JediLanguageServerProtocol(LanguageServerProtocol):
 
         initialization_options = server.initialization_options
         jedi_utils.set_jedi_settings(initialization_options)
+        slow_requests_options = initialization_options.slow_requests
+        if slow_requests_options.log_file:
+            try:
+                server.slow_request_log = slow_requests.SlowRequestLog(
+                    slow_requests_options.log_file,
+                    slow_requests_options.threshold,
+                )
+            except OSError as error:
+                server.window_show_message(
+                    ShowMessageParams(
+                        type=MessageType.Error,
+                        message=f"Cannot open the slow request log: {error}",
+                    )
+                )
 
         # Configure didOpen, didChange, and didSave
         # currently need to be configured manually
         diagnostics = initialization_options.diagnostics
+        pull_diagnostics = diagnostics.enable and (
+            get_capability(params.capabilities, "text_document.diagnostic")
+            is not None
+        )
+        push_diagnostics = diagnostics.enable and not pull_diagnostics
         did_open = (
             did_open_diagnostics
-            if diagnostics.enable and diagnostics.did_open
+            if push_diagnostics and diagnostics.did_open
             else did_open_default
         )
         did_change = (
             did_change_diagnostics
-            if diagnostics.enable and diagnostics.did_change
+            if push_diagnostics and diagnostics.did_change
             else did_change_default
         )
         did_save = (
             did_save_diagnostics
-            if diagnostics.enable and diagnostics.did_save
+            if push_diagnostics and diagnostics.did_save
             else did_save_default
         )
         did_close = (
-            did_close_diagnostics if diagnostics.enable else did_close_default
+            did_close_diagnostics if push_diagnostics else did_close_default
         )
         did_open_notebook = (
             did_open_notebook_diagnostics
-            if diagnostics.enable and diagnostics.did_open
+            if push_diagnostics and diagnostics.did_open
             else did_open_notebook_default
         )
         did_change_notebook = (
             did_change_notebook_diagnostics
-            if diagnostics.enable and diagnostics.did_change
+            if push_diagnostics and diagnostics.did_change
             else did_change_notebook_default
         )
         did_save_notebook = (
             did_save_notebook_diagnostics
-            if diagnostics.enable and diagnostics.did_save
+            if push_diagnostics and diagnostics.did_save
             else did_save_notebook_default
         )
         did_close_notebook = (
             did_close_notebook_diagnostics
-            if diagnostics.enable
+            if push_diagnostics
             else did_close_notebook_default
         )
         server.feature(TEXT_DOCUMENT_DID_OPEN)(did_open)
@@ -200,6 +404,16 @@ class JediLanguageServerProtocol(LanguageServerProtocol):
         server.feature(NOTEBOOK_DOCUMENT_DID_CHANGE)(did_change_notebook)
         server.feature(NOTEBOOK_DOCUMENT_DID_SAVE)(did_save_notebook)
         server.feature(NOTEBOOK_DOCUMENT_DID_CLOSE)(did_close_notebook)
+        if pull_diagnostics:
+            diagnostic_options = DiagnosticOptions(
+                inter_file_dependencies=False,
+                workspace_diagnostics=diagnostics.workspace,
+            )
+            server.feature(TEXT_DOCUMENT_DIAGNOSTIC, diagnostic_options)(
+                document_diagnostic
+            )
+            if diagnostics.workspace:
+                server.feature(WORKSPACE_DIAGNOSTIC)(workspace_diagnostic)
 
         if server.initialization_options.hover.enable:
             server.feature(TEXT_DOCUMENT_HOVER)(hover)
@@ -216,35 +430,163 @@ class JediLanguageServerProtocol(LanguageServerProtocol):
             )
 
         initialize_result = yield from super().lsp_initialize(params)
-        workspace_options = initialization_options.workspace
-        server.project = (
-            Project(
-                path=server.workspace.root_path,
-                environment_path=workspace_options.environment_path,
-                added_sys_path=workspace_options.extra_paths,
-                smart_sys_path=True,
-                load_unsafe_extensions=False,
-            )
-            if server.workspace.root_path
-            else None
+        # pygls follows the client's order of preference, but UTF-32 is
+        # preferred whenever offered because its characters are Jedi's columns
+        position_encoding = _choose_position_encoding(params.capabilities)
+        initialize_result.capabilities.position_encoding = position_encoding
+        # No document is open yet, so the workspace created by pygls can be
+        # replaced by one indexing the lines of its documents.
+        workspace_class = (
+            pygls_utils.LineArrayWorkspace
+            if initialization_options.text_documents.storage == "lines"
+            else pygls_utils.IndexedWorkspace
+        )
+        self._workspace = workspace_class.from_workspace(
+            self.workspace, position_encoding
         )
+        server.projects = _create_projects(server)
+        soft_limit = initialization_options.memory.soft_limit
+        if soft_limit is not None:
+            server.memory_limit = memory.MemoryLimit(
+                soft_limit * memory.MEGABYTE
+            )
+        if initialization_options.workers.count > 0:
+            server.jedi_workers = jedi_workers.JediWorkers(
+                initialization_options.workers.count,
+                initialization_options,
+                server.projects,
+                lambda: list(server.workspace.text_documents.values()),
+            )
         return initialize_result
 
 
+def _workspace_folders(server: "JediLanguageServer") -> List[str]:
+    """Get the paths of the workspace folders, or of the root without any."""
+    folders = [
+        path
+        for path in (
+            to_fs_path(folder.uri)
+            for folder in server.workspace.folders.values()
+        )
+        if path is not None
+    ]
+    if not folders and server.workspace.root_path:
+        folders.append(server.workspace.root_path)
+    return folders
+
+
+def _create_projects(server: "JediLanguageServer") -> projects.Projects:
+    """Create the Jedi projects of the workspace folders."""
+    return projects.Projects(
+        _workspace_folders(server), server.initialization_options.workspace
+    )
+
+
 class JediLanguageServer(LanguageServer):
     """Jedi language server.
 
     :attr initialization_options: initialized in lsp_initialize from the
         protocol_cls.
-    :attr project: a Jedi project. This value is created in
-        `JediLanguageServerProtocol.lsp_initialize`.
+    :attr projects: the Jedi project of each workspace folder. This value is
+        created in `JediLanguageServerProtocol.lsp_initialize`.
+    :attr document_symbol_cache: the module outline of each open document,
+        reused until the document changes.
+    :attr highlight_cache: for each open document, maps line numbers to the
+        (start, end) columns of already highlighted occurrences on that line
+        and the highlights of all occurrences of the same symbol.
+    :attr diagnostic_cache: the diagnostic result id and diagnostics of each
+        open document.
+    :attr workspace_diagnostics: the diagnostics of the Python files on disk,
+        used for workspace/diagnostic.
+    :attr stats: latency and cache statistics, returned by $/jedi/stats.
+    :attr slow_request_log: where slow handlers are written, if enabled with
+        `slowRequests.logFile`.
+    :attr jedi_workers: the worker processes running Jedi requests, if
+        enabled with `workers.count`.
+    :attr memory_limit: evicts Jedi's caches past `memory.softLimit`, if
+        set.
+    :attr jedi_thread: runs the handlers using Jedi in the server process,
+        one at a time.
+    :attr jedi_lock: held around every use of Jedi in the server process.
+        Jedi talks to the interpreter of the environment through a single
+        pipe, so concurrent Jedi calls would read each other's answers.
     """
 
     initialization_options: InitializationOptions
-    project: Optional[Project]
+    projects: projects.Projects
 
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         super().__init__(*args, **kwargs)
+        self.stats = instrumentation.Stats()
+        self.slow_request_log: Optional[slow_requests.SlowRequestLog] = None
+        self.jedi_workers: Optional[jedi_workers.JediWorkers] = None
+        self.memory_limit: Optional[memory.MemoryLimit] = None
+        self.jedi_thread = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="jedi"
+        )
+        self.jedi_lock = threading.Lock()
+        self.document_symbol_cache: pygls_utils.DocumentCache[
+            Optional[Union[List[DocumentSymbol], List[SymbolInformation]]]
+        ] = pygls_utils.DocumentCache(self.stats.cache("documentSymbol"))
+        self.highlight_cache: pygls_utils.DocumentCache[
+            Dict[int, List[Tuple[int, int, List[DocumentHighlight]]]]
+        ] = pygls_utils.DocumentCache()
+        self.diagnostic_cache: pygls_utils.DocumentCache[
+            Tuple[str, List[Diagnostic]]
+        ] = pygls_utils.DocumentCache(self.stats.cache("diagnostics"))
+        self.workspace_diagnostics = (
+            workspace_diagnostics.WorkspaceDiagnostics()
+        )
+        self.diagnostic_durations: Dict[str, float] = {}
+
+    def open_document_paths(self) -> List[str]:
+        """Get the paths of the open documents."""
+        return [
+            document.path
+            for document in list(self.workspace.text_documents.values())
+        ]
+
+    def clear_document_caches(self) -> None:
+        """Drop the values cached for all documents."""
+        self.document_symbol_cache.clear()
+        self.highlight_cache.clear()
+        self.diagnostic_cache.clear()
+        self.workspace_diagnostics.clear()
+        jedi_utils.clear_completions_cache()
+
+    def forget_document(self, uri: str) -> None:
+        """Drop all values cached for a closed document."""
+        self.document_symbol_cache.pop(uri)
+        self.highlight_cache.pop(uri)
+        self.diagnostic_cache.pop(uri)
+        self.diagnostic_durations.pop(uri, None)
+        if self.jedi_workers is not None:
+            self.jedi_workers.forget(uri)
+
+
+T = TypeVar("T")
+
+
+def _jedi_request(
+    server: JediLanguageServer,
+    document: TextDocument,
+    function: Callable[..., T],
+    *args: Any,
+) -> T:
+    """Call function with a Jedi Script of the document and args.
+
+    With `workers.count` set, function runs in the worker process of the
+    document, see the jedi_workers module, and handlers calling this run in
+    threads, so that requests wait for their workers in parallel. Otherwise,
+    they run on server.jedi_thread, and function holds jedi_lock.
+    """
+    if server.jedi_workers is None:
+        with server.jedi_lock:
+            return function(
+                jedi_utils.script(server.projects, document), *args
+            )
+    with instrumentation.jedi_call():
+        return server.jedi_workers.run(document, function, *args)
 
 
 SERVER = JediLanguageServer(
@@ -266,14 +608,23 @@ SERVER = JediLanguageServer(
 
 
 @SERVER.feature(COMPLETION_ITEM_RESOLVE)
+@SERVER.thread()
 def completion_item_resolve(
     server: JediLanguageServer, params: CompletionItem
 ) -> CompletionItem:
     """Resolves documentation and detail of given completion item."""
     markup_kind = _choose_markup(server)
-    return jedi_utils.lsp_completion_item_resolve(
-        params, markup_kind=markup_kind
-    )
+    if server.jedi_workers is not None and isinstance(params.data, dict):
+        return server.jedi_workers.call(
+            params.data["uri"],
+            jedi_utils.lsp_completion_item_resolve,
+            params,
+            markup_kind,
+        )
+    with server.jedi_lock:
+        return jedi_utils.lsp_completion_item_resolve(
+            params, markup_kind=markup_kind
+        )
 
 
 @SERVER.feature(
@@ -282,18 +633,66 @@ def completion_item_resolve(
         trigger_characters=[".", "'", '"'], resolve_provider=True
     ),
 )
+@SERVER.thread()
 @notebook_utils.supports_notebooks
 def completion(
     server: JediLanguageServer, params: CompletionParams
 ) -> Optional[CompletionList]:
     """Returns completion items."""
-    snippet_disable = server.initialization_options.completion.disable_snippets
-    resolve_eagerly = server.initialization_options.completion.resolve_eagerly
-    ignore_patterns = server.initialization_options.completion.ignore_patterns
+    completion_options = server.initialization_options.completion
     document = server.workspace.get_text_document(params.text_document.uri)
-    jedi_script = jedi_utils.script(server.project, document)
-    jedi_lines = jedi_utils.line_column(params.position)
-    completions_jedi_raw = jedi_script.complete(*jedi_lines)
+    jedi_lines = jedi_utils.line_column(params.position, document)
+    snippet_support = get_capability(
+        server.client_capabilities,
+        "text_document.completion.completion_item.snippet_support",
+        False,
+    )
+    # Lines are indexed by code points, like Jedi's columns
+    cursor = Position(line=params.position.line, character=jedi_lines[1])
+    char_before_cursor = pygls_utils.char_before_cursor(
+        document=document,
+        position=cursor,
+    )
+    char_after_cursor = pygls_utils.char_after_cursor(
+        document=document,
+        position=cursor,
+    )
+    completion_items = _jedi_request(
+        server,
+        document,
+        _completion_items,
+        jedi_lines,
+        snippet_support and not completion_options.disable_snippets,
+        completion_options.resolve_eagerly,
+        completion_options.ignore_patterns,
+        _choose_markup(server),
+        char_before_cursor,
+        char_after_cursor,
+    )
+    if server.jedi_workers is not None:
+        # Resolved by the worker that has the Jedi completions
+        for item in completion_items:
+            item.data = {"uri": document.uri}
+    return (
+        CompletionList(is_incomplete=False, items=completion_items)
+        if completion_items
+        else None
+    )
+
+
+def _completion_items(
+    jedi_script: Script,
+    jedi_lines: Tuple[int, int],
+    snippets: bool,
+    resolve_eagerly: bool,
+    ignore_patterns: List[Pattern[str]],
+    markup_kind: MarkupKind,
+    char_before_cursor: str,
+    char_after_cursor: str,
+) -> List[CompletionItem]:
+    """Get the completion items returned by `completion`."""
+    with instrumentation.jedi_call():
+        completions_jedi_raw = jedi_script.complete(*jedi_lines)
     if not ignore_patterns:
         # A performance optimization. ignore_patterns should usually be empty;
         # this special case avoid repeated filter checks for the usual case.
@@ -304,33 +703,17 @@ def completion(
             for comp in completions_jedi_raw
             if not any(i.match(comp.name) for i in ignore_patterns)
         )
-    snippet_support = get_capability(
-        server.client_capabilities,
-        "text_document.completion.completion_item.snippet_support",
-        False,
-    )
-    markup_kind = _choose_markup(server)
     is_import_context = jedi_utils.is_import(
         script_=jedi_script,
         line=jedi_lines[0],
         column=jedi_lines[1],
     )
-    enable_snippets = (
-        snippet_support and not snippet_disable and not is_import_context
-    )
-    char_before_cursor = pygls_utils.char_before_cursor(
-        document=server.workspace.get_text_document(params.text_document.uri),
-        position=params.position,
-    )
-    char_after_cursor = pygls_utils.char_after_cursor(
-        document=server.workspace.get_text_document(params.text_document.uri),
-        position=params.position,
-    )
+    enable_snippets = snippets and not is_import_context
     jedi_utils.clear_completions_cache()
     # number of characters in the string representation of the total number of
     # completions returned by jedi.
     total_completion_chars = len(str(len(completions_jedi_raw)))
-    completion_items = [
+    return [
         jedi_utils.lsp_completion_item(
             completion=completion,
             char_before_cursor=char_before_cursor,
@@ -343,17 +726,13 @@ def completion(
         for count, completion in enumerate(completions_jedi)
         if completion.type != "path"
     ]
-    return (
-        CompletionList(is_incomplete=False, items=completion_items)
-        if completion_items
-        else None
-    )
 
 
 @SERVER.feature(
     TEXT_DOCUMENT_SIGNATURE_HELP,
     SignatureHelpOptions(trigger_characters=["(", ","]),
 )
+@SERVER.thread()
 @notebook_utils.supports_notebooks
 def signature_help(
     server: JediLanguageServer, params: TextDocumentPositionParams
@@ -365,28 +744,30 @@ def signature_help(
     future.
     """
     document = server.workspace.get_text_document(params.text_document.uri)
-    jedi_script = jedi_utils.script(server.project, document)
-    jedi_lines = jedi_utils.line_column(params.position)
-    signatures_jedi = jedi_script.get_signatures(*jedi_lines)
+    jedi_lines = jedi_utils.line_column(params.position, document)
     markup_kind = _choose_markup(server)
-    signatures = [
-        SignatureInformation(
-            label=jedi_utils.signature_string(signature),
-            documentation=MarkupContent(
-                kind=markup_kind,
-                value=jedi_utils.convert_docstring(
-                    signature.docstring(raw=True),
-                    markup_kind,
+    with server.jedi_lock:
+        jedi_script = jedi_utils.script(server.projects, document)
+        with instrumentation.jedi_call():
+            signatures_jedi = jedi_script.get_signatures(*jedi_lines)
+        signatures = [
+            SignatureInformation(
+                label=jedi_utils.signature_string(signature),
+                documentation=MarkupContent(
+                    kind=markup_kind,
+                    value=jedi_utils.convert_docstring(
+                        signature.docstring(raw=True),
+                        markup_kind,
+                    ),
                 ),
-            ),
-            parameters=[
-                ParameterInformation(label=info.to_string())
-                for info in signature.params
-            ],
-            active_parameter=signature.index,
-        )
-        for signature in signatures_jedi
-    ]
+                parameters=[
+                    ParameterInformation(label=info.to_string())
+                    for info in signature.params
+                ],
+                active_parameter=signature.index,
+            )
+            for signature in signatures_jedi
+        ]
     return (
         SignatureHelp(
             signatures=signatures,
@@ -401,64 +782,89 @@ def signature_help(
 
 
 @SERVER.feature(TEXT_DOCUMENT_DECLARATION)
+@SERVER.thread()
 @notebook_utils.supports_notebooks
 def declaration(
     server: JediLanguageServer, params: TextDocumentPositionParams
 ) -> Optional[List[Location]]:
     """Support Goto Declaration."""
     document = server.workspace.get_text_document(params.text_document.uri)
-    jedi_script = jedi_utils.script(server.project, document)
-    jedi_lines = jedi_utils.line_column(params.position)
-    names = jedi_script.goto(*jedi_lines)
-    definitions = [
-        definition
-        for definition in (jedi_utils.lsp_location(name) for name in names)
-        if definition is not None
-    ]
+    jedi_lines = jedi_utils.line_column(params.position, document)
+    definitions = _jedi_request(
+        server,
+        document,
+        _locations,
+        "goto",
+        jedi_lines,
+        {},
+        server.workspace.position_codec.encoding,
+    )
     return definitions if definitions else None
 
 
 @SERVER.feature(TEXT_DOCUMENT_DEFINITION)
+@SERVER.thread()
 @notebook_utils.supports_notebooks
 def definition(
     server: JediLanguageServer, params: TextDocumentPositionParams
 ) -> Optional[List[Location]]:
     """Support Goto Definition."""
     document = server.workspace.get_text_document(params.text_document.uri)
-    jedi_script = jedi_utils.script(server.project, document)
-    jedi_lines = jedi_utils.line_column(params.position)
-    names = jedi_script.goto(
-        *jedi_lines,
-        follow_imports=True,
-        follow_builtin_imports=True,
+    jedi_lines = jedi_utils.line_column(params.position, document)
+    definitions = _jedi_request(
+        server,
+        document,
+        _locations,
+        "goto",
+        jedi_lines,
+        {"follow_imports": True, "follow_builtin_imports": True},
+        server.workspace.position_codec.encoding,
     )
-    definitions = [
-        definition
-        for definition in (jedi_utils.lsp_location(name) for name in names)
-        if definition is not None
-    ]
     return definitions if definitions else None
 
 
 @SERVER.feature(TEXT_DOCUMENT_TYPE_DEFINITION)
+@SERVER.thread()
 @notebook_utils.supports_notebooks
 def type_definition(
     server: JediLanguageServer, params: TextDocumentPositionParams
 ) -> Optional[List[Location]]:
     """Support Goto Type Definition."""
     document = server.workspace.get_text_document(params.text_document.uri)
-    jedi_script = jedi_utils.script(server.project, document)
-    jedi_lines = jedi_utils.line_column(params.position)
-    names = jedi_script.infer(*jedi_lines)
-    definitions = [
-        definition
-        for definition in (jedi_utils.lsp_location(name) for name in names)
-        if definition is not None
-    ]
+    jedi_lines = jedi_utils.line_column(params.position, document)
+    definitions = _jedi_request(
+        server,
+        document,
+        _locations,
+        "infer",
+        jedi_lines,
+        {},
+        server.workspace.position_codec.encoding,
+    )
     return definitions if definitions else None
 
 
+def _locations(
+    jedi_script: Script,
+    method: str,
+    jedi_lines: Tuple[int, int],
+    kwargs: Dict[str, Any],
+    encoding: str,
+) -> List[Location]:
+    """Get the locations of the names found by a method of a Jedi Script."""
+    with instrumentation.jedi_call():
+        names = getattr(jedi_script, method)(*jedi_lines, **kwargs)
+    return [
+        location
+        for location in (
+            jedi_utils.lsp_location(name, encoding) for name in names
+        )
+        if location is not None
+    ]
+
+
 @SERVER.feature(TEXT_DOCUMENT_DOCUMENT_HIGHLIGHT)
+@SERVER.thread()
 def highlight(
     server: JediLanguageServer, params: TextDocumentPositionParams
 ) -> Optional[List[DocumentHighlight]]:
@@ -470,34 +876,64 @@ def highlight(
     1. Getting assignment of current symbol (script.goto)
     2. Getting all names in the current script (script.get_names)
 
+    Every occurrence found is remembered until the document changes, so
+    moving the cursor between occurrences of an already highlighted symbol
+    does not search for references again.
+
     Finally, we only return names if there are more than 1. Otherwise, we don't
     want to highlight anything.
     """
     document = server.workspace.get_text_document(params.text_document.uri)
-    jedi_script = jedi_utils.script(server.project, document)
-    jedi_lines = jedi_utils.line_column(params.position)
-    names = jedi_script.get_references(*jedi_lines, scope="file")
-    lsp_ranges = [jedi_utils.lsp_range(name) for name in names]
+    occurrences = server.highlight_cache.get(document, dict)
+    position = params.position
+    highlight_stats = server.stats.cache("documentHighlight")
+    for start, end, highlights in occurrences.get(position.line, ()):
+        if start <= position.character <= end:
+            highlight_stats.record(True)
+            return highlights
+    highlight_stats.record(False)
+    jedi_lines = jedi_utils.line_column(position, document)
+    encoding = document.position_codec.encoding
+    with server.jedi_lock:
+        jedi_script = jedi_utils.script(server.projects, document)
+        with instrumentation.jedi_call():
+            names = jedi_script.get_references(*jedi_lines, scope="file")
+        lines = jedi_utils.script_lines(jedi_script)
+        lsp_ranges = [
+            jedi_utils.lsp_range(name, encoding, lines) for name in names
+        ]
     highlight_names = [
         DocumentHighlight(range=lsp_range)
         for lsp_range in lsp_ranges
         if lsp_range
     ]
+    for highlight_name in highlight_names:
+        start_position = highlight_name.range.start
+        occurrences.setdefault(start_position.line, []).append(
+            (
+                start_position.character,
+                highlight_name.range.end.character,
+                highlight_names,
+            )
+        )
     return highlight_names if highlight_names else None
 
 
 # Registered with HOVER dynamically
+@SERVER.thread()
 @notebook_utils.supports_notebooks
 def hover(
     server: JediLanguageServer, params: TextDocumentPositionParams
 ) -> Optional[Hover]:
     """Support Hover."""
     document = server.workspace.get_text_document(params.text_document.uri)
-    jedi_script = jedi_utils.script(server.project, document)
-    jedi_lines = jedi_utils.line_column(params.position)
+    jedi_lines = jedi_utils.line_column(params.position, document)
     markup_kind = _choose_markup(server)
-    hover_text = jedi_utils.hover_text(
-        jedi_script.help(*jedi_lines),
+    hover_text = _jedi_request(
+        server,
+        document,
+        _hover_text,
+        jedi_lines,
         markup_kind,
         server.initialization_options,
     )
@@ -508,25 +944,43 @@ def hover(
     return Hover(contents=contents, range=_range)
 
 
+def _hover_text(
+    jedi_script: Script,
+    jedi_lines: Tuple[int, int],
+    markup_kind: MarkupKind,
+    initialization_options: InitializationOptions,
+) -> Optional[str]:
+    """Get the text returned by `hover`."""
+    with instrumentation.jedi_call():
+        help_names = jedi_script.help(*jedi_lines)
+    return jedi_utils.hover_text(
+        help_names, markup_kind, initialization_options
+    )
+
+
 @SERVER.feature(TEXT_DOCUMENT_REFERENCES)
+@SERVER.thread()
 @notebook_utils.supports_notebooks
 def references(
     server: JediLanguageServer, params: TextDocumentPositionParams
 ) -> Optional[List[Location]]:
     """Obtain all references to text."""
     document = server.workspace.get_text_document(params.text_document.uri)
-    jedi_script = jedi_utils.script(server.project, document)
-    jedi_lines = jedi_utils.line_column(params.position)
-    names = jedi_script.get_references(*jedi_lines)
-    locations = [
-        location
-        for location in (jedi_utils.lsp_location(name) for name in names)
-        if location is not None
-    ]
+    jedi_lines = jedi_utils.line_column(params.position, document)
+    locations = _jedi_request(
+        server,
+        document,
+        _locations,
+        "get_references",
+        jedi_lines,
+        {},
+        server.workspace.position_codec.encoding,
+    )
     return locations if locations else None
 
 
 @SERVER.feature(TEXT_DOCUMENT_DOCUMENT_SYMBOL)
+@SERVER.thread()
 def document_symbol(
     server: JediLanguageServer, params: DocumentSymbolParams
 ) -> Optional[Union[List[DocumentSymbol], List[SymbolInformation]]]:
@@ -549,20 +1003,44 @@ def document_symbol(
     included for completeness.
     """
     document = server.workspace.get_text_document(params.text_document.uri)
-    jedi_script = jedi_utils.script(server.project, document)
-    names = jedi_script.get_names(all_scopes=True, definitions=True)
+
+    def compute() -> Optional[
+        Union[List[DocumentSymbol], List[SymbolInformation]]
+    ]:
+        with server.jedi_lock:
+            return _document_symbols(server, document)
+
+    return server.document_symbol_cache.get(document, compute)
+
+
+def _document_symbols(
+    server: JediLanguageServer, document: TextDocument
+) -> Optional[Union[List[DocumentSymbol], List[SymbolInformation]]]:
+    """Compute the symbols returned by `document_symbol`.
+
+    Must be called with jedi_lock held.
+    """
+    jedi_script = jedi_utils.script(server.projects, document)
+    with instrumentation.jedi_call():
+        names = jedi_script.get_names(all_scopes=True, definitions=True)
     if get_capability(
         server.client_capabilities,
         "text_document.document_symbol.hierarchical_document_symbol_support",
         False,
     ):
-        document_symbols = jedi_utils.lsp_document_symbols(names)
+        document_symbols = jedi_utils.lsp_document_symbols(
+            names,
+            jedi_utils.script_lines(jedi_script),
+            document.position_codec.encoding,
+        )
         return document_symbols if document_symbols else None
 
     symbol_information = [
         symbol_info
         for symbol_info in (
-            jedi_utils.lsp_symbol_information(name, document.uri)
+            jedi_utils.lsp_symbol_information(
+                name, document.position_codec.encoding, document.uri
+            )
             for name in names
             if name.type != "param"
         )
@@ -583,6 +1061,7 @@ def _ignore_folder(path_check: str, jedi_ignore_folders: List[str]) -> bool:
 
 
 @SERVER.feature(WORKSPACE_SYMBOL)
+@SERVER.thread()
 def workspace_symbol(
     server: JediLanguageServer, params: WorkspaceSymbolParams
 ) -> Optional[List[SymbolInformation]]:
@@ -592,56 +1071,163 @@ def workspace_symbol(
     the following symbols:
 
     1. Those that don't have a module_path associated with them (built-ins)
-    2. Those that are not rooted in the current workspace.
+    2. Those that are not rooted in a workspace folder.
     3. Those whose folders contain a directory that is ignored (.venv, etc)
+
+    Each folder is searched with its own project. Symbols of a folder nested
+    in another one are only returned by the project of the nested folder.
     """
-    if not server.project:
+    folder_projects = server.projects.items()
+    if not folder_projects:
         return None
-    names = server.project.complete_search(params.query)
-    workspace_root = server.workspace.root_path
     ignore_folders = (
         server.initialization_options.workspace.symbols.ignore_folders
     )
-    unignored_names = (
-        name
-        for name in names
-        if name.module_path is not None
-        and str(name.module_path).startswith(workspace_root)
-        and not _ignore_folder(str(name.module_path), ignore_folders)
-    )
-    _symbols = (
-        symbol
-        for symbol in (
-            jedi_utils.lsp_symbol_information(name) for name in unignored_names
-        )
-        if symbol is not None
-    )
     max_symbols = server.initialization_options.workspace.symbols.max_symbols
-    symbols = (
-        list(itertools.islice(_symbols, max_symbols))
-        if max_symbols > 0
-        else list(_symbols)
-    )
+    with server.jedi_lock:
+        with instrumentation.jedi_call():
+            searches = [
+                (folder, project.complete_search(params.query))
+                for folder, project in folder_projects
+            ]
+        unignored_names = (
+            name
+            for folder, names in searches
+            for name in names
+            if name.module_path is not None
+            and server.projects.folder_of(str(name.module_path)) == folder
+            and not _ignore_folder(str(name.module_path), ignore_folders)
+        )
+        _symbols = (
+            symbol
+            for symbol in (
+                jedi_utils.lsp_symbol_information(
+                    name, server.workspace.position_codec.encoding
+                )
+                for name in unignored_names
+            )
+            if symbol is not None
+        )
+        symbols = (
+            list(itertools.islice(_symbols, max_symbols))
+            if max_symbols > 0
+            else list(_symbols)
+        )
     return symbols if symbols else None
 
 
 @SERVER.feature(TEXT_DOCUMENT_RENAME)
+@SERVER.thread()
 @notebook_utils.supports_notebooks
 def rename(
     server: JediLanguageServer, params: RenameParams
 ) -> Optional[WorkspaceEdit]:
     """Rename a symbol across a workspace."""
     document = server.workspace.get_text_document(params.text_document.uri)
-    jedi_script = jedi_utils.script(server.project, document)
-    jedi_lines = jedi_utils.line_column(params.position)
+    jedi_lines = jedi_utils.line_column(params.position, document)
+    with server.jedi_lock:
+        jedi_script = jedi_utils.script(server.projects, document)
+        try:
+            with instrumentation.jedi_call():
+                refactoring = jedi_script.rename(
+                    *jedi_lines, new_name=params.new_name
+                )
+        except RefactoringError:
+            return None
+        changes = text_edit_utils.lsp_document_changes(
+            server.workspace, refactoring
+        )
+    return WorkspaceEdit(document_changes=changes) if changes else None
+
+
+_CODE_ACTION_INLINE = "inline"
+_CODE_ACTION_EXTRACT_VARIABLE = "extract_variable"
+_CODE_ACTION_EXTRACT_FUNCTION = "extract_function"
+
+_CODE_ACTIONS = [
+    _CODE_ACTION_INLINE,
+    _CODE_ACTION_EXTRACT_VARIABLE,
+    _CODE_ACTION_EXTRACT_FUNCTION,
+]
+
+
+def _code_action_stub(server: JediLanguageServer, action: str) -> CodeAction:
+    """Get a code action without its edit."""
+    options = server.initialization_options.code_action
+    if action == _CODE_ACTION_INLINE:
+        return CodeAction(
+            title="Inline variable", kind=CodeActionKind.RefactorInline
+        )
+    if action == _CODE_ACTION_EXTRACT_VARIABLE:
+        return CodeAction(
+            title="Extract expression into variable "
+            f"'{options.name_extract_variable}'",
+            kind=CodeActionKind.RefactorExtract,
+        )
+    return CodeAction(
+        title="Extract expression into function "
+        f"'{options.name_extract_function}'",
+        kind=CodeActionKind.RefactorExtract,
+    )
+
+
+def _code_action_applies(
+    jedi_script: Script,
+    document: TextDocument,
+    action: str,
+    code_range: Range,
+) -> bool:
+    """Cheap check ruling out code actions that would certainly fail."""
+    if action == _CODE_ACTION_INLINE:
+        return code_range.start.line == code_range.end.line and (
+            jedi_utils.is_inline_candidate(
+                jedi_script,
+                *jedi_utils.line_column(code_range.start, document),
+            )
+        )
+    return jedi_utils.is_extract_candidate(
+        jedi_script,
+        **jedi_utils.line_column_range(code_range, document),
+        statements=action == _CODE_ACTION_EXTRACT_FUNCTION,
+    )
+
+
+def _code_action_changes(
+    server: JediLanguageServer,
+    jedi_script: Script,
+    document: TextDocument,
+    action: str,
+    code_range: Range,
+    position_lookups: Dict[str, text_edit_utils.PositionLookup],
+) -> List[Union[TextDocumentEdit, RenameFile, CreateFile, DeleteFile]]:
+    """Run the Jedi refactoring behind a code action and convert its edits."""
+    options = server.initialization_options.code_action
+    if (
+        action == _CODE_ACTION_INLINE
+        and code_range.start.line != code_range.end.line
+    ):
+        return []
     try:
-        refactoring = jedi_script.rename(*jedi_lines, new_name=params.new_name)
-    except RefactoringError:
-        return None
-    changes = text_edit_utils.lsp_document_changes(
-        server.workspace, refactoring
+        with instrumentation.jedi_call():
+            if action == _CODE_ACTION_INLINE:
+                refactoring = jedi_script.inline(
+                    *jedi_utils.line_column(code_range.start, document)
+                )
+            elif action == _CODE_ACTION_EXTRACT_VARIABLE:
+                refactoring = jedi_script.extract_variable(
+                    new_name=options.name_extract_variable,
+                    **jedi_utils.line_column_range(code_range, document),
+                )
+            else:
+                refactoring = jedi_script.extract_function(
+                    new_name=options.name_extract_function,
+                    **jedi_utils.line_column_range(code_range, document),
+                )
+    except (RefactoringError, AttributeError, IndexError):
+        return []
+    return text_edit_utils.lsp_document_changes(
+        server.workspace, refactoring, position_lookups
     )
-    return WorkspaceEdit(document_changes=changes) if changes else None
 
 
 @SERVER.feature(
@@ -651,8 +1237,10 @@ def rename(
             CodeActionKind.RefactorInline,
             CodeActionKind.RefactorExtract,
         ],
+        resolve_provider=True,
     ),
 )
+@SERVER.thread()
 @notebook_utils.supports_notebooks
 def code_action(
     server: JediLanguageServer, params: CodeActionParams
@@ -663,6 +1251,11 @@ def code_action(
         1. Inline variable
         2. Extract variable
         3. Extract function
+
+    Clients request code actions on nearly every cursor move. If the client
+    can resolve the `edit` property lazily, we only return the actions that
+    pass a cheap syntactic check and leave running the actual refactoring to
+    `codeAction/resolve`.
     """
     # Code actions are not yet supported for notebooks.
     notebook = server.workspace.get_notebook_document(
@@ -672,82 +1265,96 @@ def code_action(
         return None
 
     document = server.workspace.get_text_document(params.text_document.uri)
-    jedi_script = jedi_utils.script(server.project, document)
+    resolve_edit = "edit" in get_capability(
+        server.client_capabilities,
+        "text_document.code_action.resolve_support.properties",
+        [],
+    )
     code_actions = []
-    jedi_lines = jedi_utils.line_column(params.range.start)
-    jedi_lines_extract = jedi_utils.line_column_range(params.range)
-
-    try:
-        if params.range.start.line != params.range.end.line:
-            # refactor this at some point; control flow with exception == bad
-            raise RefactoringError("inline only viable for single-line range")
-        inline_refactoring = jedi_script.inline(*jedi_lines)
-    except (RefactoringError, AttributeError, IndexError):
-        inline_changes = []
-    else:
-        inline_changes = text_edit_utils.lsp_document_changes(
-            server.workspace, inline_refactoring
-        )
-    if inline_changes:
-        code_actions.append(
-            CodeAction(
-                title="Inline variable",
-                kind=CodeActionKind.RefactorInline,
-                edit=WorkspaceEdit(
-                    document_changes=inline_changes,
-                ),
+    # Shared by all refactorings below, which all edit the same sources
+    position_lookups: Dict[str, text_edit_utils.PositionLookup] = {}
+    with server.jedi_lock:
+        jedi_script = jedi_utils.script(server.projects, document)
+        for action in _CODE_ACTIONS:
+            if resolve_edit:
+                if _code_action_applies(
+                    jedi_script, document, action, params.range
+                ):
+                    item = _code_action_stub(server, action)
+                    item.data = {
+                        "uri": params.text_document.uri,
+                        "version": document.version,
+                        "action": action,
+                        "range": cattrs.unstructure(params.range),
+                    }
+                    code_actions.append(item)
+                continue
+            changes = _code_action_changes(
+                server,
+                jedi_script,
+                document,
+                action,
+                params.range,
+                position_lookups,
             )
-        )
+            if changes:
+                item = _code_action_stub(server, action)
+                item.edit = WorkspaceEdit(document_changes=changes)
+                code_actions.append(item)
 
-    extract_var = (
-        server.initialization_options.code_action.name_extract_variable
-    )
-    try:
-        extract_variable_refactoring = jedi_script.extract_variable(
-            new_name=extract_var, **jedi_lines_extract
-        )
-    except (RefactoringError, AttributeError, IndexError):
-        extract_variable_changes = []
-    else:
-        extract_variable_changes = text_edit_utils.lsp_document_changes(
-            server.workspace, extract_variable_refactoring
-        )
-    if extract_variable_changes:
-        code_actions.append(
-            CodeAction(
-                title=f"Extract expression into variable '{extract_var}'",
-                kind=CodeActionKind.RefactorExtract,
-                edit=WorkspaceEdit(
-                    document_changes=extract_variable_changes,
-                ),
-            )
-        )
+    return code_actions if code_actions else None
 
-    extract_func = (
-        server.initialization_options.code_action.name_extract_function
-    )
+
+@SERVER.feature(CODE_ACTION_RESOLVE)
+@SERVER.thread()
+def code_action_resolve(
+    server: JediLanguageServer, params: CodeAction
+) -> CodeAction:
+    """Compute the edit of a code action returned by `code_action`.
+
+    The action is returned without an edit, and the reason logged, if it
+    was not returned by `code_action`, if its document changed since, or
+    if the refactoring fails.
+    """
+    data = params.data
     try:
-        extract_function_refactoring = jedi_script.extract_function(
-            new_name=extract_func, **jedi_lines_extract
+        uri, version, action = data["uri"], data["version"], data["action"]
+        code_range = cattrs.structure(data["range"], Range)
+    except (TypeError, KeyError, ValueError, cattrs.BaseValidationError):
+        action = None
+    if action not in _CODE_ACTIONS:
+        return _code_action_unresolved(
+            server, params, "it was not returned by jedi-language-server"
         )
-    except (RefactoringError, AttributeError, IndexError):
-        extract_function_changes = []
-    else:
-        extract_function_changes = text_edit_utils.lsp_document_changes(
-            server.workspace, extract_function_refactoring
+    document = server.workspace.get_text_document(uri)
+    if document.version != version:
+        return _code_action_unresolved(
+            server, params, f"{uri} changed since it was returned"
         )
-    if extract_function_changes:
-        code_actions.append(
-            CodeAction(
-                title=f"Extract expression into function '{extract_func}'",
-                kind=CodeActionKind.RefactorExtract,
-                edit=WorkspaceEdit(
-                    document_changes=extract_function_changes,
-                ),
-            )
+    with server.jedi_lock:
+        jedi_script = jedi_utils.script(server.projects, document)
+        changes = _code_action_changes(
+            server, jedi_script, document, action, code_range, {}
+        )
+    if not changes:
+        return _code_action_unresolved(
+            server, params, "the refactoring does not apply"
         )
+    params.edit = WorkspaceEdit(document_changes=changes)
+    return params
 
-    return code_actions if code_actions else None
+
+def _code_action_unresolved(
+    server: JediLanguageServer, params: CodeAction, reason: str
+) -> CodeAction:
+    """Log why a code action has no edit and return it as is."""
+    server.window_log_message(
+        LogMessageParams(
+            type=MessageType.Warning,
+            message=f"Cannot resolve code action '{params.title}': {reason}",
+        )
+    )
+    return params
 
 
 @SERVER.feature(WORKSPACE_DID_CHANGE_CONFIGURATION)
@@ -762,6 +1369,23 @@ def did_change_configuration(
     """
 
 
+@SERVER.feature(WORKSPACE_DID_CHANGE_WORKSPACE_FOLDERS)
+def did_change_workspace_folders(
+    server: JediLanguageServer,
+    params: DidChangeWorkspaceFoldersParams,
+) -> None:
+    """Implement event for workspace/didChangeWorkspaceFolders.
+
+    pygls already updated the folders of the workspace. Projects are created
+    for the added folders and dropped for the removed ones; the projects of
+    the other folders are kept, with their caches.
+    """
+    folders = _workspace_folders(server)
+    server.projects.set_folders(folders)
+    if server.jedi_workers is not None:
+        server.jedi_workers.set_folders(folders)
+
+
 EncodedSemanticToken = NamedTuple(
     "EncodedSemanticToken",
     [
@@ -781,7 +1405,7 @@ See the LSP spec for details:
 
 
 def _raw_semantic_token(
-    server: JediLanguageServer, n: Name
+    n: Name, name_range: Range, debug_messages: List[str]
 ) -> Union[EncodedSemanticToken, None]:
     """Find an appropriate semantic token for the name.
 
@@ -794,6 +1418,8 @@ def _raw_semantic_token(
     length 5 array of integers where the elements are the line number, starting
     character, length, token index, and modifiers (as an integer whose binary
     representation has bits set at the indices of all applicable modifiers).
+    The position and length are taken from the LSP range of the name. Debug
+    messages are appended to debug_messages, to be logged by the server.
     """
     definitions: list[Name] = n.goto(
         follow_imports=True,
@@ -802,11 +1428,8 @@ def _raw_semantic_token(
         prefer_stubs=False,
     )
     if not definitions:
-        server.window_log_message(
-            LogMessageParams(
-                type=MessageType.Debug,
-                message=f"no definitions found for name \"{n.description}\" of type '{n.type}' ({n.line}:{n.column})",
-            )
+        debug_messages.append(
+            f"no definitions found for name \"{n.description}\" of type '{n.type}' ({n.line}:{n.column})"
         )
         return None
 
@@ -818,23 +1441,23 @@ def _raw_semantic_token(
             f"multiple definitions found for name \"{n.description}\" of type '{n.type}' ({n.line}:{n.column}):\n"
             f" {def_lines}"
         )
-        server.window_log_message(
-            LogMessageParams(type=MessageType.Debug, message=msg)
-        )
+        debug_messages.append(msg)
 
     definition, *_ = definitions
     definition_type = SEMANTIC_TO_TOKEN_ID.get(definition.type, None)
     if definition_type is None:
-        server.window_log_message(
-            LogMessageParams(
-                type=MessageType.Debug,
-                message=f"no matching semantic token for \"{n.description}\" of type '{n.type}' ({n.line}:{n.column})",
-            )
+        debug_messages.append(
+            f"no matching semantic token for \"{n.description}\" of type '{n.type}' ({n.line}:{n.column})"
         )
         return None
 
+    start, end = name_range.start, name_range.end
     return EncodedSemanticToken(
-        n.line - 1, n.column, len(n.name), definition_type, 0
+        start.line,
+        start.character,
+        end.character - start.character,
+        definition_type,
+        0,
     )
 
 
@@ -842,9 +1465,8 @@ def _raw_semantic_token(
 def semantic_tokens_full(
     server: JediLanguageServer, params: SemanticTokensParams
 ) -> SemanticTokens:
-    """Thin wrap around  _semantic_tokens_range()."""
+    """Thin wrap around  _semantic_tokens()."""
     document = server.workspace.get_text_document(params.text_document.uri)
-    jedi_script = jedi_utils.script(server.project, document)
 
     server.window_log_message(
         LogMessageParams(
@@ -853,9 +1475,9 @@ def semantic_tokens_full(
         )
     )
 
-    return _semantic_tokens_range(
+    return _semantic_tokens(
         server,
-        jedi_script,
+        document,
         Range(Position(0, 0), Position(INTEGER_MAX_VALUE, INTEGER_MAX_VALUE)),
     )
 
@@ -864,9 +1486,8 @@ def semantic_tokens_full(
 def semantic_tokens_range(
     server: JediLanguageServer, params: SemanticTokensRangeParams
 ) -> SemanticTokens:
-    """Thin wrap around  _semantic_tokens_range()."""
+    """Thin wrap around  _semantic_tokens()."""
     document = server.workspace.get_text_document(params.text_document.uri)
-    jedi_script = jedi_utils.script(server.project, document)
 
     server.window_log_message(
         LogMessageParams(
@@ -875,28 +1496,52 @@ def semantic_tokens_range(
         )
     )
 
-    return _semantic_tokens_range(server, jedi_script, params.range)
+    return _semantic_tokens(server, document, params.range)
 
 
-def _semantic_tokens_range(
-    server: JediLanguageServer, jedi_script: Script, doc_range: Range
+def _semantic_tokens(
+    server: JediLanguageServer, document: TextDocument, doc_range: Range
 ) -> SemanticTokens:
-    """General purpose function to do full / range semantic tokens."""
-    line, column = doc_range.start.line, doc_range.start.character
-    names = jedi_script.get_names(
-        all_scopes=True, definitions=True, references=True
+    """Get the semantic tokens of a range and log the debug messages."""
+    tokens, debug_messages = _jedi_request(
+        server,
+        document,
+        _semantic_tokens_range,
+        doc_range,
+        document.position_codec.encoding,
     )
+    for message in debug_messages:
+        server.window_log_message(
+            LogMessageParams(type=MessageType.Debug, message=message)
+        )
+    return tokens
+
+
+def _semantic_tokens_range(
+    jedi_script: Script, doc_range: Range, encoding: str
+) -> Tuple[SemanticTokens, List[str]]:
+    """General purpose function to do full / range semantic tokens.
+
+    Also returns the debug messages of `_raw_semantic_token`.
+    """
+    line, column = doc_range.start.line, doc_range.start.character
+    with instrumentation.jedi_call():
+        names = jedi_script.get_names(
+            all_scopes=True, definitions=True, references=True
+        )
+    lines = jedi_utils.script_lines(jedi_script)
     data: list[int] = []
+    debug_messages: List[str] = []
 
     for n in names:
+        name_range = jedi_utils.lsp_range(n, encoding, lines)
         if (
-            not doc_range.start
-            < Position(n.line - 1, n.column)
-            < doc_range.end
+            name_range is None
+            or not doc_range.start < name_range.start < doc_range.end
         ):
             continue
 
-        token = _raw_semantic_token(server, n)
+        token = _raw_semantic_token(n, name_range, debug_messages)
 
         if token is None:
             continue
@@ -920,19 +1565,414 @@ def _semantic_tokens_range(
             ]
         )
 
-    return SemanticTokens(data=data)
+    return SemanticTokens(data=data), debug_messages
+
+
+# Result ids are only compared with those of the same server process: the
+# prefix keeps a client from matching an id of a previous process
+_DIAGNOSTIC_RESULT_ID_PREFIX = uuid.uuid4().hex
+_diagnostic_result_ids = itertools.count()
 
 
 # Static capability or initializeOptions functions that rely on a specific
 # client capability or user configuration. These are associated with
 # JediLanguageServer within JediLanguageServerProtocol.lsp_initialize
-@jedi_utils.debounce(1, keyed_by="uri")
+def _diagnostics(
+    server: JediLanguageServer, document: TextDocument, filename: str
+) -> Tuple[str, List[Diagnostic]]:
+    """Get the diagnostics of a document and their result id.
+
+    The result id identifies the diagnostics of one document version, which
+    are reused until the document changes. The time the check takes is
+    recorded in server.diagnostic_durations and logged at debug level.
+    """
+
+    def compute() -> Tuple[str, List[Diagnostic]]:
+        start = time.perf_counter()
+        if server.initialization_options.diagnostics.backend == "parso":
+            with server.jedi_lock:
+                diagnostics = jedi_utils.lsp_diagnostics(
+                    jedi_utils.script(server.projects, document),
+                    document.position_codec.encoding,
+                )
+        else:
+            diagnostic = jedi_utils.lsp_python_diagnostic(
+                filename, document.source, document.position_codec.encoding
+            )
+            diagnostics = [diagnostic] if diagnostic else []
+        duration = time.perf_counter() - start
+        server.diagnostic_durations[document.uri] = duration
+        logger.debug(
+            "Checked %s (version %s) in %.1f ms",
+            document.uri,
+            document.version,
+            duration * 1000,
+        )
+        result_id = (
+            f"{_DIAGNOSTIC_RESULT_ID_PREFIX}-{next(_diagnostic_result_ids)}"
+        )
+        return result_id, diagnostics
+
+    return server.diagnostic_cache.get(document, compute)
+
+
+@SERVER.thread()
+def document_diagnostic(
+    server: JediLanguageServer, params: DocumentDiagnosticParams
+) -> DocumentDiagnosticReport:
+    """Support pull diagnostics (textDocument/diagnostic).
+
+    Used instead of publishing diagnostics when the client supports it, so
+    only the documents the client asks for are compiled. If the document did
+    not change since the client's previous pull, we report it as unchanged.
+    """
+    uri = params.text_document.uri
+    document = server.workspace.get_text_document(uri)
+    filename = (
+        notebook_utils.cell_filename(server.workspace, uri)
+        if server.workspace.get_notebook_document(cell_uri=uri)
+        else uri
+    )
+    result_id, diagnostics = _diagnostics(server, document, filename)
+    if params.previous_result_id == result_id:
+        return RelatedUnchangedDocumentDiagnosticReport(result_id=result_id)
+    return RelatedFullDocumentDiagnosticReport(
+        items=diagnostics, result_id=result_id
+    )
+
+
+_WORKSPACE_DIAGNOSTIC_BATCH_SIZE = 100
+
+
+@SERVER.thread()
+def workspace_diagnostic(
+    server: JediLanguageServer, params: WorkspaceDiagnosticParams
+) -> WorkspaceDiagnosticReport:
+    """Support workspace pull diagnostics (workspace/diagnostic).
+
+    Opt-in with `diagnostics.workspace`. Compiles every Python file of the
+    workspace that is not open in the client, skipping the folders of
+    `workspace.symbols.ignoreFolders`. Only files changed since the previous
+    pull are compiled again. If the client passes a partial result token,
+    all reports are streamed in batches as files are checked, and the
+    response itself is empty.
+    """
+    folders = server.projects.folders
+    if not folders:
+        return WorkspaceDiagnosticReport(items=[])
+    ignore_folders = set(
+        server.initialization_options.workspace.symbols.ignore_folders
+    )
+    previous_result_ids = {
+        previous.uri: previous.value for previous in params.previous_result_ids
+    }
+    reports: List[WorkspaceDocumentDiagnosticReport] = []
+    checked_uris = set()
+    results = server.workspace_diagnostics.check(
+        folders,
+        ignore_folders,
+        skip_uris=server.workspace.text_documents,
+        backend=server.initialization_options.diagnostics.backend,
+        encoding=server.workspace.position_codec.encoding,
+    )
+    for result in results:
+        checked_uris.add(result.uri)
+        if previous_result_ids.get(result.uri) == result.result_id:
+            reports.append(
+                WorkspaceUnchangedDocumentDiagnosticReport(
+                    uri=result.uri, version=None, result_id=result.result_id
+                )
+            )
+        else:
+            reports.append(
+                WorkspaceFullDocumentDiagnosticReport(
+                    uri=result.uri,
+                    version=None,
+                    items=result.diagnostics,
+                    result_id=result.result_id,
+                )
+            )
+        if (
+            params.partial_result_token is not None
+            and len(reports) >= _WORKSPACE_DIAGNOSTIC_BATCH_SIZE
+        ):
+            _workspace_diagnostic_progress(server, params, reports)
+            reports = []
+
+    # Clear the diagnostics of files that were deleted since. Files opened
+    # since are left alone: the client pulls their diagnostics itself.
+    for uri in previous_result_ids.keys() - checked_uris:
+        if uri not in server.workspace.text_documents:
+            reports.append(
+                WorkspaceFullDocumentDiagnosticReport(
+                    uri=uri, version=None, items=[]
+                )
+            )
+    if params.partial_result_token is not None:
+        # The response must be empty once results were streamed
+        if reports:
+            _workspace_diagnostic_progress(server, params, reports)
+        return WorkspaceDiagnosticReport(items=[])
+    return WorkspaceDiagnosticReport(items=reports)
+
+
+def _workspace_diagnostic_progress(
+    server: JediLanguageServer,
+    params: WorkspaceDiagnosticParams,
+    reports: List[WorkspaceDocumentDiagnosticReport],
+) -> None:
+    """Stream reports with the partial result token of a request."""
+    server.progress(
+        ProgressParams(
+            token=params.partial_result_token,
+            value=WorkspaceDiagnosticReportPartialResult(items=reports),
+        )
+    )
+
+
+JEDI_STATS = "$/jedi/stats"
+
+
+@SERVER.feature(JEDI_STATS)
+def jedi_stats(server: JediLanguageServer, *args: Any) -> Dict[str, Any]:
+    """Get the latency, cache and memory statistics of the server.
+
+    Durations are in milliseconds, per LSP method and kind of duration (see
+    the instrumentation module). See the memory module for memory use.
+    """
+    summary = server.stats.summary()
+    summary["memory"] = memory.summary(server.memory_limit)
+    if server.jedi_workers is not None:
+        summary["memory"]["workersRecycled"] = server.jedi_workers.recycled
+    return summary
+
+
+JEDI_CLEAR_CACHES = "jedi.clearCaches"
+JEDI_RELOAD_ENVIRONMENT = "jedi.reloadEnvironment"
+JEDI_WARM_MODULES = "jedi.warmModules"
+
+
+def _clear_caches(server: JediLanguageServer) -> Dict[str, Any]:
+    """Drop Jedi's caches in the server and its workers, and its own."""
+    result = memory.clear_jedi_caches()
+    server.clear_document_caches()
+    if server.jedi_workers is not None:
+        for worker in server.jedi_workers.broadcast(memory.clear_jedi_caches):
+            result["jediModules"] += worker["jediModules"]
+            if result["freedBytes"] is not None:
+                if worker["freedBytes"] is None:
+                    result["freedBytes"] = None
+                else:
+                    result["freedBytes"] += worker["freedBytes"]
+    return result
+
+
+@SERVER.command(JEDI_CLEAR_CACHES)
+@SERVER.thread()
+def clear_caches(server: JediLanguageServer, *args: Any) -> Dict[str, Any]:
+    """Drop all caches, so that modules are parsed again from disk.
+
+    Returns the number of parse trees dropped as jediModules, the bytes
+    freed (see memory.clear_jedi_caches) and the duration in milliseconds.
+    """
+    start = time.perf_counter()
+    result = _clear_caches(server)
+    result["milliseconds"] = (time.perf_counter() - start) * 1000
+    return result
+
+
+@SERVER.command(JEDI_RELOAD_ENVIRONMENT)
+@SERVER.thread()
+def reload_environment(
+    server: JediLanguageServer, *args: Any
+) -> Dict[str, Any]:
+    """Find the Python environment again and drop all caches.
+
+    Use after installing or removing packages. Like jedi.clearCaches, also
+    returns the executable of the environment.
+    """
+    start = time.perf_counter()
+    result = _clear_caches(server)
+    with server.jedi_lock:
+        server.projects = _create_projects(server)
+        workers: Optional[Future] = None
+        if server.jedi_workers is not None:
+            server.jedi_workers.restart(server.projects)
+            workers = server.thread_pool.submit(
+                server.jedi_workers.broadcast,
+                jedi_workers.prepare,
+                [],
+                start=True,
+            )
+        environment = jedi_utils.warm_environment(server.projects.default)
+    result["environment"] = environment.executable
+    if workers is not None:
+        workers.result()
+    result["milliseconds"] = (time.perf_counter() - start) * 1000
+    return result
+
+
+def _warm_module(server: JediLanguageServer, name: str) -> Optional[float]:
+    """Load a module into the server's Jedi caches.
+
+    Returns the milliseconds it took, None if the module was not found.
+    """
+    start = time.perf_counter()
+    with server.jedi_lock:
+        found = jedi_utils.warm_module(server.projects.default, name)
+    if not found:
+        return None
+    return (time.perf_counter() - start) * 1000
+
+
+@SERVER.command(JEDI_WARM_MODULES)
+@SERVER.thread()
+def warm_modules(server: JediLanguageServer, *names: str) -> Dict[str, Any]:
+    """Load modules into Jedi's caches, so that first requests are fast.
+
+    Takes dotted module names. Returns the milliseconds each module took to
+    load in the server process, null for those not found, and the total
+    duration, including the workers.
+    """
+    start = time.perf_counter()
+    modules = {name: _warm_module(server, name) for name in names}
+    if server.jedi_workers is not None:
+        server.jedi_workers.broadcast(
+            jedi_workers.warm_modules, list(names), start=True
+        )
+    return {
+        "modules": modules,
+        "jediModules": memory.jedi_module_count(),
+        "milliseconds": (time.perf_counter() - start) * 1000,
+    }
+
+
+_PRELOAD_PROGRESS_TOKEN = "jedi-language-server/preloadModules"
+
+
+def _warm_environment(server: JediLanguageServer) -> None:
+    """Start the Python environment of the server, logging any error."""
+    start = time.perf_counter()
+    try:
+        with server.jedi_lock:
+            environment = jedi_utils.warm_environment(server.projects.default)
+    except InvalidPythonEnvironment as error:
+        server.window_log_message(
+            LogMessageParams(type=MessageType.Error, message=str(error))
+        )
+        return
+    logger.info(
+        "Started the Python environment %s in %.0f ms",
+        environment.executable,
+        (time.perf_counter() - start) * 1000,
+    )
+
+
+def _preload_modules(server: JediLanguageServer, names: List[str]) -> None:
+    """Load modules into the server's caches, reporting progress."""
+    progress = server.work_done_progress
+    report = get_capability(
+        server.client_capabilities, "window.work_done_progress", False
+    )
+    if report:
+        try:
+            progress.create(_PRELOAD_PROGRESS_TOKEN).result()
+        except Exception:
+            logger.exception("Could not create the preload progress")
+            report = False
+    if report:
+        progress.begin(
+            _PRELOAD_PROGRESS_TOKEN,
+            WorkDoneProgressBegin(title="Preloading modules", percentage=0),
+        )
+    not_found = []
+    for index, name in enumerate(names):
+        if report:
+            progress.report(
+                _PRELOAD_PROGRESS_TOKEN,
+                WorkDoneProgressReport(
+                    message=name, percentage=index * 100 // len(names)
+                ),
+            )
+        duration = _warm_module(server, name)
+        if duration is None:
+            not_found.append(name)
+        else:
+            logger.info("Preloaded %s in %.0f ms", name, duration)
+    if not_found:
+        logger.warning("Could not preload %s", ", ".join(not_found))
+    if report:
+        progress.end(
+            _PRELOAD_PROGRESS_TOKEN,
+            WorkDoneProgressEnd(
+                message=f"Preloaded {len(names) - len(not_found)} modules"
+            ),
+        )
+
+
+@SERVER.feature(INITIALIZED)
+@SERVER.thread()
+def initialized(server: JediLanguageServer, params: InitializedParams) -> None:
+    """Prepare Jedi in the background once the client is initialized.
+
+    Starts the Python environment, so that the first request does not wait
+    for its interpreter, then preloads the modules of
+    `jediSettings.preloadModules`. The workers do the same in parallel.
+    """
+    names = server.initialization_options.jedi_settings.preload_modules
+    workers: Optional[Future] = None
+    if server.jedi_workers is not None:
+        workers = server.thread_pool.submit(
+            server.jedi_workers.broadcast,
+            jedi_workers.prepare,
+            list(names),
+            start=True,
+        )
+    _warm_environment(server)
+    if names:
+        _preload_modules(server, names)
+    if workers is not None:
+        workers.result()
+
+
+@SERVER.feature(SHUTDOWN)
+def shutdown(server: JediLanguageServer, *args) -> None:
+    """Stop the worker processes on shutdown."""
+    server.jedi_thread.shutdown(wait=False, cancel_futures=True)
+    server.workspace_diagnostics.shutdown()
+    if server.jedi_workers is not None:
+        server.jedi_workers.shutdown()
+
+
+_DEBOUNCE_COMPILE_FACTOR = 5
+"""How many times the last compile duration to wait before compiling again."""
+
+
+def _diagnostics_debounce_interval(
+    server: JediLanguageServer, uri: str, filename: Optional[str] = None
+) -> float:
+    """Get the seconds to wait before publishing a document's diagnostics.
+
+    Documents that compile quickly get feedback sooner; documents that take
+    long to compile are compiled less often while the user types. The
+    interval stays between `diagnostics.debounceMin` and
+    `diagnostics.debounceMax`.
+    """
+    options = server.initialization_options.diagnostics
+    duration = server.diagnostic_durations.get(uri, 0.0)
+    return min(
+        max(_DEBOUNCE_COMPILE_FACTOR * duration, options.debounce_min),
+        options.debounce_max,
+    )
+
+
+@jedi_utils.debounce(_diagnostics_debounce_interval, keyed_by="uri")
 def _publish_diagnostics(
     server: JediLanguageServer, uri: str, filename: Optional[str] = None
 ) -> None:
     """Helper function to publish diagnostics for a file."""
-    # The debounce decorator delays the execution by 1 second
-    # canceling notifications that happen in that interval.
+    # The debounce decorator delays the execution by an interval adapted to
+    # the document, canceling notifications that happen in that interval.
     # Since this function is executed after a delay, we need to check
     # whether the document still exists
     if uri not in server.workspace.text_documents:
@@ -941,8 +1981,7 @@ def _publish_diagnostics(
         filename = uri
 
     doc = server.workspace.get_text_document(uri)
-    diagnostic = jedi_utils.lsp_python_diagnostic(filename, doc.source)
-    diagnostics = [diagnostic] if diagnostic else []
+    _, diagnostics = _diagnostics(server, doc, filename)
 
     server.text_document_publish_diagnostics(
         PublishDiagnosticsParams(
@@ -1001,6 +2040,7 @@ def did_close_diagnostics(
     server: JediLanguageServer, params: DidCloseTextDocumentParams
 ) -> None:
     """Actions run on textDocument/didClose: diagnostics."""
+    server.forget_document(params.text_document.uri)
     _clear_diagnostics(server, params.text_document.uri)
 
 
@@ -1009,6 +2049,7 @@ def did_close_default(
     params: DidCloseTextDocumentParams,
 ) -> None:
     """Actions run on textDocument/didClose: default."""
+    server.forget_document(params.text_document.uri)
 
 
 # NOTEBOOK_DOCUMENT_DID_SAVE
@@ -1091,6 +2132,7 @@ def did_close_notebook_diagnostics(
 ) -> None:
     """Actions run on notebookDocument/didClose: diagnostics."""
     for text_document in params.cell_text_documents:
+        server.forget_document(text_document.uri)
         _clear_diagnostics(server, text_document.uri)
 
 
@@ -1099,6 +2141,8 @@ def did_close_notebook_default(
     params: DidCloseNotebookDocumentParams,
 ) -> None:
     """Actions run on notebookDocument/didClose: default."""
+    for text_document in params.cell_text_documents:
+        server.forget_document(text_document.uri)
 
 
 def _clear_diagnostics(server: JediLanguageServer, uri: str) -> None:
@@ -1113,6 +2157,20 @@ def _publish_cell_diagnostics(server: JediLanguageServer, uri: str) -> None:
     return _publish_diagnostics(server, uri, filename)
 
 
+def _choose_position_encoding(
+    client_capabilities: ClientCapabilities,
+) -> PositionEncodingKind:
+    """Returns UTF-32 if the client supports it, else the default UTF-16."""
+    position_encodings = get_capability(
+        client_capabilities, "general.position_encodings", []
+    )
+    return (
+        PositionEncodingKind.Utf32
+        if PositionEncodingKind.Utf32 in position_encodings
+        else PositionEncodingKind.Utf16
+    )
+
+
 def _choose_markup(server: JediLanguageServer) -> MarkupKind:
     """Returns the preferred or first of supported markup kinds."""
     markup_preferred = server.initialization_options.markup_kind_preferred
@@ -0,0 +1,169 @@
+"""Log of slow requests, to reproduce them offline.
+
+Handlers running longer than a threshold are sampled: a single thread takes
+the stack of each slow handler every few milliseconds. The thread sleeps
+while no handler runs. When the handler
+finishes, its method, duration, parameters, and stack samples are written as
+one JSON line to a rotating log file. Handlers faster than the threshold are
+never sampled, so they cost little more than a dictionary update.
+"""
+
+import contextlib
+import json
+import logging
+import logging.handlers
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Iterator, Optional
+
+from .instrumentation import collapse_stack
+
+_MAX_BYTES = 1_000_000
+_BACKUP_COUNT = 3
+_SAMPLE_INTERVAL_S = 0.01
+
+
+class _Request:
+    """A handler running on a thread."""
+
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.stacks: Counter[str] = Counter()
+
+
+class SlowRequestLog:
+    """Write the handlers slower than threshold_s seconds to path."""
+
+    def __init__(self, path: str, threshold_s: float) -> None:
+        self.threshold_s = threshold_s
+        self._logger = logging.getLogger(f"{__name__}.{id(self)}")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        self._logger.addHandler(
+            logging.handlers.RotatingFileHandler(
+                path, maxBytes=_MAX_BYTES, backupCount=_BACKUP_COUNT
+            )
+        )
+        self._requests: Dict[int, _Request] = {}
+        self._condition = threading.Condition()
+        self._closed = False
+        self._sampler = threading.Thread(
+            target=self._sample, name="slow-request-sampler", daemon=True
+        )
+        self._sampler.start()
+
+    def _next_sample_s(self) -> Optional[float]:
+        """Get the seconds until the next sample, None without requests.
+
+        Must be called with the condition held.
+        """
+        if not self._requests:
+            return None
+        first_start = min(request.start for request in self._requests.values())
+        return max(
+            first_start + self.threshold_s - time.perf_counter(),
+            _SAMPLE_INTERVAL_S,
+        )
+
+    def _sample(self) -> None:
+        """Take the stacks of the handlers running longer than the threshold.
+
+        Waits without a timeout while no handler runs.
+        """
+        while True:
+            with self._condition:
+                self._condition.wait(self._next_sample_s())
+                if self._closed:
+                    return
+                now = time.perf_counter()
+                slow = {
+                    thread_id: request
+                    for thread_id, request in self._requests.items()
+                    if now - request.start > self.threshold_s
+                }
+            if not slow:
+                continue
+            frames = sys._current_frames()
+            stacks = {
+                thread_id: collapse_stack(frames[thread_id])
+                for thread_id in slow
+                if thread_id in frames
+            }
+            del frames
+            with self._condition:
+                for thread_id, stack in stacks.items():
+                    if self._requests.get(thread_id) is slow[thread_id]:
+                        slow[thread_id].stacks[stack] += 1
+
+    def close(self) -> None:
+        """Stop the sampler thread and close the log file."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._sampler.join()
+        for handler in self._logger.handlers[:]:
+            self._logger.removeHandler(handler)
+            handler.close()
+
+    @contextlib.contextmanager
+    def watch(self, method: str, details: Dict[str, Any]) -> Iterator[None]:
+        """Log the handler running in the block if it is slow.
+
+        details describe the request, like its document and position.
+        """
+        thread_id = threading.get_ident()
+        request = _Request()
+        with self._condition:
+            previous = self._requests.get(thread_id)
+            if not self._requests:
+                # The sampler waits for the first request
+                self._condition.notify()
+            self._requests[thread_id] = request
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - request.start
+            with self._condition:
+                if previous is None:
+                    del self._requests[thread_id]
+                else:
+                    self._requests[thread_id] = previous
+            if duration > self.threshold_s:
+                self._logger.info(
+                    json.dumps(
+                        {
+                            "method": method,
+                            "durationMs": round(1000 * duration, 3),
+                            **details,
+                            "stacks": dict(request.stacks.most_common()),
+                        }
+                    )
+                )
+
+
+def request_details(server: Any, params: Any) -> Dict[str, Any]:
+    """Describe the document and position of request parameters."""
+    details: Dict[str, Any] = {}
+    text_document = getattr(params, "text_document", None)
+    uri: Optional[str] = getattr(text_document, "uri", None)
+    if uri is not None:
+        details["uri"] = uri
+        document = server.workspace.text_documents.get(uri)
+        if document is not None:
+            details["documentSize"] = len(document.source)
+    position = getattr(params, "position", None)
+    if position is not None:
+        details["position"] = _position(position)
+    range_ = getattr(params, "range", None)
+    if range_ is not None:
+        details["range"] = {
+            "start": _position(range_.start),
+            "end": _position(range_.end),
+        }
+    return details
+
+
+def _position(position: Any) -> Dict[str, int]:
+    return {"line": position.line, "character": position.character}
@@ -6,8 +6,9 @@ This module is a bridge between `jedi.Refactoring` and
 
 import ast
 import difflib
+import functools
 from bisect import bisect_right
-from typing import Iterator, List, NamedTuple, Union
+from typing import Dict, Iterator, List, NamedTuple, Optional, Union
 
 from jedi.api.refactoring import ChangedFile, Refactoring
 from lsprotocol.types import (
@@ -24,11 +25,17 @@ from lsprotocol.types import (
 )
 from pygls.workspace import Workspace
 
-from . import notebook_utils
+from . import jedi_utils, notebook_utils
 
 
+@functools.lru_cache(maxsize=32)
 def is_valid_python(code: str) -> bool:
-    """Check whether Python code is syntactically valid."""
+    """Check whether Python code is syntactically valid.
+
+    Only an AST is built; no bytecode is generated. Results are cached by
+    source content because clients request code actions on every cursor
+    move, so the same refactored code is validated over and over again.
+    """
     try:
         ast.parse(code)
     except SyntaxError:
@@ -39,12 +46,17 @@ def is_valid_python(code: str) -> bool:
 def lsp_document_changes(
     workspace: Workspace,
     refactoring: Refactoring,
+    position_lookups: Optional[Dict[str, "PositionLookup"]] = None,
 ) -> List[Union[TextDocumentEdit, RenameFile, CreateFile, DeleteFile]]:
     """Get lsp text document edits from Jedi refactoring.
 
     This is the main public function that you probably want
+
+    `position_lookups` maps uris to the `PositionLookup` of their current
+    source. Pass the same dictionary when converting several refactorings of
+    the same documents to avoid re-indexing their sources.
     """
-    converter = RefactoringConverter(workspace, refactoring)
+    converter = RefactoringConverter(workspace, refactoring, position_lookups)
     return [
         *converter.lsp_text_document_edits(),
         *converter.lsp_renames(),
@@ -54,9 +66,17 @@ def lsp_document_changes(
 class RefactoringConverter:
     """Convert jedi Refactoring objects into renaming machines."""
 
-    def __init__(self, workspace: Workspace, refactoring: Refactoring) -> None:
+    def __init__(
+        self,
+        workspace: Workspace,
+        refactoring: Refactoring,
+        position_lookups: Optional[Dict[str, "PositionLookup"]] = None,
+    ) -> None:
         self.workspace = workspace
         self.refactoring = refactoring
+        self.position_lookups = (
+            {} if position_lookups is None else position_lookups
+        )
 
     def lsp_renames(self) -> Iterator[RenameFile]:
         """Get all File rename operations."""
@@ -85,7 +105,18 @@ class RefactoringConverter:
                 else document.source
             )
             version = 0 if document.version is None else document.version
-            text_edits = lsp_text_edits(source, changed_file)
+            position_lookup = self.position_lookups.get(uri)
+            if position_lookup is None:
+                position_lookup = PositionLookup(
+                    source, self.workspace.position_codec.encoding
+                )
+                self.position_lookups[uri] = position_lookup
+            text_edits = lsp_text_edits(
+                source,
+                changed_file,
+                self.workspace.position_codec.encoding,
+                position_lookup,
+            )
             if text_edits:
                 text_document_edit = TextDocumentEdit(
                     text_document=OptionalVersionedTextDocumentIdentifier(
@@ -106,20 +137,27 @@ _OPCODES_CHANGE = {"replace", "delete", "insert"}
 
 
 def lsp_text_edits(
-    old_code: str, changed_file: ChangedFile
+    old_code: str,
+    changed_file: ChangedFile,
+    encoding: str,
+    position_lookup: Optional["PositionLookup"] = None,
 ) -> List[Union[TextEdit, AnnotatedTextEdit]]:
     """Take a jedi `ChangedFile` and convert to list of text edits.
 
     Handles inserts, replaces, and deletions within a text file.
 
     Additionally, makes sure returned code is syntactically valid
-    Python.
+    Python. encoding is the position encoding negotiated with the client.
+
+    `position_lookup`, if given, must have been built from `old_code` and
+    encoding.
     """
     new_code = changed_file.get_new_code()
     if not is_valid_python(new_code):
         return []
 
-    position_lookup = PositionLookup(old_code)
+    if position_lookup is None:
+        position_lookup = PositionLookup(old_code, encoding)
     text_edits: List[Union[TextEdit, AnnotatedTextEdit]] = []
     for opcode in get_opcodes(old_code, new_code):
         if opcode.op in _OPCODES_CHANGE:
@@ -163,16 +201,20 @@ def get_opcodes(old: str, new: str) -> List[Opcode]:
 class PositionLookup:
     """Data structure to convert byte offset file to line number and character."""
 
-    def __init__(self, code: str) -> None:
+    def __init__(self, code: str, encoding: str) -> None:
         # Create a list saying at what offset in the file each line starts.
+        self.lines = code.splitlines(keepends=True)
+        self.encoding = encoding
         self.line_starts = []
         offset = 0
-        for line in code.splitlines(keepends=True):
+        for line in self.lines:
             self.line_starts.append(offset)
             offset += len(line)
 
     def get(self, offset: int) -> Position:
         """Get the position in the file that corresponds to the given offset."""
         line = bisect_right(self.line_starts, offset) - 1
-        character = offset - self.line_starts[line]
+        character = jedi_utils.lsp_character(
+            self.lines[line], offset - self.line_starts[line], self.encoding
+        )
         return Position(line=line, character=character)
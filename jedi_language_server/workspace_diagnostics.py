@@ -0,0 +1,195 @@
+"""Diagnostics for every Python file in a workspace.
+
+Files are compiled in a pool of worker processes. Results are cached by file
+modification time and size, so repeated pulls only recompile the files that
+changed on disk. A pool whose worker crashed is replaced on the next pull.
+"""
+
+import os
+import pathlib
+import threading
+import tokenize
+from concurrent.futures import BrokenExecutor, Executor, Future, as_completed
+from typing import (
+    Any,
+    Callable,
+    Collection,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+from jedi import Script
+from lsprotocol.types import Diagnostic, PositionEncodingKind
+
+from . import jedi_utils
+from .jedi_workers import init_worker
+
+
+class FileDiagnostics(NamedTuple):
+    """The diagnostics of a file on disk."""
+
+    uri: str
+    result_id: str
+    diagnostics: List[Diagnostic]
+
+
+def python_files(
+    root: str,
+    ignore_folders: Collection[str],
+    skip_folders: Collection[str] = (),
+) -> Iterator[str]:
+    """Get the paths of all Python files below root.
+
+    Folders whose name is in ignore_folders, or whose path is in
+    skip_folders, are not entered.
+    """
+    skip = {os.path.normcase(os.path.normpath(path)) for path in skip_folders}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [
+            dirname
+            for dirname in dirnames
+            if dirname not in ignore_folders
+            and os.path.normcase(os.path.join(dirpath, dirname)) not in skip
+        ]
+        for filename in filenames:
+            if filename.endswith(".py"):
+                yield os.path.join(dirpath, filename)
+
+
+def _compile_file(
+    path: str, uri: str, backend: str, encoding: str
+) -> List[Diagnostic]:
+    """Get the diagnostics of a file on disk.
+
+    Runs in a worker process. Files that cannot be read or decoded have no
+    diagnostics. encoding is the position encoding of the diagnostics.
+    """
+    try:
+        with tokenize.open(path) as python_file:
+            source = python_file.read()
+    except (OSError, SyntaxError, UnicodeDecodeError):
+        return []
+    if backend == "parso":
+        return jedi_utils.lsp_diagnostics(
+            Script(code=source, path=path), encoding
+        )
+    diagnostic = jedi_utils.lsp_python_diagnostic(uri, source, encoding)
+    return [diagnostic] if diagnostic else []
+
+
+class WorkspaceDiagnostics:
+    """Compile the Python files of a workspace, caching the results."""
+
+    def __init__(self, max_workers: Optional[int] = None) -> None:
+        self._max_workers = max_workers
+        self._executor: Optional[Executor] = None
+        self._cache: Dict[str, FileDiagnostics] = {}
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> Executor:
+        # multiprocessing is only imported once workspace diagnostics are
+        # pulled, most clients never do.
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        with self._lock:
+            if self._executor is None:
+                # Forking would copy the server's threads and the locks they
+                # hold, which can deadlock the workers.
+                self._executor = ProcessPoolExecutor(
+                    self._max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=init_worker,
+                    initargs=(os.getpid(),),
+                )
+            return self._executor
+
+    def _discard(self, executor: Executor) -> None:
+        """Stop a broken pool, the next one is started on demand."""
+        with self._lock:
+            if self._executor is executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _submit(
+        self, function: Callable[..., Any], *args: Any
+    ) -> Tuple[Executor, Future]:
+        """Submit a call to the pool, replacing it if a worker crashed."""
+        executor = self._get_executor()
+        try:
+            return executor, executor.submit(function, *args)
+        except BrokenExecutor:
+            self._discard(executor)
+        executor = self._get_executor()
+        return executor, executor.submit(function, *args)
+
+    def check(
+        self,
+        roots: Collection[str],
+        ignore_folders: Collection[str],
+        skip_uris: Collection[str] = (),
+        backend: str = "compile",
+        encoding: str = PositionEncodingKind.Utf16,
+    ) -> Iterator[FileDiagnostics]:
+        """Get the diagnostics of every Python file below the roots.
+
+        Cached results for unchanged files are yielded first, then the
+        results of recompiled files as soon as each of them is done. Files
+        whose uri is in skip_uris (usually the open documents) are ignored.
+        A root nested in another one is only checked once. backend is the
+        `diagnostics.backend` option, and encoding the position encoding
+        negotiated with the client.
+
+        Once all files are checked, the results of files that were not
+        found, like deleted files or those of removed roots, are dropped.
+        """
+        seen = set()
+        futures = {}
+        for root in roots:
+            for path in python_files(root, ignore_folders, roots):
+                seen.add(path)
+                uri = pathlib.Path(path).as_uri()
+                if uri in skip_uris:
+                    continue
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                result_id = f"{stat.st_mtime_ns}-{stat.st_size}"
+                cached = self._cache.get(path)
+                if cached is not None and cached.result_id == result_id:
+                    yield cached
+                    continue
+                executor, future = self._submit(
+                    _compile_file, path, uri, backend, encoding
+                )
+                futures[future] = (executor, path, uri, result_id)
+
+        for future in as_completed(futures):
+            executor, path, uri, result_id = futures[future]
+            try:
+                diagnostics = future.result()
+            except BrokenExecutor:
+                self._discard(executor)
+                raise
+            result = FileDiagnostics(uri, result_id, diagnostics)
+            self._cache[path] = result
+            yield result
+
+        for path in self._cache.keys() - seen:
+            self._cache.pop(path, None)
+
+    def clear(self) -> None:
+        """Forget the cached results, every file is compiled again."""
+        self._cache.clear()
+
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
@@ -29,3 +29,9 @@ def tests(session: nox.Session) -> None:
     session.run(
         "slipcover", "--source", "jedi_language_server", "-m", "pytest"
     )
+
+
+@NOX_SESSION
+def benchmark(session: nox.Session) -> None:
+    """Replay the benchmark traces, arguments are passed to the replay."""
+    session.run("python", "-m", "tests.benchmarks.replay", *session.posargs)
@@ -0,0 +1,57 @@
+"""Fixtures of the micro-benchmarks."""
+
+import math
+import time
+from typing import Any, Callable, TypeVar
+
+import pytest
+
+T = TypeVar("T")
+
+_ROUNDS = 5
+_MIN_ROUND_S = 0.02
+_MAX_ITERATIONS = 1000
+
+
+class Benchmark:
+    """Time a function and fail if it is slower than a threshold.
+
+    The function is called in a few rounds, each repeating it enough times
+    to be timed accurately. The fastest round is compared to the threshold:
+    it is the least disturbed by other processes, so it is the most stable
+    measure of the code itself. Thresholds are several times the durations
+    measured on a laptop, to only catch significant regressions on slower
+    CI machines.
+    """
+
+    def __init__(self, node: pytest.Item) -> None:
+        self._node = node
+
+    def __call__(
+        self, max_ms: float, func: Callable[..., T], *args: Any, **kwargs: Any
+    ) -> T:
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        first = time.perf_counter() - start
+        iterations = min(
+            _MAX_ITERATIONS, max(1, math.ceil(_MIN_ROUND_S / max(first, 1e-9)))
+        )
+        best = first
+        for _ in range(_ROUNDS):
+            start = time.perf_counter()
+            for _ in range(iterations):
+                func(*args, **kwargs)
+            best = min(best, (time.perf_counter() - start) / iterations)
+        milliseconds = 1000 * best
+        self._node.user_properties.append(("milliseconds", milliseconds))
+        assert milliseconds <= max_ms, (
+            f"{self._node.name} took {milliseconds:.3f} ms,"
+            f" more than the threshold of {max_ms} ms"
+        )
+        return result
+
+
+@pytest.fixture
+def benchmark(request: pytest.FixtureRequest) -> Benchmark:
+    """Time a function, failing the test if it is too slow."""
+    return Benchmark(request.node)
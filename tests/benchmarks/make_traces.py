@@ -0,0 +1,254 @@
+"""Generate the synthetic traces checked in under tests/benchmarks/traces.
+
+The traces are deterministic, so regenerating them only changes the files
+if this module changed:
+
+    python -m tests.benchmarks.make_traces
+"""
+
+import copy
+import json
+import pathlib
+from typing import Any, Dict, Iterator, List, Optional
+
+from tests.benchmarks.replay import TRACES_ROOT
+from tests.lsp_test_client.defaults import VSCODE_DEFAULT_INITIALIZE
+
+_TIME_STEP_S = 0.05
+"""Time between two messages, about the pace of typing."""
+
+
+def _initialize_params() -> Dict[str, Any]:
+    params = copy.deepcopy(VSCODE_DEFAULT_INITIALIZE)
+    params["processId"] = None
+    params["rootPath"] = "${ROOT}"
+    params["rootUri"] = "${ROOT_URI}"
+    params["workspaceFolders"] = [{"uri": "${ROOT_URI}", "name": "root"}]
+    return params
+
+
+class _Trace:
+    """Messages of a synthetic session, in order."""
+
+    def __init__(self) -> None:
+        self.entries: List[Dict[str, Any]] = []
+        self._next_id = 0
+        self.request("initialize", _initialize_params())
+        self.notify("initialized", {})
+
+    def _add(self, message: Dict[str, Any]) -> None:
+        self.entries.append(
+            {
+                "time": round(len(self.entries) * _TIME_STEP_S, 3),
+                "message": {"jsonrpc": "2.0", **message},
+            }
+        )
+
+    def request(self, method: str, params: Optional[Dict[str, Any]]) -> None:
+        self._add({"id": self._next_id, "method": method, "params": params})
+        self._next_id += 1
+
+    def notify(self, method: str, params: Optional[Dict[str, Any]]) -> None:
+        self._add({"method": method, "params": params})
+
+    def write(self, path: pathlib.Path) -> None:
+        self.request("shutdown", None)
+        self.notify("exit", None)
+        with open(path, "w") as trace_file:
+            for entry in self.entries:
+                trace_file.write(json.dumps(entry) + "\n")
+
+
+def _large_module(classes: int) -> str:
+    """Source of a module with many classes and functions."""
+    lines = ["import os", "import collections", ""]
+    for index in range(classes):
+        lines += [
+            "",
+            f"class Model{index}:",
+            f'    """Model number {index}."""',
+            "",
+            "    def __init__(self, name, size=0):",
+            "        self.name = name",
+            "        self.size = size",
+            "        self.counts = collections.Counter()",
+            "",
+            "    def path(self):",
+            "        return os.path.join(self.name, str(self.size))",
+            "",
+            "    def grow(self, amount):",
+            "        self.size += amount",
+            "        self.counts[self.name] += 1",
+            "        return self.size",
+            "",
+            "",
+            f"def make_model{index}(name):",
+            f"    return Model{index}(name).grow({index})",
+            "",
+        ]
+    return "\n".join(lines) + "\n"
+
+
+def _typed(text: str) -> Iterator[str]:
+    """Prefixes of text, as it is typed one character at a time."""
+    for end in range(1, len(text) + 1):
+        yield text[:end]
+
+
+def _insert(line: int, character: int, text: str) -> Dict[str, Any]:
+    """Content change inserting text at a position."""
+    position = {"line": line, "character": character}
+    return {"range": {"start": position, "end": position}, "text": text}
+
+
+def typing_large_file() -> _Trace:
+    """Type a few statements at the end of a large file, completing names."""
+    trace = _Trace()
+    uri = "${ROOT_URI}/benchmark_large_file.py"
+    source = _large_module(100)
+    # The module ends with an empty line, the edits can't start past it.
+    line = source.count("\n") - 1
+    trace.notify(
+        "textDocument/didOpen",
+        {
+            "textDocument": {
+                "uri": uri,
+                "languageId": "python",
+                "version": 1,
+                "text": source,
+            }
+        },
+    )
+    trace.request(
+        "textDocument/documentSymbol", {"textDocument": {"uri": uri}}
+    )
+    version = 1
+    for statement in ("model = Model42('name')", "model.grow(3)", "os.path"):
+        for text in _typed(statement + "\n"):
+            version += 1
+            trace.notify(
+                "textDocument/didChange",
+                {
+                    "textDocument": {"uri": uri, "version": version},
+                    "contentChanges": [_insert(line, len(text) - 1, text[-1])],
+                },
+            )
+            if text[-1].isidentifier() or text[-1] == ".":
+                trace.request(
+                    "textDocument/completion",
+                    {
+                        "textDocument": {"uri": uri},
+                        "position": {"line": line, "character": len(text)},
+                        "context": {"triggerKind": 1},
+                    },
+                )
+        trace.request(
+            "textDocument/hover",
+            {
+                "textDocument": {"uri": uri},
+                "position": {"line": line, "character": 2},
+            },
+        )
+        line += 1
+    trace.request(
+        "textDocument/documentSymbol", {"textDocument": {"uri": uri}}
+    )
+    return trace
+
+
+def notebook_editing() -> _Trace:
+    """Edit the last cell of a notebook, completing names of other cells."""
+    trace = _Trace()
+    notebook_uri = "${ROOT_URI}/benchmark_notebook.ipynb"
+    # Like in .ipynb files, cells don't end with a newline.
+    cells = [
+        "import os\nimport collections",
+        _large_module(5).rstrip(),
+        "models = [make_model1(name) for name in os.listdir()]",
+        "",
+    ]
+    cell_uris = [f"{notebook_uri}#{index}" for index in range(len(cells))]
+    trace.notify(
+        "notebookDocument/didOpen",
+        {
+            "notebookDocument": {
+                "uri": notebook_uri,
+                "notebookType": "jupyter-notebook",
+                "version": 1,
+                "cells": [{"kind": 2, "document": uri} for uri in cell_uris],
+            },
+            "cellTextDocuments": [
+                {
+                    "uri": uri,
+                    "languageId": "python",
+                    "version": 1,
+                    "text": text,
+                }
+                for uri, text in zip(cell_uris, cells)
+            ],
+        },
+    )
+    uri = cell_uris[-1]
+    version = 1
+    for text in _typed("models[0].counts.most_common"):
+        version += 1
+        trace.notify(
+            "notebookDocument/didChange",
+            {
+                "notebookDocument": {"uri": notebook_uri, "version": version},
+                "change": {
+                    "cells": {
+                        "textContent": [
+                            {
+                                "document": {"uri": uri, "version": version},
+                                "changes": [
+                                    _insert(0, len(text) - 1, text[-1])
+                                ],
+                            }
+                        ]
+                    }
+                },
+            },
+        )
+        trace.request(
+            "textDocument/completion",
+            {
+                "textDocument": {"uri": uri},
+                "position": {"line": 0, "character": len(text)},
+                "context": {"triggerKind": 1},
+            },
+        )
+    trace.request(
+        "textDocument/hover",
+        {
+            "textDocument": {"uri": uri},
+            "position": {"line": 0, "character": 20},
+        },
+    )
+    return trace
+
+
+def symbol_search() -> _Trace:
+    """Search the workspace symbols as a query is typed."""
+    trace = _Trace()
+    for query in (*_typed("some"), *_typed("Model")):
+        trace.request("workspace/symbol", {"query": query})
+    return trace
+
+
+TRACES = {
+    "typing_large_file": typing_large_file,
+    "notebook_editing": notebook_editing,
+    "symbol_search": symbol_search,
+}
+
+
+def main() -> None:
+    """Write the synthetic traces."""
+    TRACES_ROOT.mkdir(exist_ok=True)
+    for name, make_trace in TRACES.items():
+        make_trace().write(TRACES_ROOT / f"{name}.jsonl")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Record the messages an editor sends to the server into a trace.
+
+Configure the editor to start this module instead of the server, followed by
+the server's command line:
+
+    python -m tests.benchmarks.record session.jsonl -- jedi-language-server
+
+Messages are passed through unchanged in both directions. Those sent by the
+editor are appended to the trace with their time since the start, in the
+format read by tests.benchmarks.replay. Replace the workspace root in the
+recorded trace with ${ROOT} (and its uri with ${ROOT_URI}) to replay it on
+another machine.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import threading
+import time
+from typing import BinaryIO, Callable, List, Optional
+
+
+def _read_message(stream: BinaryIO) -> Optional[bytes]:
+    """Read the body of one message, None at the end of the stream."""
+    content_length = None
+    while True:
+        line = stream.readline()
+        if not line:
+            return None
+        line = line.strip()
+        if not line:
+            break
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            content_length = int(value)
+    if content_length is None:
+        return None
+    return stream.read(content_length)
+
+
+def _forward(
+    source: BinaryIO,
+    destination: BinaryIO,
+    on_message: Optional[Callable[[bytes], None]] = None,
+) -> None:
+    while True:
+        body = _read_message(source)
+        if body is None:
+            destination.close()
+            return
+        if on_message is not None:
+            on_message(body)
+        destination.write(b"Content-Length: %d\r\n\r\n" % len(body) + body)
+        destination.flush()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Proxy the standard streams to the server, recording a trace."""
+    parser = argparse.ArgumentParser(
+        prog="python -m tests.benchmarks.record", description=__doc__
+    )
+    parser.formatter_class = argparse.RawDescriptionHelpFormatter
+    parser.add_argument("trace", help="trace file to write")
+    parser.add_argument("command", nargs="+", help="server command line")
+    args = parser.parse_args(argv)
+
+    server = subprocess.Popen(
+        args.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE
+    )
+    assert server.stdin is not None and server.stdout is not None
+    start = time.perf_counter()
+    with open(args.trace, "w") as trace_file:
+
+        def record(body: bytes) -> None:
+            entry = {
+                "time": round(time.perf_counter() - start, 6),
+                "message": json.loads(body),
+            }
+            trace_file.write(json.dumps(entry) + "\n")
+            trace_file.flush()
+
+        responses = threading.Thread(
+            target=_forward,
+            args=(server.stdout, sys.stdout.buffer),
+            daemon=True,
+        )
+        responses.start()
+        _forward(sys.stdin.buffer, server.stdin, record)
+        returncode = server.wait()
+        responses.join()
+    return returncode
+
+
+if __name__ == "__main__":
+    sys.exit(main())
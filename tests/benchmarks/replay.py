@@ -0,0 +1,228 @@
+"""Replay LSP traces against the server and report latency per method.
+
+A trace is a JSONL file with one message sent by the client per line:
+
+    {"time": 0.52, "message": {"jsonrpc": "2.0", "id": 3, "method": ...}}
+
+time is the number of seconds since the start of the session. It is only
+used with --realtime, otherwise messages are sent as fast as possible and
+each request waits for its response. In every string of the trace, ${ROOT}
+is replaced with the workspace root given by --root and ${ROOT_URI} with its
+uri.
+
+The session is initialized with the trace's initialize request. Responses
+of the client to server requests, the initialized notification, shutdown,
+and exit are skipped: the test session sends its own.
+
+Compare two commits by saving the results of one with --output and passing
+them to the other with --baseline:
+
+    git checkout main
+    python -m tests.benchmarks.replay --output main.json
+    git checkout my-branch
+    python -m tests.benchmarks.replay --baseline main.json
+"""
+
+import argparse
+import json
+import os
+import pathlib
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from jedi_language_server.instrumentation import Histogram
+from tests.lsp_test_client import session
+
+BENCHMARKS_ROOT = pathlib.Path(__file__).parent
+TRACES_ROOT = BENCHMARKS_ROOT / "traces"
+TEST_DATA = BENCHMARKS_ROOT.parent / "test_data"
+
+_SKIPPED_METHODS = {"initialized", "shutdown", "exit"}
+
+
+def _substitute(value: Any, variables: Dict[str, str]) -> Any:
+    if isinstance(value, str):
+        for name, replacement in variables.items():
+            value = value.replace("${" + name + "}", replacement)
+        return value
+    if isinstance(value, list):
+        return [_substitute(item, variables) for item in value]
+    if isinstance(value, dict):
+        return {
+            key: _substitute(item, variables) for key, item in value.items()
+        }
+    return value
+
+
+def load_trace(path: pathlib.Path, root: pathlib.Path) -> List[Dict]:
+    """Load the entries of a trace, substituting the root variables."""
+    variables = {"ROOT_URI": root.as_uri(), "ROOT": str(root)}
+    with open(path) as trace_file:
+        return [
+            _substitute(json.loads(line), variables)
+            for line in trace_file
+            if line.strip()
+        ]
+
+
+def replay(
+    entries: List[Dict], realtime: bool = False
+) -> Dict[str, List[float]]:
+    """Replay trace entries, returning the latencies of each method."""
+    latencies: Dict[str, List[float]] = {}
+    with session.LspSession() as ls_session:
+        start = time.perf_counter()
+        for entry in entries:
+            message = entry["message"]
+            method = message.get("method")
+            if method is None or method in _SKIPPED_METHODS:
+                continue
+            if realtime:
+                time.sleep(
+                    max(0.0, entry["time"] - (time.perf_counter() - start))
+                )
+            params = message.get("params")
+            sent = time.perf_counter()
+            if method == "initialize":
+                # The recording editor is gone, and the server exits when
+                # the process given here does.
+                if params.get("processId") is not None:
+                    params["processId"] = os.getpid()
+                ls_session.initialize(params)
+            elif "id" in message:
+                ls_session._send_request(method, params).result()
+            else:
+                ls_session._send_notification(method, params)
+                continue
+            latencies.setdefault(method, []).append(time.perf_counter() - sent)
+    return latencies
+
+
+def summarize(latencies: Dict[str, List[float]]) -> Dict[str, Dict]:
+    """Summarize the latencies of each method, in milliseconds."""
+    summaries = {}
+    for method, durations in sorted(latencies.items()):
+        histogram = Histogram(max_samples=len(durations))
+        for duration in durations:
+            histogram.add(duration)
+        summaries[method] = histogram.summary()
+    return summaries
+
+
+def regressions(
+    results: Dict[str, Dict],
+    baseline: Dict[str, Dict],
+    tolerance: float,
+    min_difference_ms: float = 1.0,
+) -> Iterator[str]:
+    """Describe the methods whose median latency regressed.
+
+    A method regressed if its p50 grew by more than tolerance (a fraction)
+    and by more than min_difference_ms, which filters out timer noise.
+    """
+    for trace, methods in results.items():
+        for method, summary in methods.items():
+            old = baseline.get(trace, {}).get(method)
+            if old is None:
+                continue
+            difference = summary["p50"] - old["p50"]
+            if difference > min_difference_ms and summary["p50"] > old[
+                "p50"
+            ] * (1 + tolerance):
+                yield (
+                    f"{trace} {method}: p50 {old['p50']:.1f} ms ->"
+                    f" {summary['p50']:.1f} ms"
+                )
+
+
+def _print_results(
+    results: Dict[str, Dict], baseline: Optional[Dict[str, Dict]]
+) -> None:
+    for trace, methods in results.items():
+        print(trace)
+        for method, summary in methods.items():
+            line = (
+                f"  {method:40} n={summary['count']:<5}"
+                f" p50={summary['p50']:8.1f} ms"
+                f" p95={summary['p95']:8.1f} ms"
+                f" p99={summary['p99']:8.1f} ms"
+            )
+            old = (baseline or {}).get(trace, {}).get(method)
+            if old is not None and old["p50"]:
+                line += f"  ({summary['p50'] / old['p50']:.2f}x baseline)"
+            print(line)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Replay traces from the command line."""
+    parser = argparse.ArgumentParser(
+        prog="python -m tests.benchmarks.replay", description=__doc__
+    )
+    parser.formatter_class = argparse.RawDescriptionHelpFormatter
+    parser.add_argument(
+        "traces",
+        nargs="*",
+        type=pathlib.Path,
+        help="trace files (default: the synthetic traces)",
+    )
+    parser.add_argument(
+        "--root",
+        type=pathlib.Path,
+        default=TEST_DATA,
+        help="workspace root substituted for ${ROOT} (default: test data)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=1,
+        help="replay each trace this many times",
+    )
+    parser.add_argument(
+        "--realtime",
+        action="store_true",
+        help="wait between messages as long as in the recorded session",
+    )
+    parser.add_argument("--output", type=pathlib.Path, help="save results")
+    parser.add_argument(
+        "--baseline",
+        type=pathlib.Path,
+        help="results of an earlier run to compare against",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="p50 growth counted as a regression (default: 0.2, 20%%)",
+    )
+    args = parser.parse_args(argv)
+
+    traces = args.traces or sorted(TRACES_ROOT.glob("*.jsonl"))
+    root = args.root.resolve()
+    results = {}
+    for trace in traces:
+        entries = load_trace(trace, root)
+        latencies: Dict[str, List[float]] = {}
+        for _ in range(args.repeat):
+            for method, durations in replay(entries, args.realtime).items():
+                latencies.setdefault(method, []).extend(durations)
+        results[trace.stem] = summarize(latencies)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+    _print_results(results, baseline)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+    if baseline is None:
+        return 0
+    found = list(regressions(results, baseline, args.tolerance))
+    for regression in found:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
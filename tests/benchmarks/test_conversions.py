@@ -0,0 +1,218 @@
+"""Micro-benchmarks of the conversions from Jedi's results to LSP types.
+
+The fixtures are realistic Jedi outputs: the completions of a module with
+hundreds of members and of an instance of a deep class hierarchy, the names
+of a large module, and a rename changing every function of a module.
+"""
+
+from typing import List, Tuple, Union
+
+import pytest
+from hamcrest import assert_that, greater_than, has_length, is_
+from jedi import Script
+from jedi.api.classes import Completion, Name
+from jedi.api.refactoring import ChangedFile
+from lsprotocol.types import (
+    AnnotatedTextEdit,
+    MarkupKind,
+    PositionEncodingKind,
+    TextEdit,
+)
+from parso import split_lines
+
+from jedi_language_server import jedi_utils, text_edit_utils
+from jedi_language_server.initialization_options import InitializationOptions
+from tests.benchmarks.conftest import Benchmark
+
+HIERARCHY_DEPTH = 30
+METHODS_PER_CLASS = 10
+
+
+def _hierarchy_source() -> str:
+    """Module with a deep class hierarchy of documented methods."""
+    lines = ["class Level0:", '    """Base of the hierarchy."""', ""]
+    for depth in range(HIERARCHY_DEPTH):
+        if depth:
+            lines += [
+                f"class Level{depth}(Level{depth - 1}):",
+                f'    """Level {depth} of the hierarchy."""',
+                "",
+            ]
+        for index in range(METHODS_PER_CLASS):
+            lines += [
+                f"    def method_{depth}_{index}(",
+                "        self, value: int, *args, scale: float = 1.0, **kwargs",
+                "    ) -> int:",
+                f'        """Method {index} of level {depth}.',
+                "",
+                "        :param value: the value to scale",
+                "        :param scale: the factor",
+                '        """',
+                "        return value * scale",
+                "",
+            ]
+    return "\n".join(lines) + f"\nleaf = Level{HIERARCHY_DEPTH - 1}()\n"
+
+
+@pytest.fixture(scope="module")
+def module_completions() -> List[Completion]:
+    """Completions of the members of a large module."""
+    return Script("import os\nos.").complete(2, 3)
+
+
+@pytest.fixture(scope="module")
+def hierarchy_completions() -> List[Completion]:
+    """Completions of the members of an instance of a deep hierarchy."""
+    source = _hierarchy_source() + "leaf."
+    lines = source.splitlines()
+    return Script(source).complete(len(lines), len(lines[-1]))
+
+
+@pytest.fixture(scope="module")
+def hierarchy_names() -> List[Name]:
+    """Names of a module with a deep class hierarchy."""
+    return Script(_hierarchy_source()).get_names(
+        all_scopes=True, definitions=True
+    )
+
+
+@pytest.fixture(scope="module")
+def rename() -> Tuple[str, ChangedFile]:
+    """Rename of a global used in every function of a module."""
+    source = "SCALE = 2\n\n\n" + "\n".join(
+        f"def function_{index}(value):\n    return value * SCALE + {index}\n\n"
+        for index in range(100)
+    )
+    changed_files = (
+        Script(source, path="renamed.py")
+        .rename(1, 0, new_name="FACTOR")
+        .get_changed_files()
+    )
+    return source, next(iter(changed_files.values()))
+
+
+@pytest.mark.parametrize(
+    ("enable_snippets", "max_ms"), [(False, 50), (True, 1000)]
+)
+def test_lsp_completion_item(
+    benchmark: Benchmark,
+    hierarchy_completions: List[Completion],
+    enable_snippets: bool,
+    max_ms: float,
+) -> None:
+    """Benchmark converting hundreds of inherited method completions."""
+    items = benchmark(
+        max_ms,
+        lambda: [
+            jedi_utils.lsp_completion_item(
+                completion,
+                char_before_cursor=".",
+                char_after_cursor="",
+                enable_snippets=enable_snippets,
+                resolve_eagerly=False,
+                markup_kind=MarkupKind.Markdown,
+                sort_append_text=str(index).zfill(3),
+            )
+            for index, completion in enumerate(hierarchy_completions)
+        ],
+    )
+    assert_that(len(items), greater_than(HIERARCHY_DEPTH * METHODS_PER_CLASS))
+
+
+def test_lsp_completion_item_resolve_eagerly(
+    benchmark: Benchmark, module_completions: List[Completion]
+) -> None:
+    """Benchmark converting completions with their documentation."""
+    items = benchmark(
+        2000,
+        lambda: [
+            jedi_utils.lsp_completion_item(
+                completion,
+                char_before_cursor=".",
+                char_after_cursor="",
+                enable_snippets=True,
+                resolve_eagerly=True,
+                markup_kind=MarkupKind.Markdown,
+            )
+            for completion in module_completions
+        ],
+    )
+    assert_that(items, has_length(len(module_completions)))
+
+
+def test_complete_sort_name(
+    benchmark: Benchmark, module_completions: List[Completion]
+) -> None:
+    """Benchmark computing the sort text of hundreds of completions."""
+    sort_names = benchmark(
+        10,
+        lambda: [
+            jedi_utils.complete_sort_name(completion, str(index).zfill(3))
+            for index, completion in enumerate(module_completions)
+        ],
+    )
+    assert_that(sort_names, has_length(len(module_completions)))
+
+
+def test_clean_completion_name(
+    benchmark: Benchmark, module_completions: List[Completion]
+) -> None:
+    """Benchmark cleaning the names of hundreds of completions."""
+    names = [completion.name for completion in module_completions]
+    cleaned = benchmark(
+        1,
+        lambda: [
+            jedi_utils.clean_completion_name(name, '"', '"') for name in names
+        ],
+    )
+    assert_that(cleaned, is_(names))
+
+
+def test_lsp_document_symbols(
+    benchmark: Benchmark, hierarchy_names: List[Name]
+) -> None:
+    """Benchmark building the symbol tree of a deep class hierarchy."""
+    lines = split_lines(_hierarchy_source(), keepends=True)
+    symbols = benchmark(
+        500,
+        jedi_utils.lsp_document_symbols,
+        hierarchy_names,
+        lines,
+        PositionEncodingKind.Utf16,
+    )
+    assert_that(symbols, has_length(HIERARCHY_DEPTH + 1))
+
+
+def test_hover_text(benchmark: Benchmark, hierarchy_names: List[Name]) -> None:
+    """Benchmark the hover text of documented methods."""
+    names = [name for name in hierarchy_names if name.type == "function"]
+    initialization_options = InitializationOptions()
+    texts = benchmark(
+        500,
+        lambda: [
+            jedi_utils.hover_text(
+                [name], MarkupKind.Markdown, initialization_options
+            )
+            for name in names[:100]
+        ],
+    )
+    assert_that(texts, has_length(100))
+
+
+def test_lsp_text_edits(
+    benchmark: Benchmark, rename: Tuple[str, ChangedFile]
+) -> None:
+    """Benchmark converting a rename changing every function of a module.
+
+    The validation of the new code is cached by content, so the cache is
+    cleared on every call, like for a new rename.
+    """
+
+    def convert() -> List[Union[TextEdit, AnnotatedTextEdit]]:
+        text_edit_utils.is_valid_python.cache_clear()
+        return text_edit_utils.lsp_text_edits(
+            *rename, PositionEncodingKind.Utf16
+        )
+
+    edits = benchmark(2000, convert)
+    assert_that(len(edits), greater_than(50))
@@ -0,0 +1,62 @@
+"""Benchmarks of the startup time, measured with python -X importtime.
+
+Editors start a server per workspace, so its import time is visible to users.
+"""
+
+import subprocess
+import sys
+from typing import Callable, Dict
+
+from hamcrest import assert_that, has_key, is_not, less_than
+
+
+def _import_times(code: str) -> Dict[str, float]:
+    """Run code in a new interpreter and get the import time of each module.
+
+    The times include the imports of the module's own imports, in seconds.
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line.split("|")
+        times[module.strip()] = int(cumulative) / 1e6
+    return times
+
+
+def test_version_does_not_import_server(
+    record_property: Callable[[str, object], None],
+) -> None:
+    """Test that printing the version imports neither the server nor Jedi."""
+    code = (
+        "import sys\n"
+        "from jedi_language_server.cli import cli\n"
+        "sys.argv = ['jedi-language-server', '--version']\n"
+        "cli()\n"
+    )
+    times = _import_times(code)
+    for module in ("jedi_language_server.server", "jedi", "lsprotocol"):
+        assert_that(times, is_not(has_key(module)))
+    record_property("seconds", times["jedi_language_server.cli"])
+    assert_that(times["jedi_language_server.cli"], less_than(0.5))
+
+
+def test_server_import_time(
+    record_property: Callable[[str, object], None],
+) -> None:
+    """Test that the server doesn't import what is only used on demand."""
+    times = _import_times("import jedi_language_server.server")
+    for module in (
+        "docstring_to_markdown",
+        "importlib.metadata",
+        "multiprocessing",
+    ):
+        assert_that(times, is_not(has_key(module)))
+    record_property("seconds", times["jedi_language_server.server"])
+    assert_that(times["jedi_language_server.server"], less_than(5))
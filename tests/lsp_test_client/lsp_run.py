@@ -4,4 +4,5 @@ import sys
 
 from jedi_language_server.cli import cli
 
-sys.exit(cli())
+if __name__ == "__main__":
+    sys.exit(cli())
@@ -17,9 +17,11 @@ from tests.lsp_test_client.utils import as_uri
 LSP_EXIT_TIMEOUT = 5000
 
 
+PROGRESS = "$/progress"
 PUBLISH_DIAGNOSTICS = "textDocument/publishDiagnostics"
 WINDOW_LOG_MESSAGE = "window/logMessage"
 WINDOW_SHOW_MESSAGE = "window/showMessage"
+WINDOW_WORK_DONE_PROGRESS_CREATE = "window/workDoneProgress/create"
 
 
 class LspSession(MethodDispatcher):
@@ -63,6 +65,8 @@ class LspSession(MethodDispatcher):
             PUBLISH_DIAGNOSTICS: self._publish_diagnostics,
             WINDOW_SHOW_MESSAGE: self._window_show_message,
             WINDOW_LOG_MESSAGE: self._window_log_message,
+            WINDOW_WORK_DONE_PROGRESS_CREATE: self._work_done_progress_create,
+            PROGRESS: self._progress,
         }
         self._endpoint = Endpoint(dispatcher, self._writer.write)
         self._thread_pool.submit(self._reader.listen, self._endpoint.consume)
@@ -144,6 +148,11 @@ class LspSession(MethodDispatcher):
         )
         return fut.result()
 
+    def code_action_resolve(self, resolve_params):
+        """Sends code action resolve request to LSP server."""
+        fut = self._send_request("codeAction/resolve", params=resolve_params)
+        return fut.result()
+
     def text_document_hover(self, hover_params):
         """Sends text document hover request to LSP server."""
         fut = self._send_request("textDocument/hover", params=hover_params)
@@ -177,6 +186,13 @@ class LspSession(MethodDispatcher):
         )
         return fut.result()
 
+    def text_document_diagnostic(self, document_diagnostic_params):
+        """Sends text document diagnostic request to LSP server."""
+        fut = self._send_request(
+            "textDocument/diagnostic", params=document_diagnostic_params
+        )
+        return fut.result()
+
     def text_document_highlight(self, document_highlight_params):
         """Sends text document highlight request to LSP server."""
         fut = self._send_request(
@@ -206,6 +222,25 @@ class LspSession(MethodDispatcher):
         )
         return fut.result()
 
+    def workspace_execute_command(self, execute_command_params):
+        """Sends workspace executeCommand request to LSP server."""
+        fut = self._send_request(
+            "workspace/executeCommand", params=execute_command_params
+        )
+        return fut.result()
+
+    def jedi_stats(self):
+        """Sends the $/jedi/stats request to LSP server."""
+        fut = self._send_request("$/jedi/stats", params={})
+        return fut.result()
+
+    def workspace_diagnostic(self, workspace_diagnostic_params):
+        """Sends workspace diagnostic request to LSP server."""
+        fut = self._send_request(
+            "workspace/diagnostic", params=workspace_diagnostic_params
+        )
+        return fut.result()
+
     def workspace_symbol(self, workspace_symbol_params):
         """Sends workspace symbol request to LSP server."""
         fut = self._send_request(
@@ -226,6 +261,15 @@ class LspSession(MethodDispatcher):
             "textDocument/didChange", params=did_change_params
         )
 
+    def notify_did_change_workspace_folders(
+        self, did_change_workspace_folders_params
+    ):
+        """Sends did change workspace folders notification to LSP Server."""
+        self._send_notification(
+            "workspace/didChangeWorkspaceFolders",
+            params=did_change_workspace_folders_params,
+        )
+
     def notify_did_save_text_document(self, did_save_params):
         """Sends did save text document notification to LSP Server."""
         self._send_notification("textDocument/didSave", params=did_save_params)
@@ -340,6 +384,14 @@ class LspSession(MethodDispatcher):
             WINDOW_SHOW_MESSAGE, window_show_message_params
         )
 
+    def _work_done_progress_create(self, work_done_progress_create_params):
+        """Internal handler for work done progress create requests."""
+        return None
+
+    def _progress(self, progress_params):
+        """Internal handler for progress notifications."""
+        return self._handle_notification(PROGRESS, progress_params)
+
     def _handle_notification(self, notification_name, params):
         """Internal handler for notifications."""
         fut = Future()
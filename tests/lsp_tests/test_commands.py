@@ -0,0 +1,141 @@
+"""Tests for the commands maintaining Jedi's caches."""
+
+import copy
+import os
+import time
+
+from hamcrest import (
+    assert_that,
+    greater_than,
+    has_entries,
+    has_items,
+    instance_of,
+    is_,
+)
+
+from tests import TEST_DATA
+from tests.lsp_test_client import session
+from tests.lsp_test_client.defaults import VSCODE_DEFAULT_INITIALIZE
+from tests.lsp_test_client.utils import as_uri
+
+COMPLETION_TEST_ROOT = TEST_DATA / "completion"
+
+
+def _completion_labels(ls_session: session.LspSession) -> list:
+    uri = as_uri(COMPLETION_TEST_ROOT / "completion_test1.py")
+    actual = ls_session.text_document_completion(
+        {
+            "textDocument": {"uri": uri},
+            "position": {"line": 8, "character": 2},
+            "context": {"triggerKind": 1},
+        }
+    )
+    return [item["label"] for item in actual["items"]]
+
+
+def test_cache_commands() -> None:
+    """Test that caches are warmed, cleared and the environment reloaded."""
+    capabilities = []
+    initialize_params = copy.deepcopy(VSCODE_DEFAULT_INITIALIZE)
+    initialize_params["initializationOptions"]["workers"] = {"count": 1}
+    with session.LspSession() as ls_session:
+        ls_session.initialize(initialize_params, capabilities.append)
+        assert_that(
+            capabilities[0]["capabilities"]["executeCommandProvider"],
+            has_entries(
+                commands=has_items(
+                    "jedi.clearCaches",
+                    "jedi.reloadEnvironment",
+                    "jedi.warmModules",
+                )
+            ),
+        )
+
+        actual = ls_session.workspace_execute_command(
+            {
+                "command": "jedi.warmModules",
+                "arguments": ["json", "no_such_module"],
+            }
+        )
+        assert_that(actual["modules"]["json"], instance_of(float))
+        assert_that(actual["modules"]["no_such_module"], is_(None))
+        assert_that(actual["jediModules"], greater_than(0))
+
+        actual = ls_session.workspace_execute_command(
+            {"command": "jedi.clearCaches"}
+        )
+        assert_that(
+            actual,
+            has_entries(
+                jediModules=greater_than(0),
+                milliseconds=instance_of(float),
+            ),
+        )
+        assert_that(_completion_labels(ls_session), is_(["my_function"]))
+
+        actual = ls_session.workspace_execute_command(
+            {"command": "jedi.reloadEnvironment"}
+        )
+        assert_that(actual["environment"], instance_of(str))
+        assert_that(_completion_labels(ls_session), is_(["my_function"]))
+
+
+def test_messages_while_warming_modules(tmp_path, monkeypatch) -> None:
+    """Document changes and requests are handled while a module loads.
+
+    Jedi imports the modules of jediSettings.autoImportModules, so warming
+    slow_module takes as long as its import.
+    """
+    (tmp_path / "slow_module.py").write_text("import time\n\ntime.sleep(5)\n")
+    monkeypatch.setenv(
+        "PYTHONPATH",
+        os.pathsep.join(
+            filter(None, [str(tmp_path), os.getenv("PYTHONPATH")])
+        ),
+    )
+    initialize_params = copy.deepcopy(VSCODE_DEFAULT_INITIALIZE)
+    initialize_params["initializationOptions"]["jediSettings"] = {
+        "autoImportModules": ["slow_module"]
+    }
+    uri = as_uri(tmp_path / "document.py")
+    with session.LspSession() as ls_session:
+        ls_session.initialize(initialize_params)
+        ls_session.notify_did_open_text_document(
+            {
+                "textDocument": {
+                    "uri": uri,
+                    "languageId": "python",
+                    "version": 1,
+                    "text": "value = 1\n",
+                }
+            }
+        )
+        warm = ls_session._send_request(
+            "workspace/executeCommand",
+            {"command": "jedi.warmModules", "arguments": ["slow_module"]},
+        )
+        # Let the command start loading the module
+        time.sleep(1)
+        ls_session.notify_did_change_text_document(
+            {
+                "textDocument": {"uri": uri, "version": 2},
+                "contentChanges": [{"text": "value = 1\nvalue_2 = 2\nva\n"}],
+            }
+        )
+        stats = ls_session.jedi_stats()
+        assert_that(warm.done(), is_(False))
+        completions = ls_session.text_document_completion(
+            {
+                "textDocument": {"uri": uri},
+                "position": {"line": 2, "character": 2},
+                "context": {"triggerKind": 1},
+            }
+        )
+        modules = warm.result()["modules"]
+
+    assert_that(stats, has_entries(requests=instance_of(dict)))
+    assert_that(
+        [item["label"] for item in completions["items"]],
+        has_items("value", "value_2"),
+    )
+    assert_that(modules["slow_module"], greater_than(4000))
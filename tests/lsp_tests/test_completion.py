@@ -1,8 +1,10 @@
 """Tests for document completion requests."""
 
 import copy
+import os
+import zlib
 
-from hamcrest import assert_that, is_
+from hamcrest import assert_that, has_entries, instance_of, is_
 
 from tests import TEST_DATA
 from tests.lsp_test_client import session
@@ -254,3 +256,286 @@ def test_lsp_completion_notebook() -> None:
             "insertTextFormat": 2,
         }
         assert_that(actual, is_(expected))
+
+
+def test_lsp_completion_line_storage() -> None:
+    """Test completion after changes to a document stored as lines."""
+    path = COMPLETION_TEST_ROOT / "completion_test1.py"
+    with open(path) as text_file:
+        contents = text_file.read()
+
+    initialize_params = copy.deepcopy(VSCODE_DEFAULT_INITIALIZE)
+    initialize_params["initializationOptions"]["textDocuments"] = {
+        "storage": "lines"
+    }
+    with session.LspSession() as ls_session:
+        ls_session.initialize(initialize_params)
+        uri = as_uri(path)
+        ls_session.notify_did_open_text_document(
+            {
+                "textDocument": {
+                    "uri": uri,
+                    "languageId": "python",
+                    "version": 1,
+                    "text": contents,
+                }
+            }
+        )
+        ls_session.notify_did_change_text_document(
+            {
+                "textDocument": {"uri": uri, "version": 2},
+                "contentChanges": [
+                    {
+                        "range": {
+                            "start": {"line": 8, "character": 0},
+                            "end": {"line": 8, "character": 2},
+                        },
+                        "text": "x = 1\nmy_f",
+                    }
+                ],
+            }
+        )
+        actual = ls_session.text_document_completion(
+            {
+                "textDocument": {"uri": uri},
+                "position": {"line": 9, "character": 4},
+                "context": {"triggerKind": 1},
+            }
+        )
+
+    assert_that(
+        [item["label"] for item in actual["items"]], is_(["my_function"])
+    )
+
+
+def test_lsp_completion_workers() -> None:
+    """Test completion and resolution in worker processes."""
+    path = COMPLETION_TEST_ROOT / "completion_test1.py"
+    with open(path) as text_file:
+        contents = text_file.read()
+
+    initialize_params = copy.deepcopy(VSCODE_DEFAULT_INITIALIZE)
+    initialize_params["initializationOptions"]["workers"] = {"count": 2}
+    with session.LspSession() as ls_session:
+        ls_session.initialize(initialize_params)
+        uri = as_uri(path)
+        ls_session.notify_did_open_text_document(
+            {
+                "textDocument": {
+                    "uri": uri,
+                    "languageId": "python",
+                    "version": 1,
+                    "text": contents,
+                }
+            }
+        )
+        for version, text in [(2, "my_f"), (3, "my_fu")]:
+            ls_session.notify_did_change_text_document(
+                {
+                    "textDocument": {"uri": uri, "version": version},
+                    "contentChanges": [
+                        {
+                            "range": {
+                                "start": {"line": 8, "character": 0},
+                                "end": {"line": 8, "character": 100},
+                            },
+                            "text": text,
+                        }
+                    ],
+                }
+            )
+            actual = ls_session.text_document_completion(
+                {
+                    "textDocument": {"uri": uri},
+                    "position": {"line": 8, "character": len(text)},
+                    "context": {"triggerKind": 1},
+                }
+            )
+            assert_that(
+                [item["label"] for item in actual["items"]],
+                is_(["my_function"]),
+            )
+
+        actual = ls_session.completion_item_resolve(actual["items"][0])
+
+    assert_that(actual["detail"], is_("def my_function()"))
+    assert_that(actual["data"], is_({"uri": uri}))
+
+
+def test_lsp_completion_workers_in_parallel(tmp_path, monkeypatch) -> None:
+    """A slow request in a worker doesn't delay those of other workers.
+
+    Jedi imports the modules of jediSettings.autoImportModules, so the
+    completion of slow_module takes as long as its import.
+    """
+    (tmp_path / "slow_module.py").write_text("import time\n\ntime.sleep(5)\n")
+    monkeypatch.setenv(
+        "PYTHONPATH",
+        os.pathsep.join(
+            filter(None, [str(tmp_path), os.getenv("PYTHONPATH")])
+        ),
+    )
+    initialize_params = copy.deepcopy(VSCODE_DEFAULT_INITIALIZE)
+    initialization_options = initialize_params["initializationOptions"]
+    initialization_options["workers"] = {"count": 2}
+    initialization_options["jediSettings"] = {
+        "autoImportModules": ["slow_module"]
+    }
+    slow_uri = as_uri(tmp_path / "slow.py")
+    # Documents are served by worker crc32(uri) % count
+    fast_uri = next(
+        uri
+        for uri in (
+            as_uri(tmp_path / f"fast_{index}.py") for index in range(100)
+        )
+        if zlib.crc32(uri.encode()) % 2 != zlib.crc32(slow_uri.encode()) % 2
+    )
+    with session.LspSession() as ls_session:
+        ls_session.initialize(initialize_params)
+        for uri, text in [
+            (slow_uri, "import slow_module\nslow_module.\n"),
+            (fast_uri, "value = 1\nvalue\n"),
+        ]:
+            ls_session.notify_did_open_text_document(
+                {
+                    "textDocument": {
+                        "uri": uri,
+                        "languageId": "python",
+                        "version": 1,
+                        "text": text,
+                    }
+                }
+            )
+        slow = ls_session._send_request(
+            "textDocument/completion",
+            {
+                "textDocument": {"uri": slow_uri},
+                "position": {"line": 1, "character": 12},
+                "context": {"triggerKind": 1},
+            },
+        )
+        definitions = ls_session.text_document_definition(
+            {
+                "textDocument": {"uri": fast_uri},
+                "position": {"line": 1, "character": 0},
+            }
+        )
+        assert_that(slow.done(), is_(False))
+        completions = slow.result()
+
+    assert_that(
+        [location["range"]["start"] for location in definitions],
+        is_([{"line": 0, "character": 0}]),
+    )
+    assert_that(
+        "time" in [item["label"] for item in completions["items"]],
+        is_(True),
+    )
+
+
+def test_lsp_completion_queue(tmp_path, monkeypatch) -> None:
+    """Requests waiting for Jedi don't hold up other messages.
+
+    Without workers, requests using Jedi queue up behind a slow one, more of
+    them than pygls has threads. Jedi imports the modules of
+    jediSettings.autoImportModules, so the completion of slow_module takes
+    as long as its import.
+    """
+    (tmp_path / "slow_module.py").write_text("import time\n\ntime.sleep(5)\n")
+    monkeypatch.setenv(
+        "PYTHONPATH",
+        os.pathsep.join(
+            filter(None, [str(tmp_path), os.getenv("PYTHONPATH")])
+        ),
+    )
+    initialize_params = copy.deepcopy(VSCODE_DEFAULT_INITIALIZE)
+    initialize_params["initializationOptions"]["jediSettings"] = {
+        "autoImportModules": ["slow_module"]
+    }
+    uri = as_uri(tmp_path / "slow.py")
+    with session.LspSession() as ls_session:
+        ls_session.initialize(initialize_params)
+        ls_session.notify_did_open_text_document(
+            {
+                "textDocument": {
+                    "uri": uri,
+                    "languageId": "python",
+                    "version": 1,
+                    "text": "import slow_module\nslow_module.\n",
+                }
+            }
+        )
+        completions = [
+            ls_session._send_request(
+                "textDocument/completion",
+                {
+                    "textDocument": {"uri": uri},
+                    "position": {"line": 1, "character": 12},
+                    "context": {"triggerKind": 1},
+                },
+            )
+            for _ in range(50)
+        ]
+        stats = ls_session.jedi_stats()
+        assert_that(completions[0].done(), is_(False))
+        for completion in completions:
+            completion.result()
+
+    assert_that(stats, has_entries(requests=instance_of(dict)))
+
+
+def test_lsp_concurrent_requests(tmp_path) -> None:
+    """Requests sent together get the answers they get one at a time.
+
+    Without workers, Jedi runs in the server process, and its requests to
+    the interpreter of the environment must not overlap.
+    """
+    uri = as_uri(tmp_path / "concurrent.py")
+    requests = [
+        (
+            "textDocument/completion",
+            {
+                "textDocument": {"uri": uri},
+                "position": {"line": 1, "character": 4},
+                "context": {"triggerKind": 1},
+            },
+        ),
+        (
+            "textDocument/hover",
+            {
+                "textDocument": {"uri": uri},
+                "position": {"line": 2, "character": 6},
+            },
+        ),
+        (
+            "textDocument/definition",
+            {
+                "textDocument": {"uri": uri},
+                "position": {"line": 2, "character": 6},
+            },
+        ),
+    ]
+    with session.LspSession() as ls_session:
+        ls_session.initialize()
+        ls_session.notify_did_open_text_document(
+            {
+                "textDocument": {
+                    "uri": uri,
+                    "languageId": "python",
+                    "version": 1,
+                    "text": "import sys\nsys.\nsys.getrecursionlimit()\n",
+                }
+            }
+        )
+        expected = [
+            ls_session._send_request(method, params).result()
+            for method, params in requests
+        ]
+        futures = [
+            ls_session._send_request(method, params)
+            for _ in range(20)
+            for method, params in requests
+        ]
+        actual = [future.result() for future in futures]
+
+    assert_that(actual, is_(expected * 20))
@@ -2,6 +2,7 @@
 
 import copy
 import json
+import pathlib
 import platform
 import tempfile
 from threading import Condition, Event
@@ -1050,3 +1051,274 @@ def test_publish_diagnostics_on_close_notebook() -> None:
 
     expected = {uri: {"uri": uri, "diagnostics": []} for uri in cell_uris}
     assert_that(actual, is_(expected))
+
+
+def test_pull_diagnostics() -> None:
+    """Tests pull diagnostics with result ids."""
+    initialize_params = copy.deepcopy(VSCODE_DEFAULT_INITIALIZE)
+    initialize_params["capabilities"]["textDocument"]["diagnostic"] = {
+        "dynamicRegistration": False,
+        "relatedDocumentSupport": False,
+    }
+    capabilities = {}
+    with session.LspSession() as ls_session:
+        ls_session.initialize(
+            initialize_params,
+            process_server_capabilities=capabilities.update,
+        )
+        assert_that(
+            capabilities["capabilities"]["diagnosticProvider"],
+            is_(
+                {"interFileDependencies": False, "workspaceDiagnostics": False}
+            ),
+        )
+        uri = "file:///tmp/pull_diagnostics.py"
+        ls_session.notify_did_open_text_document(
+            {
+                "textDocument": {
+                    "uri": uri,
+                    "languageId": "python",
+                    "version": 1,
+                    "text": "x = 1 === 1\n",
+                }
+            }
+        )
+        first = ls_session.text_document_diagnostic(
+            {"textDocument": {"uri": uri}}
+        )
+        assert_that(first["kind"], is_("full"))
+        assert_that(
+            [item["range"] for item in first["items"]],
+            is_(
+                [
+                    {
+                        "start": {"line": 0, "character": 8},
+                        "end": {"line": 0, "character": 9},
+                    }
+                ]
+            ),
+        )
+
+        unchanged = ls_session.text_document_diagnostic(
+            {
+                "textDocument": {"uri": uri},
+                "previousResultId": first["resultId"],
+            }
+        )
+        assert_that(
+            unchanged,
+            is_({"kind": "unchanged", "resultId": first["resultId"]}),
+        )
+
+        ls_session.notify_did_change_text_document(
+            {
+                "textDocument": {"uri": uri, "version": 2},
+                "contentChanges": [{"text": "x = 1 == 1\n"}],
+            }
+        )
+        fixed = ls_session.text_document_diagnostic(
+            {
+                "textDocument": {"uri": uri},
+                "previousResultId": first["resultId"],
+            }
+        )
+        assert_that(fixed["kind"], is_("full"))
+        assert_that(fixed["items"], is_([]))
+        assert_that(fixed["resultId"] != first["resultId"], is_(True))
+
+
+def test_pull_diagnostics_after_restart() -> None:
+    """Tests that result ids of a previous server are never unchanged."""
+    initialize_params = copy.deepcopy(VSCODE_DEFAULT_INITIALIZE)
+    initialize_params["capabilities"]["textDocument"]["diagnostic"] = {
+        "dynamicRegistration": False,
+        "relatedDocumentSupport": False,
+    }
+    uri = "file:///tmp/pull_diagnostics.py"
+    previous_result_id = None
+    for text in ["x = 1 === 1\n", "x = 1 == 1\n"]:
+        with session.LspSession() as ls_session:
+            ls_session.initialize(initialize_params)
+            ls_session.notify_did_open_text_document(
+                {
+                    "textDocument": {
+                        "uri": uri,
+                        "languageId": "python",
+                        "version": 1,
+                        "text": text,
+                    }
+                }
+            )
+            actual = ls_session.text_document_diagnostic(
+                {
+                    "textDocument": {"uri": uri},
+                    "previousResultId": previous_result_id,
+                }
+            )
+        assert_that(actual["kind"], is_("full"))
+        previous_result_id = actual["resultId"]
+    assert_that(actual["items"], is_([]))
+
+
+def test_pull_diagnostics_parso_backend() -> None:
+    """Tests that the parso backend reports every syntax error."""
+    initialize_params = copy.deepcopy(VSCODE_DEFAULT_INITIALIZE)
+    initialize_params["initializationOptions"]["diagnostics"]["backend"] = (
+        "parso"
+    )
+    initialize_params["capabilities"]["textDocument"]["diagnostic"] = {
+        "dynamicRegistration": False,
+    }
+    with session.LspSession() as ls_session:
+        ls_session.initialize(initialize_params)
+        uri = "file:///tmp/parso_diagnostics.py"
+        ls_session.notify_did_open_text_document(
+            {
+                "textDocument": {
+                    "uri": uri,
+                    "languageId": "python",
+                    "version": 1,
+                    "text": "x = 1 === 1\ny = 2\nz = (3 +)\n",
+                }
+            }
+        )
+        report = ls_session.text_document_diagnostic(
+            {"textDocument": {"uri": uri}}
+        )
+        assert_that(
+            [
+                (item["range"]["start"]["line"], item["source"])
+                for item in report["items"]
+            ],
+            is_([(0, "jedi"), (2, "jedi")]),
+        )
+
+
+def test_workspace_diagnostics() -> None:
+    """Tests workspace pull diagnostics with result ids."""
+    with tempfile.TemporaryDirectory() as root:
+        root_path = pathlib.Path(root)
+        (root_path / "good.py").write_text("x = 1\n")
+        (root_path / "bad.py").write_text("x = 1 === 1\n")
+        (root_path / ".venv").mkdir()
+        (root_path / ".venv" / "ignored.py").write_text("x = 1 === 1\n")
+        good_uri = (root_path / "good.py").as_uri()
+        bad_uri = (root_path / "bad.py").as_uri()
+
+        initialize_params = copy.deepcopy(VSCODE_DEFAULT_INITIALIZE)
+        initialize_params["rootPath"] = root
+        initialize_params["rootUri"] = root_path.as_uri()
+        initialize_params["workspaceFolders"] = [
+            {"uri": root_path.as_uri(), "name": "jedi_lsp_test"}
+        ]
+        initialize_params["initializationOptions"]["diagnostics"][
+            "workspace"
+        ] = True
+        initialize_params["capabilities"]["textDocument"]["diagnostic"] = {
+            "dynamicRegistration": False,
+        }
+        with session.LspSession() as ls_session:
+            ls_session.initialize(initialize_params)
+            first = ls_session.workspace_diagnostic({"previousResultIds": []})
+            reports = {item["uri"]: item for item in first["items"]}
+            assert_that(sorted(reports), is_(sorted([good_uri, bad_uri])))
+            assert_that(reports[good_uri]["items"], is_([]))
+            assert_that(len(reports[bad_uri]["items"]), is_(1))
+
+            previous_result_ids = [
+                {"uri": item["uri"], "value": item["resultId"]}
+                for item in first["items"]
+            ]
+            second = ls_session.workspace_diagnostic(
+                {"previousResultIds": previous_result_ids}
+            )
+            assert_that(
+                sorted(item["kind"] for item in second["items"]),
+                is_(["unchanged", "unchanged"]),
+            )
+
+            (root_path / "bad.py").write_text("x = 1 == 1\n")
+            third = ls_session.workspace_diagnostic(
+                {"previousResultIds": previous_result_ids}
+            )
+            reports = {item["uri"]: item for item in third["items"]}
+            assert_that(reports[good_uri]["kind"], is_("unchanged"))
+            assert_that(reports[bad_uri]["kind"], is_("full"))
+            assert_that(reports[bad_uri]["items"], is_([]))
+
+
+def test_workspace_diagnostics_partial_results() -> None:
+    """Tests that reports are only streamed when partial results are used.
+
+    Files opened since the previous pull are not reported, deleted files
+    are cleared.
+    """
+    with tempfile.TemporaryDirectory() as root:
+        root_path = pathlib.Path(root)
+        (root_path / "opened.py").write_text("x = 1 === 1\n")
+        (root_path / "deleted.py").write_text("x = 1 === 1\n")
+        (root_path / "bad.py").write_text("x = 1 === 1\n")
+        opened_uri = (root_path / "opened.py").as_uri()
+        deleted_uri = (root_path / "deleted.py").as_uri()
+        bad_uri = (root_path / "bad.py").as_uri()
+
+        initialize_params = copy.deepcopy(VSCODE_DEFAULT_INITIALIZE)
+        initialize_params["rootPath"] = root
+        initialize_params["rootUri"] = root_path.as_uri()
+        initialize_params["workspaceFolders"] = [
+            {"uri": root_path.as_uri(), "name": "jedi_lsp_test"}
+        ]
+        initialize_params["initializationOptions"]["diagnostics"][
+            "workspace"
+        ] = True
+        initialize_params["capabilities"]["textDocument"]["diagnostic"] = {
+            "dynamicRegistration": False,
+        }
+        partial_results = []
+        with session.LspSession() as ls_session:
+            ls_session.set_notification_callback(
+                session.PROGRESS,
+                lambda params: partial_results.extend(
+                    params["value"]["items"]
+                ),
+            )
+            ls_session.initialize(initialize_params)
+            first = ls_session.workspace_diagnostic(
+                {"previousResultIds": [], "partialResultToken": "partial"}
+            )
+            assert_that(first["items"], is_([]))
+            assert_that(
+                sorted(item["uri"] for item in partial_results),
+                is_(sorted([opened_uri, deleted_uri, bad_uri])),
+            )
+
+            ls_session.notify_did_open_text_document(
+                {
+                    "textDocument": {
+                        "uri": opened_uri,
+                        "languageId": "python",
+                        "version": 1,
+                        "text": "x = 1\n",
+                    }
+                }
+            )
+            (root_path / "deleted.py").unlink()
+            second = ls_session.workspace_diagnostic(
+                {
+                    "previousResultIds": [
+                        {"uri": item["uri"], "value": item["resultId"]}
+                        for item in partial_results
+                    ]
+                }
+            )
+            assert_that(
+                sorted(
+                    (item["uri"], item["kind"], len(item.get("items", [])))
+                    for item in second["items"]
+                ),
+                is_(
+                    sorted(
+                        [(bad_uri, "unchanged", 0), (deleted_uri, "full", 0)]
+                    )
+                ),
+            )
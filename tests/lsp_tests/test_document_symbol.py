@@ -668,3 +668,40 @@ def test_document_symbol_no_hierarchy_notebook() -> None:
             },
         ]
         assert_that(actual, is_(expected))
+
+
+def test_document_symbol_changed_document() -> None:
+    """Test that document symbols follow changes to an open document."""
+    with session.LspSession() as ls_session:
+        ls_session.initialize()
+        uri = "file:///tmp/symbol_changed_document.py"
+        ls_session.notify_did_open_text_document(
+            {
+                "textDocument": {
+                    "uri": uri,
+                    "languageId": "python",
+                    "version": 1,
+                    "text": "def first():\n    pass\n",
+                }
+            }
+        )
+        for _ in range(2):
+            actual = ls_session.text_document_symbol(
+                {"textDocument": {"uri": uri}}
+            )
+            assert_that([symbol["name"] for symbol in actual], is_(["first"]))
+
+        ls_session.notify_did_change_text_document(
+            {
+                "textDocument": {"uri": uri, "version": 2},
+                "contentChanges": [
+                    {"text": "def first():\n    pass\n\nsecond = 1\n"}
+                ],
+            }
+        )
+        actual = ls_session.text_document_symbol(
+            {"textDocument": {"uri": uri}}
+        )
+        assert_that(
+            [symbol["name"] for symbol in actual], is_(["first", "second"])
+        )
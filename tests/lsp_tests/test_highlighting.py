@@ -1,10 +1,13 @@
 """Tests for highlighting requests."""
 
+import copy
+
 import pytest
 from hamcrest import assert_that, is_
 
 from tests import TEST_DATA
 from tests.lsp_test_client import session
+from tests.lsp_test_client.defaults import VSCODE_DEFAULT_INITIALIZE
 from tests.lsp_test_client.utils import as_uri
 
 HIGHLIGHTING_TEST_ROOT = TEST_DATA / "highlighting"
@@ -484,3 +487,131 @@ def test_highlighting_notebook(cell, position, expected) -> None:
         )
 
         assert_that(actual, is_(expected))
+
+
+def test_highlighting_open_document() -> None:
+    """Tests highlighting between occurrences in a changing document."""
+    with session.LspSession() as ls_session:
+        ls_session.initialize()
+        uri = "file:///tmp/highlighting_open_document.py"
+        ls_session.notify_did_open_text_document(
+            {
+                "textDocument": {
+                    "uri": uri,
+                    "languageId": "python",
+                    "version": 1,
+                    "text": "value = 1\nprint(value)\n",
+                }
+            }
+        )
+        expected = [
+            {
+                "range": {
+                    "start": {"line": 0, "character": 0},
+                    "end": {"line": 0, "character": 5},
+                }
+            },
+            {
+                "range": {
+                    "start": {"line": 1, "character": 6},
+                    "end": {"line": 1, "character": 11},
+                }
+            },
+        ]
+        for position in [
+            {"line": 0, "character": 2},
+            {"line": 1, "character": 8},
+            {"line": 0, "character": 5},
+        ]:
+            actual = ls_session.text_document_highlight(
+                {"textDocument": {"uri": uri}, "position": position}
+            )
+            assert_that(actual, is_(expected))
+
+        ls_session.notify_did_change_text_document(
+            {
+                "textDocument": {"uri": uri, "version": 2},
+                "contentChanges": [{"text": "value = 1\nvalue += 1\n"}],
+            }
+        )
+        actual = ls_session.text_document_highlight(
+            {
+                "textDocument": {"uri": uri},
+                "position": {"line": 0, "character": 2},
+            }
+        )
+        assert_that(
+            actual,
+            is_(
+                [
+                    expected[0],
+                    {
+                        "range": {
+                            "start": {"line": 1, "character": 0},
+                            "end": {"line": 1, "character": 5},
+                        }
+                    },
+                ]
+            ),
+        )
+
+
+@pytest.mark.parametrize(
+    ("position_encodings", "expected_encoding", "offset"),
+    [
+        (None, "utf-16", 1),
+        (["utf-8", "utf-16"], "utf-16", 1),
+        (["utf-8", "utf-32", "utf-16"], "utf-32", 0),
+    ],
+)
+def test_highlighting_position_encoding(
+    position_encodings, expected_encoding, offset
+) -> None:
+    """Tests that characters after an emoji are in the negotiated units."""
+    initialize_params = copy.deepcopy(VSCODE_DEFAULT_INITIALIZE)
+    if position_encodings is not None:
+        initialize_params["capabilities"]["general"] = {
+            "positionEncodings": position_encodings
+        }
+    capabilities = {}
+    with session.LspSession() as ls_session:
+        ls_session.initialize(
+            initialize_params,
+            process_server_capabilities=capabilities.update,
+        )
+        assert_that(
+            capabilities["capabilities"]["positionEncoding"],
+            is_(expected_encoding),
+        )
+        uri = "file:///tmp/highlighting_position_encoding.py"
+        ls_session.notify_did_open_text_document(
+            {
+                "textDocument": {
+                    "uri": uri,
+                    "languageId": "python",
+                    "version": 1,
+                    "text": 'e = "😀"; value = 1\nprint(value)\n',
+                }
+            }
+        )
+        actual = ls_session.text_document_highlight(
+            {
+                "textDocument": {"uri": uri},
+                "position": {"line": 0, "character": 11 + offset},
+            }
+        )
+        expected = [
+            {
+                "range": {
+                    "start": {"line": 0, "character": 9 + offset},
+                    "end": {"line": 0, "character": 14 + offset},
+                }
+            },
+            {
+                "range": {
+                    "start": {"line": 1, "character": 6},
+                    "end": {"line": 1, "character": 11},
+                }
+            },
+        ]
+        assert_that(actual, is_(expected))
@@ -78,3 +78,39 @@ def test_notebook_server_capabilities() -> None:
                     {"notebookSelector": [{"cells": [{"language": "python"}]}]}
                 ),
             )
+
+
+def test_preload_modules() -> None:
+    """Test that configured modules are preloaded, reporting progress."""
+    initialize_params = copy.deepcopy(defaults.VSCODE_DEFAULT_INITIALIZE)
+    initialize_params["initializationOptions"]["jediSettings"] = {
+        "preloadModules": ["json", "no_such_module"]
+    }
+    with session.LspSession() as ls_session:
+        preload_done = Event()
+        actual = []
+
+        def _progress_handler(params):
+            # Notifications are handled in a thread pool, in any order
+            actual.append(params["value"])
+            if len(actual) == 4:
+                preload_done.set()
+
+        ls_session.set_notification_callback(
+            session.PROGRESS, _progress_handler
+        )
+        ls_session.initialize(initialize_params)
+        preload_done.wait(30)
+
+        values = {value.get("message"): value["kind"] for value in actual}
+        assert_that(
+            values,
+            is_(
+                {
+                    None: "begin",
+                    "json": "report",
+                    "no_such_module": "report",
+                    "Preloaded 1 modules": "end",
+                }
+            ),
+        )
@@ -1,5 +1,6 @@
 """Tests for refactoring requests."""
 
+import copy
 import sys
 
 import pytest
@@ -7,6 +8,7 @@ from hamcrest import assert_that, is_
 
 from tests import TEST_DATA
 from tests.lsp_test_client import session
+from tests.lsp_test_client.defaults import VSCODE_DEFAULT_INITIALIZE
 from tests.lsp_test_client.utils import StringPattern, as_uri
 
 REFACTOR_TEST_ROOT = TEST_DATA / "refactoring"
@@ -528,6 +530,99 @@ def test_lsp_code_action() -> None:
         assert_that(actual, is_(expected))
 
 
+def test_lsp_code_action_resolve() -> None:
+    """Tests that code action edits are computed lazily when supported."""
+    with session.LspSession() as ls_session:
+        initialize_params = copy.deepcopy(VSCODE_DEFAULT_INITIALIZE)
+        initialize_params["capabilities"]["textDocument"]["codeAction"][
+            "resolveSupport"
+        ] = {"properties": ["edit"]}
+        ls_session.initialize(initialize_params)
+        uri = as_uri((REFACTOR_TEST_ROOT / "code_action_test1.py"))
+        actual = ls_session.text_document_code_action(
+            {
+                "textDocument": {"uri": uri},
+                "range": {
+                    "start": {"line": 4, "character": 10},
+                    "end": {"line": 4, "character": 10},
+                },
+                "context": {"diagnostics": []},
+            }
+        )
+
+        assert_that(
+            [(action["title"], "edit" in action) for action in actual],
+            is_(
+                [
+                    (
+                        "Extract expression into variable 'jls_extract_var'",
+                        False,
+                    ),
+                    (
+                        "Extract expression into function 'jls_extract_def'",
+                        False,
+                    ),
+                ]
+            ),
+        )
+
+        resolved = ls_session.code_action_resolve(actual[0])
+        document_changes = resolved["edit"]["documentChanges"]
+        assert_that(len(document_changes), is_(1))
+        assert_that(
+            document_changes[0]["textDocument"],
+            is_({"uri": uri, "version": 0}),
+        )
+        assert_that(len(document_changes[0]["edits"]) > 0, is_(True))
+
+
+def test_lsp_code_action_resolve_failures() -> None:
+    """Tests that actions that cannot be resolved are returned without edit."""
+    path = REFACTOR_TEST_ROOT / "code_action_test1.py"
+    with session.LspSession() as ls_session:
+        initialize_params = copy.deepcopy(VSCODE_DEFAULT_INITIALIZE)
+        initialize_params["capabilities"]["textDocument"]["codeAction"][
+            "resolveSupport"
+        ] = {"properties": ["edit"]}
+        ls_session.initialize(initialize_params)
+        uri = as_uri(path)
+        ls_session.notify_did_open_text_document(
+            {
+                "textDocument": {
+                    "uri": uri,
+                    "languageId": "python",
+                    "version": 1,
+                    "text": path.read_text("utf-8"),
+                }
+            }
+        )
+        actual = ls_session.text_document_code_action(
+            {
+                "textDocument": {"uri": uri},
+                "range": {
+                    "start": {"line": 4, "character": 10},
+                    "end": {"line": 4, "character": 10},
+                },
+                "context": {"diagnostics": []},
+            }
+        )
+        ls_session.notify_did_change_text_document(
+            {
+                "textDocument": {"uri": uri, "version": 2},
+                # The action would still apply, but to another version
+                "contentChanges": [{"text": path.read_text("utf-8")}],
+            }
+        )
+        resolved = ls_session.code_action_resolve(actual[0])
+        assert_that("edit" in resolved, is_(False))
+
+        for data in [None, {"uri": uri}, {"action": "unknown"}]:
+            resolved = ls_session.code_action_resolve(
+                {"title": "Inline variable", "data": data}
+            )
+            assert_that("edit" in resolved, is_(False))
+
+
 def test_lsp_code_action_notebook() -> None:
     """Tests code actions like extract variable and extract function in notebooks."""
     with session.LspSession() as ls_session:
@@ -0,0 +1,124 @@
+"""Tests for the $/jedi/stats request and the slow request log."""
+
+import copy
+import json
+import os
+import tempfile
+
+import pytest
+from hamcrest import assert_that, greater_than, has_entries, has_key, is_
+
+from jedi_language_server import memory
+from tests import TEST_DATA
+from tests.lsp_test_client import session
+from tests.lsp_test_client.defaults import VSCODE_DEFAULT_INITIALIZE
+from tests.lsp_test_client.utils import as_uri
+
+COMPLETION_TEST_ROOT = TEST_DATA / "completion"
+
+
+def test_jedi_stats() -> None:
+    """Test that requests are timed and cache lookups counted."""
+    path = COMPLETION_TEST_ROOT / "completion_test1.py"
+    with open(path, "r") as text_file:
+        contents = text_file.read()
+
+    with session.LspSession() as ls_session:
+        ls_session.initialize()
+        uri = as_uri(path)
+        for _ in range(2):
+            ls_session.text_document_completion(
+                {
+                    "textDocument": {"uri": uri},
+                    "position": {"line": 8, "character": 2},
+                    "context": {"triggerKind": 1},
+                }
+            )
+        ls_session.notify_did_open_text_document(
+            {
+                "textDocument": {
+                    "uri": uri,
+                    "languageId": "python",
+                    "version": 1,
+                    "text": contents,
+                }
+            }
+        )
+        for _ in range(2):
+            ls_session.text_document_symbol({"textDocument": {"uri": uri}})
+
+        stats = ls_session.jedi_stats()
+        completion = stats["requests"]["textDocument/completion"]
+        for kind in ("handler", "jedi", "conversion", "serialization"):
+            assert_that(completion, has_key(kind))
+        assert_that(completion["total"]["count"], is_(2))
+        assert_that(completion["total"]["p50"], greater_than(0))
+        assert_that(
+            stats["requests"]["textDocument/documentSymbol"]["jedi"]["count"],
+            is_(1),
+        )
+        assert_that(
+            stats["caches"]["documentSymbol"],
+            is_({"hits": 1, "misses": 1, "hitRate": 0.5}),
+        )
+
+
+@pytest.mark.skipif(
+    memory.rss() is None, reason="memory use is only measured on Linux"
+)
+def test_memory_soft_limit() -> None:
+    """Test that Jedi's caches are evicted past the soft memory limit."""
+    uri = as_uri(COMPLETION_TEST_ROOT / "completion_test1.py")
+    initialize_params = copy.deepcopy(VSCODE_DEFAULT_INITIALIZE)
+    initialize_params["initializationOptions"]["memory"] = {"softLimit": 1}
+    with session.LspSession() as ls_session:
+        ls_session.initialize(initialize_params)
+        ls_session.text_document_completion(
+            {
+                "textDocument": {"uri": uri},
+                "position": {"line": 8, "character": 2},
+                "context": {"triggerKind": 1},
+            }
+        )
+        stats = ls_session.jedi_stats()
+
+    assert_that(
+        stats["memory"],
+        has_entries({"rss": greater_than(0), "evictions": 1}),
+    )
+
+
+def test_slow_requests() -> None:
+    """Test that requests slower than the threshold are logged."""
+    uri = as_uri(COMPLETION_TEST_ROOT / "completion_test1.py")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "slow.log")
+        initialize_params = copy.deepcopy(VSCODE_DEFAULT_INITIALIZE)
+        initialize_params["initializationOptions"]["slowRequests"] = {
+            "logFile": path,
+            "threshold": 0,
+        }
+        with session.LspSession() as ls_session:
+            ls_session.initialize(initialize_params)
+            ls_session.text_document_completion(
+                {
+                    "textDocument": {"uri": uri},
+                    "position": {"line": 8, "character": 2},
+                    "context": {"triggerKind": 1},
+                }
+            )
+
+        with open(path) as log_file:
+            records = [json.loads(line) for line in log_file]
+    completions = [
+        record
+        for record in records
+        if record["method"] == "textDocument/completion"
+    ]
+    assert_that(len(completions), is_(1))
+    assert_that(
+        completions[0],
+        has_entries(
+            {"uri": uri, "position": {"line": 8, "character": 2}},
+        ),
+    )
@@ -1,9 +1,12 @@
 """Tests for workspace symbols requests."""
 
+import copy
+
 from hamcrest import assert_that, is_
 
 from tests import TEST_DATA
 from tests.lsp_test_client import session
+from tests.lsp_test_client.defaults import VSCODE_DEFAULT_INITIALIZE
 from tests.lsp_test_client.utils import as_uri
 
 SYMBOL_TEST_ROOT = TEST_DATA / "symbol"
@@ -36,3 +39,32 @@ def test_workspace_symbol() -> None:
             }
         ]
         assert_that(actual, is_(expected))
+
+
+def test_workspace_symbol_folders() -> None:
+    """Test that each workspace folder is searched with its own project.
+
+    Symbols of a nested folder are found once, relative to that folder,
+    until the folder is removed from the workspace.
+
+    Test Data: tests/test_data/symbol/somemodule2.py
+    """
+    symbol_folder = {"uri": as_uri(SYMBOL_TEST_ROOT), "name": "symbol"}
+    initialize_params = copy.deepcopy(VSCODE_DEFAULT_INITIALIZE)
+    initialize_params["workspaceFolders"].append(symbol_folder)
+    with session.LspSession() as ls_session:
+        ls_session.initialize(initialize_params)
+        actual = ls_session.workspace_symbol({"query": "do_workspace_thing"})
+        assert_that(
+            [symbol["containerName"] for symbol in actual],
+            is_(["somemodule2.do_workspace_thing"]),
+        )
+
+        ls_session.notify_did_change_workspace_folders(
+            {"event": {"added": [], "removed": [symbol_folder]}}
+        )
+        actual = ls_session.workspace_symbol({"query": "do_workspace_thing"})
+        assert_that(
+            [symbol["containerName"] for symbol in actual],
+            is_(["tests.test_data.symbol.somemodule2.do_workspace_thing"]),
+        )
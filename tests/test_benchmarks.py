@@ -0,0 +1,84 @@
+"""Tests for the benchmark harness."""
+
+import io
+import json
+import pathlib
+
+from hamcrest import assert_that, has_entries, has_key, is_
+
+from tests.benchmarks import record, replay
+
+
+def _summary(p50: float) -> dict:
+    return {"count": 1, "mean": p50, "p50": p50, "p95": p50, "p99": p50}
+
+
+def test_regressions() -> None:
+    """Test that only slower medians above the noise floor are reported."""
+    baseline = {
+        "trace": {
+            "textDocument/completion": _summary(10.0),
+            "textDocument/hover": _summary(1.0),
+            "textDocument/definition": _summary(10.0),
+        }
+    }
+    results = {
+        "trace": {
+            "textDocument/completion": _summary(13.0),
+            "textDocument/hover": _summary(1.9),
+            "textDocument/definition": _summary(11.0),
+            "workspace/symbol": _summary(100.0),
+        }
+    }
+    assert_that(
+        list(replay.regressions(results, baseline, tolerance=0.2)),
+        is_(["trace textDocument/completion: p50 10.0 ms -> 13.0 ms"]),
+    )
+
+
+def test_load_trace(tmp_path: pathlib.Path) -> None:
+    """Test that the workspace root is substituted in traces."""
+    trace = tmp_path / "trace.jsonl"
+    message = {
+        "method": "textDocument/didOpen",
+        "params": {"textDocument": {"uri": "${ROOT_URI}/a.py"}},
+    }
+    trace.write_text(json.dumps({"time": 0.5, "message": message}) + "\n\n")
+    root = pathlib.Path("/project")
+    assert_that(
+        replay.load_trace(trace, root),
+        is_(
+            [
+                {
+                    "time": 0.5,
+                    "message": {
+                        "method": "textDocument/didOpen",
+                        "params": {
+                            "textDocument": {"uri": "file:///project/a.py"}
+                        },
+                    },
+                }
+            ]
+        ),
+    )
+
+
+def test_read_message() -> None:
+    """Test that the recorder reads messages from a stream."""
+    body = b'{"jsonrpc": "2.0", "method": "exit"}'
+    stream = io.BytesIO(
+        b"Content-Length: %d\r\n"
+        b"Content-Type: application/vscode-jsonrpc; charset=utf-8\r\n"
+        b"\r\n" % len(body) + body
+    )
+    assert_that(record._read_message(stream), is_(body))
+    assert_that(record._read_message(stream), is_(None))
+
+
+def test_replay() -> None:
+    """Test that a checked in trace replays."""
+    trace = replay.TRACES_ROOT / "symbol_search.jsonl"
+    latencies = replay.replay(replay.load_trace(trace, replay.TEST_DATA))
+    summaries = replay.summarize(latencies)
+    assert_that(summaries, has_key("initialize"))
+    assert_that(summaries["workspace/symbol"], has_entries({"count": 9}))
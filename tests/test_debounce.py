@@ -37,3 +37,28 @@ def test_debounce() -> None:
 
     # For uri "0", only one timer should have been started despite 3 calls.
     assert counter["0"] == 1
+
+
+def test_debounce_interval_function() -> None:
+    """Test that the interval can be computed from the call arguments."""
+    calls = {}
+    cond = threading.Condition()
+
+    def f(uri: str) -> None:
+        with cond:
+            calls[uri] = time.monotonic()
+            cond.notify_all()
+
+    intervals = {"fast": 0.01, "slow": 0.5}
+    debounced = debounce(
+        interval_s=lambda uri: intervals[uri], keyed_by="uri"
+    )(f)
+    slow_called = time.monotonic()
+    debounced("slow")
+    debounced("fast")
+    fast_called = time.monotonic()
+    with cond:
+        assert cond.wait_for(lambda: len(calls) == 2, timeout=5)
+
+    assert calls["slow"] - slow_called >= 0.5
+    assert calls["fast"] - fast_called < 0.4
@@ -0,0 +1,68 @@
+"""Test the latency statistics."""
+
+import time
+
+from hamcrest import assert_that, close_to, greater_than_or_equal_to, is_
+
+from jedi_language_server.instrumentation import (
+    Histogram,
+    Stats,
+    jedi_call,
+    jedi_seconds,
+    reset_jedi_seconds,
+)
+
+
+def test_histogram_percentiles() -> None:
+    """Percentiles are taken from the recorded durations."""
+    histogram = Histogram()
+    for milliseconds in range(1, 101):
+        histogram.add(milliseconds / 1000)
+    summary = histogram.summary()
+    assert_that(summary["count"], is_(100))
+    assert_that(summary["p50"], close_to(51, 0.001))
+    assert_that(summary["p95"], close_to(96, 0.001))
+    assert_that(summary["p99"], close_to(100, 0.001))
+    assert_that(summary["max"], close_to(100, 0.001))
+    assert_that(summary["mean"], close_to(50.5, 0.001))
+
+
+def test_histogram_keeps_recent_samples() -> None:
+    """Percentiles follow the most recent durations."""
+    histogram = Histogram(max_samples=10)
+    for _ in range(10):
+        histogram.add(1.0)
+    for _ in range(10):
+        histogram.add(0.001)
+    summary = histogram.summary()
+    assert_that(summary["count"], is_(20))
+    assert_that(summary["p99"], close_to(1, 0.001))
+    assert_that(summary["max"], close_to(1000, 0.001))
+
+
+def test_jedi_call() -> None:
+    """Time spent in jedi_call blocks is added up per thread."""
+    reset_jedi_seconds()
+    with jedi_call():
+        time.sleep(0.01)
+    with jedi_call():
+        time.sleep(0.01)
+    assert_that(jedi_seconds(), greater_than_or_equal_to(0.02))
+    reset_jedi_seconds()
+    assert_that(jedi_seconds(), is_(0.0))
+
+
+def test_stats_summary() -> None:
+    """The summary groups durations by method and kind."""
+    stats = Stats()
+    stats.record("textDocument/hover", "total", 0.002)
+    stats.cache("documentSymbol").record(True)
+    stats.cache("documentSymbol").record(False)
+    summary = stats.summary()
+    assert_that(
+        summary["requests"]["textDocument/hover"]["total"]["count"], is_(1)
+    )
+    assert_that(
+        summary["caches"],
+        is_({"documentSymbol": {"hits": 1, "misses": 1, "hitRate": 0.5}}),
+    )
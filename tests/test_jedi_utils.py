@@ -0,0 +1,249 @@
+"""Test the jedi_utils conversion functions."""
+
+import sys
+from pathlib import Path
+from typing import Any
+
+import jedi.settings
+from hamcrest import (
+    assert_that,
+    greater_than,
+    instance_of,
+    is_,
+    is_not,
+    less_than,
+    same_instance,
+)
+from jedi import Project, Script
+from lsprotocol.types import (
+    DocumentSymbol,
+    Position,
+    PositionEncodingKind,
+    Range,
+)
+
+from jedi_language_server import jedi_utils, text_edit_utils
+from jedi_language_server.initialization_options import (
+    InitializationOptions,
+    JediSettings,
+)
+from jedi_language_server.jedi_utils import lsp_document_symbols
+
+
+def _document_symbols_calls(num_methods: int) -> int:
+    """Count the function calls of lsp_document_symbols on a class.
+
+    The class has num_methods methods.
+    """
+    source = "class Generated:\n" + "".join(
+        f"    def method_{index}(self):\n        pass\n"
+        for index in range(num_methods)
+    )
+    jedi_script = Script(code=source)
+    names = jedi_script.get_names(all_scopes=True, definitions=True)
+    lines = jedi_utils.script_lines(jedi_script)
+    calls = 0
+
+    def profile(frame: Any, event: str, arg: Any) -> None:
+        nonlocal calls
+        if event in ("call", "c_call"):
+            calls += 1
+
+    sys.setprofile(profile)
+    try:
+        symbols = lsp_document_symbols(
+            names, lines, PositionEncodingKind.Utf16
+        )
+    finally:
+        sys.setprofile(None)
+    assert_that(len(symbols), is_(1))
+    assert_that(len(symbols[0].children or []), is_(num_methods))
+    return calls
+
+
+def test_lsp_document_symbols_scales_linearly() -> None:
+    """Building the symbol tree of a large class must take linear time.
+
+    Five times the methods should take about five times the calls.
+    """
+    small = _document_symbols_calls(1000)
+    large = _document_symbols_calls(5000)
+    assert_that(large, less_than(small * 5.5))
+
+
+def test_lsp_document_symbols_appends_children_in_place(monkeypatch) -> None:
+    """Children are appended to the list of their parent, never copied.
+
+    Copying the list for every child would take quadratic time, which
+    counting calls cannot see.
+    """
+
+    class Symbol(DocumentSymbol):
+        def __setattr__(self, name: str, value: Any) -> None:
+            assert_that(name, is_not("children"))
+            super().__setattr__(name, value)
+
+    monkeypatch.setattr(jedi_utils, "DocumentSymbol", Symbol)
+    jedi_script = Script(
+        code=(
+            "class A:\n"
+            "    def __init__(self):\n"
+            "        self.x = 1\n"
+            "\n"
+            "    def f(self):\n"
+            "        def g():\n"
+            "            pass\n"
+            "\n"
+            "    y = 2\n"
+        )
+    )
+    symbols = lsp_document_symbols(
+        jedi_script.get_names(all_scopes=True, definitions=True),
+        jedi_utils.script_lines(jedi_script),
+        PositionEncodingKind.Utf16,
+    )
+    (class_symbol,) = symbols
+    assert_that(
+        [child.name for child in class_symbol.children or []],
+        is_(["__init__", "x", "f", "y"]),
+    )
+    method = (class_symbol.children or [])[2]
+    assert_that([child.name for child in method.children or []], is_(["g"]))
+
+
+def test_refactoring_candidates() -> None:
+    """Code actions are only offered where the refactoring can apply."""
+    jedi_script = Script(
+        code="def f(x):\n    y = x + 1\n    y += 1\n\n    print(y)  # y\n"
+    )
+    assert_that(jedi_utils.is_inline_candidate(jedi_script, 2, 4), is_(True))
+    assert_that(jedi_utils.is_inline_candidate(jedi_script, 5, 10), is_(True))
+    for line, column in [(1, 4), (2, 8), (5, 4), (2, 10)]:
+        assert_that(
+            jedi_utils.is_inline_candidate(jedi_script, line, column),
+            is_(False),
+        )
+
+    def extract(*positions: int, statements: bool = False) -> bool:
+        return jedi_utils.is_extract_candidate(
+            jedi_script, *positions, statements=statements
+        )
+
+    assert_that(extract(2, 8, 2, 8), is_(True))
+    assert_that(extract(2, 8, 2, 13), is_(True))
+    # Definitions, statement keywords, indentation, blank lines, comments
+    for positions in [
+        (2, 4, 2, 4),
+        (1, 1, 1, 1),
+        (2, 2, 2, 2),
+        (4, 0, 4, 0),
+        (5, 17, 5, 17),
+        (4, 0, 5, 0),
+    ]:
+        assert_that(extract(*positions, statements=True), is_(False))
+    # Only functions can be extracted from whole statements
+    assert_that(extract(2, 4, 3, 10), is_(False))
+    assert_that(extract(2, 4, 3, 10, statements=True), is_(True))
+
+
+def test_position_encoding_conversions() -> None:
+    """Characters are UTF-16 code units, or code points with UTF-32."""
+    utf16, utf32 = PositionEncodingKind.Utf16, PositionEncodingKind.Utf32
+    line = 'e = "é😀"; value = 1\n'
+    for column, character in [(0, 0), (6, 6), (7, 8), (10, 11), (21, 22)]:
+        assert_that(
+            jedi_utils.lsp_character(line, column, utf16), is_(character)
+        )
+        assert_that(
+            jedi_utils.jedi_column(line, character, utf16), is_(column)
+        )
+    assert_that(jedi_utils.jedi_column(line, 7, utf16), is_(7))
+    assert_that(jedi_utils.lsp_character("value = 1\n", 30, utf16), is_(30))
+    assert_that(jedi_utils.lsp_character(line, 10, utf32), is_(10))
+    assert_that(jedi_utils.jedi_column(line, 11, utf32), is_(11))
+
+
+def test_position_encoding_of_results() -> None:
+    """Symbols, diagnostics and text edits count UTF-16 code units."""
+    utf16 = PositionEncodingKind.Utf16
+    source = 'e = "😀"; value = 1\ns = "😀"; value +\n'
+    jedi_script = Script(code=source)
+    lines = jedi_utils.script_lines(jedi_script)
+    names = jedi_script.get_names(all_scopes=True, definitions=True)
+    symbols = jedi_utils.lsp_document_symbols(names, lines, utf16)
+    value = symbols[1]
+    assert_that(value.name, is_("value"))
+    assert_that(value.range, is_(Range(Position(0, 10), Position(0, 19))))
+    assert_that(
+        value.selection_range, is_(Range(Position(0, 10), Position(0, 15)))
+    )
+    assert_that(
+        jedi_utils.lsp_range(names[1], utf16, lines),
+        is_(jedi_utils.lsp_range(names[1], utf16)),
+    )
+
+    error_ranges = [
+        diagnostic.range
+        for diagnostic in jedi_utils.lsp_diagnostics(jedi_script, utf16)
+    ]
+    assert_that(error_ranges, is_([Range(Position(1, 17), Position(2, 0))]))
+    diagnostic = jedi_utils.lsp_python_diagnostic("file.py", source, utf16)
+    assert diagnostic is not None
+    assert_that(diagnostic.range.end, is_(Position(1, 17)))
+    diagnostic = jedi_utils.lsp_python_diagnostic(
+        "file.py", source, PositionEncodingKind.Utf32
+    )
+    assert diagnostic is not None
+    assert_that(diagnostic.range.end, is_(Position(1, 16)))
+
+    changed_file = next(
+        iter(
+            Script(code='x = 1\ne = "😀"; x\n', path="edited.py")
+            .rename(1, 0, new_name="y")
+            .get_changed_files()
+            .values()
+        )
+    )
+    edits = text_edit_utils.lsp_text_edits(
+        'x = 1\ne = "😀"; x\n', changed_file, utf16
+    )
+    assert_that(
+        [edit.range for edit in edits],
+        is_(
+            [
+                Range(Position(0, 0), Position(0, 1)),
+                Range(Position(1, 10), Position(1, 11)),
+            ]
+        ),
+    )
+
+
+def test_cache_directory(tmp_path: Path) -> None:
+    """Parse trees of imported modules are pickled in the cache directory."""
+    source_dir = tmp_path / "src"
+    source_dir.mkdir()
+    (source_dir / "cached_module.py").write_text("value = 1\n")
+    cache_dir = tmp_path / "cache"
+    default_cache_dir = jedi.settings.cache_directory
+    try:
+        jedi_utils.set_jedi_settings(
+            InitializationOptions(
+                jedi_settings=JediSettings(cache_directory=str(cache_dir))
+            )
+        )
+        jedi_script = Script(
+            "import cached_module\ncached_module.value",
+            project=Project(source_dir),
+        )
+        assert_that(len(jedi_script.infer(2, 15)), is_(1))
+    finally:
+        jedi.settings.cache_directory = default_cache_dir
+    assert_that(len(list(cache_dir.rglob("*.pkl"))), greater_than(0))
+
+
+def test_warm_environment(tmp_path: Path) -> None:
+    """The environment of a project is found once, before requests."""
+    project = Project(tmp_path, environment_path=sys.executable)
+    environment = jedi_utils.warm_environment(project)
+    assert_that(environment, same_instance(project.get_environment()))
+    assert_that(environment.executable, instance_of(str))
@@ -0,0 +1,120 @@
+"""Test the Jedi worker processes."""
+
+import os
+import signal
+import time
+from concurrent.futures import BrokenExecutor
+from typing import List
+
+import pytest
+from hamcrest import assert_that, is_
+from jedi import Script
+from pygls.workspace import TextDocument
+
+from jedi_language_server.initialization_options import InitializationOptions
+from jedi_language_server.jedi_workers import JediWorkers
+from jedi_language_server.projects import Projects
+
+
+def _names(jedi_script: Script) -> List[str]:
+    return [name.name for name in jedi_script.get_names()]
+
+
+def _exit(jedi_script: Script) -> None:
+    os._exit(1)
+
+
+@pytest.fixture
+def workers():
+    """Two Jedi workers, stopped after the test."""
+    options = InitializationOptions()
+    jedi_workers = JediWorkers(
+        2,
+        options,
+        Projects([], options.workspace),
+    )
+    yield jedi_workers
+    jedi_workers.shutdown()
+
+
+def test_documents_are_sent_once_per_version(workers: JediWorkers) -> None:
+    """Test that workers keep the last version of documents."""
+    document = TextDocument("file:///a.py", "x = 1\n", 1)
+    assert_that(workers.run(document, _names), is_(["x"]))
+    # Not sent again: the worker still has the source of version 1
+    document._source = "y = 2\n"
+    assert_that(workers.run(document, _names), is_(["x"]))
+    document.version = 2
+    assert_that(workers.run(document, _names), is_(["y"]))
+
+    workers.forget(document.uri)
+    disk_document = TextDocument("file:///a.py", "z = 3\n")
+    assert_that(workers.run(disk_document, _names), is_(["z"]))
+    assert_that(workers.run(document, _names), is_(["y"]))
+
+
+def test_crashed_worker_is_replaced(workers: JediWorkers) -> None:
+    """Test that a worker that crashed is replaced on the next request."""
+    document = TextDocument("file:///a.py", "x = 1\n", 1)
+    assert_that(workers.run(document, _names), is_(["x"]))
+    with pytest.raises(BrokenExecutor):
+        workers.run(document, _exit)
+    assert_that(workers.run(document, _names), is_(["x"]))
+
+
+def _kill_idle_worker(workers: JediWorkers, uri: str) -> None:
+    """Kill the worker of a document and wait for its executor to notice."""
+    os.kill(workers.call(uri, os.getpid), signal.SIGKILL)
+    executor = workers._executors[workers._index(uri)]
+    deadline = time.monotonic() + 10
+    while not executor._broken and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert_that(bool(executor._broken), is_(True))
+
+
+def test_idle_crashed_worker_is_replaced(workers: JediWorkers) -> None:
+    """Test that a worker that crashed while idle is replaced."""
+    document = TextDocument("file:///a.py", "x = 1\n", 1)
+    assert_that(workers.run(document, _names), is_(["x"]))
+    _kill_idle_worker(workers, document.uri)
+    # The new worker is sent the source again
+    assert_that(workers.run(document, _names), is_(["x"]))
+    _kill_idle_worker(workers, document.uri)
+    workers.set_folders([])
+    workers.forget(document.uri)
+    assert_that(workers.call(document.uri, len, "abc"), is_(3))
+
+
+def test_project_with_environment(tmp_path) -> None:
+    """Test that workers start with a project the server already used."""
+    options = InitializationOptions()
+    projects = Projects([str(tmp_path)], options.workspace)
+    projects.default.get_environment()
+    jedi_workers = JediWorkers(1, options, projects)
+    try:
+        document = TextDocument("file:///a.py", "x = 1\n", 1)
+        assert_that(jedi_workers.run(document, _names), is_(["x"]))
+    finally:
+        jedi_workers.shutdown()
+
+
+def test_worker_past_hard_limit_is_recycled() -> None:
+    """Test that a worker past the hard limit is replaced and warmed up."""
+    document = TextDocument("file:///a.py", "import os\nx = 1\n", 1)
+    initialization_options = InitializationOptions()
+    initialization_options.memory.hard_limit = 0
+    workers = JediWorkers(
+        1,
+        initialization_options,
+        Projects([], initialization_options.workspace),
+        lambda: [document],
+    )
+    try:
+        assert_that(workers.run(document, _names), is_(["os", "x"]))
+        assert_that(workers.recycled, is_(1))
+        # The new worker was sent the document while warming up
+        document._source = "y = 2\n"
+        assert_that(workers.run(document, _names), is_(["os", "x"]))
+        assert_that(workers.recycled, is_(2))
+    finally:
+        workers.shutdown()
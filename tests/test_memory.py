@@ -0,0 +1,53 @@
+"""Test the memory limits."""
+
+import pytest
+from hamcrest import assert_that, greater_than, is_
+from jedi import Script
+
+from jedi_language_server import memory
+
+pytestmark = pytest.mark.skipif(
+    memory.rss() is None, reason="memory use is only measured on Linux"
+)
+
+
+def _parse(path: str) -> None:
+    names = Script("import json\njson.dumps", path=path).infer(2, 6)
+    assert_that(len(names), greater_than(0))
+
+
+def test_evict_jedi_caches(tmp_path) -> None:
+    """Test that only the parse trees of the modules to keep remain."""
+    path = str(tmp_path / "a.py")
+    _parse(path)
+    assert_that(memory.jedi_module_count(), greater_than(1))
+    assert_that(memory.evict_jedi_caches([path]), greater_than(0))
+    assert_that(memory.jedi_module_count(), is_(1))
+
+
+def test_memory_limit(tmp_path) -> None:
+    """Test that caches are evicted past the limit, at most once in a while."""
+    memory_limit = memory.MemoryLimit(soft_limit=0, interval_s=60)
+    _parse(str(tmp_path / "a.py"))
+    assert_that(memory_limit.check(list), is_(True))
+    assert_that(memory.jedi_module_count(), is_(0))
+    _parse(str(tmp_path / "a.py"))
+    assert_that(memory_limit.check(list), is_(False))
+    assert_that(memory.jedi_module_count(), greater_than(0))
+    assert_that(memory_limit.evictions, is_(1))
+
+    memory_limit = memory.MemoryLimit(soft_limit=2**60)
+    assert_that(memory_limit.check(list), is_(False))
+    assert_that(memory.summary(memory_limit)["rss"], greater_than(0))
+
+
+def test_memory_limit_backs_off(tmp_path, monkeypatch) -> None:
+    """Test that caches are not evicted again if that freed no memory."""
+    sizes = [300, 300, 300, 400, 200]
+    monkeypatch.setattr(memory, "rss", lambda: sizes.pop(0))
+    memory_limit = memory.MemoryLimit(soft_limit=100, interval_s=0)
+    _parse(str(tmp_path / "a.py"))
+    assert_that(memory_limit.check(list), is_(True))
+    assert_that(memory_limit.check(list), is_(False))
+    assert_that(memory_limit.check(list), is_(True))
+    assert_that(memory_limit.evictions, is_(2))
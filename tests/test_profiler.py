@@ -0,0 +1,67 @@
+"""Test the sampling profiler."""
+
+import os
+import tempfile
+import threading
+import time
+
+import pytest
+from hamcrest import assert_that, is_
+
+from jedi_language_server.profiler import SamplingProfiler
+
+
+def _spin_in_worker(event: threading.Event) -> None:
+    while not event.is_set():
+        pass
+
+
+def _wait_in_worker(event: threading.Event) -> None:
+    event.wait()
+
+
+@pytest.mark.skipif(
+    not hasattr(time, "pthread_getcpuclockid"),
+    reason="idle threads are only detected with per-thread CPU clocks",
+)
+def test_sampling_profiler() -> None:
+    """Busy threads are written in collapsed stack format, one file per write.
+
+    Threads waiting for an event are idle and not sampled.
+    """
+    event = threading.Event()
+    workers = [
+        threading.Thread(target=_spin_in_worker, args=(event,), name="busy"),
+        threading.Thread(target=_wait_in_worker, args=(event,), name="idle"),
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            profiler = SamplingProfiler(directory)
+            # The first sample only reads the CPU time of the threads
+            for _ in range(4):
+                time.sleep(0.02)
+                profiler.sample()
+            profiler.write()
+            profiler.write()
+
+            (file_name,) = os.listdir(directory)
+            with open(os.path.join(directory, file_name)) as profile_file:
+                lines = profile_file.read().splitlines()
+    finally:
+        event.set()
+        for worker in workers:
+            worker.join()
+
+    stacks = {
+        stack: int(count)
+        for stack, count in (line.rsplit(" ", 1) for line in lines)
+    }
+    # The busy thread is sampled on different lines of its loop
+    busy_stacks = [stack for stack in stacks if stack.startswith("busy;")]
+    assert all("_spin_in_worker" in stack for stack in busy_stacks)
+    assert_that(sum(stacks[stack] for stack in busy_stacks), is_(3))
+    assert_that(
+        [stack for stack in stacks if stack.startswith("idle;")], is_([])
+    )
@@ -0,0 +1,63 @@
+"""Test the Jedi projects of workspace folders."""
+
+import os
+import pickle
+import sys
+
+from hamcrest import assert_that, is_, none, same_instance
+
+from jedi_language_server.initialization_options import Workspace
+from jedi_language_server.projects import Projects
+
+
+def test_documents_use_the_innermost_folder(tmp_path) -> None:
+    """Test that documents use the project of their innermost folder."""
+    outer = str(tmp_path)
+    inner = os.path.join(outer, "services", "api")
+    projects = Projects([outer, inner], Workspace())
+    inner_project = projects.get(os.path.join(inner, "app", "main.py"))
+    assert_that(str(inner_project.path), is_(inner))
+    assert_that(
+        projects.folder_of(os.path.join(outer, "services", "main.py")),
+        is_(outer),
+    )
+    # Documents outside of every folder use the first folder
+    assert_that(projects.folder_of("/elsewhere/main.py"), is_(none()))
+    assert_that(
+        projects.get("/elsewhere/main.py"), same_instance(projects.default)
+    )
+    assert_that(Projects([], Workspace()).get("/a.py"), is_(none()))
+
+
+def test_set_folders_keeps_projects(tmp_path) -> None:
+    """Test that changing folders keeps the projects of unchanged ones."""
+    first = str(tmp_path / "first")
+    second = str(tmp_path / "second")
+    projects = Projects([first], Workspace())
+    project = projects.default
+    projects.set_folders([second, first])
+    assert_that(projects.folders, is_([second, first]))
+    assert_that(
+        projects.get(os.path.join(first, "a.py")), same_instance(project)
+    )
+
+    copied = pickle.loads(pickle.dumps(projects))
+    assert_that(copied.folders, is_([second, first]))
+
+
+def test_projects_share_environment(tmp_path) -> None:
+    """Test that all folders use a single environment."""
+    projects = Projects(
+        [str(tmp_path / "first"), str(tmp_path / "second")],
+        Workspace(environment_path=sys.executable),
+    )
+    environments = [
+        project.get_environment() for _, project in projects.items()
+    ]
+    assert_that(environments[0], same_instance(environments[1]))
+
+    copied = pickle.loads(pickle.dumps(projects))
+    assert_that(
+        copied.default.get_environment().executable,
+        is_(environments[0].executable),
+    )
@@ -0,0 +1,113 @@
+"""Test the pygls utilities."""
+
+import random
+
+from hamcrest import assert_that, is_, same_instance
+from lsprotocol.types import (
+    Position,
+    PositionEncodingKind,
+    Range,
+    TextDocumentContentChangePartial,
+)
+from pygls.workspace import PositionCodec, TextDocument
+from pygls.workspace.text_document import ServerTextPosition
+
+from jedi_language_server.pygls_utils import (
+    IndexedTextDocument,
+    LineArrayTextDocument,
+    current_word_range,
+)
+
+SOURCES = ["", "x", "import os\n\nos.path\n", "a\r\nb\rc\n\n", "é😀\nz"]
+
+
+def test_indexed_text_document_matches_pygls() -> None:
+    """Test that lines and offsets are the same as pygls computes."""
+    for source in SOURCES:
+        expected = TextDocument("file:///a.py", source)
+        document = IndexedTextDocument("file:///a.py", source)
+        assert_that(document.lines, is_(expected.lines))
+        for line in range(len(expected.lines) + 2):
+            for character in range(3):
+                position = ServerTextPosition(line, character)
+                assert_that(
+                    document.offset_at_server_position(position),
+                    is_(expected.offset_at_server_position(position)),
+                )
+        if source:
+            for offset in range(len(source) + 2):
+                assert_that(
+                    document.server_position_at_offset(offset),
+                    is_(expected.server_position_at_offset(offset)),
+                )
+
+
+def test_indexed_text_document_change() -> None:
+    """Test that lines are computed once per change."""
+    document = IndexedTextDocument("file:///a.py", "import os\nos\n", 1)
+    lines = document.lines
+    assert_that(document.lines, same_instance(lines))
+
+    document.apply_change(
+        TextDocumentContentChangePartial(
+            range=Range(
+                start=Position(line=1, character=2),
+                end=Position(line=1, character=2),
+            ),
+            text=".path",
+        )
+    )
+    assert_that(document.lines, is_(("import os\n", "os.path\n")))
+    assert_that(
+        document.offset_at_position(Position(line=1, character=3)), is_(13)
+    )
+
+
+def test_line_array_text_document_matches_pygls() -> None:
+    """Test that random changes give the same lines and source as pygls."""
+    random_ = random.Random(0)
+    alphabet = ["a", " ", "\n", "\r", "\r\n", "é", "😀"]
+
+    def text(max_length: int) -> str:
+        length = random_.randint(0, max_length)
+        return "".join(random_.choice(alphabet) for _ in range(length))
+
+    for _ in range(500):
+        source = text(12)
+        expected = TextDocument("file:///a.py", source, 1)
+        document = LineArrayTextDocument("file:///a.py", source, 1)
+        for _ in range(5):
+            positions = sorted(
+                Position(
+                    line=random_.randint(0, len(expected.lines) + 1),
+                    character=random_.randint(0, 4),
+                )
+                for _ in range(2)
+            )
+            change = TextDocumentContentChangePartial(
+                range=Range(start=positions[0], end=positions[1]),
+                text=text(4),
+            )
+            expected.apply_change(change)
+            document.apply_change(change)
+            assert_that(tuple(document.lines), is_(expected.lines))
+            assert_that(document.source, is_(expected.source))
+
+
+def test_current_word_range_position_encoding() -> None:
+    """Test that the word range is in the position encoding of the document."""
+    source = "x = '😀😀'; value\n"
+    document = TextDocument("file:///a.py", source)
+    assert_that(
+        current_word_range(document, Position(line=0, character=15)),
+        is_(Range(start=Position(0, 12), end=Position(0, 17))),
+    )
+    document = TextDocument(
+        "file:///a.py",
+        source,
+        position_codec=PositionCodec(PositionEncodingKind.Utf32),
+    )
+    assert_that(
+        current_word_range(document, Position(line=0, character=13)),
+        is_(Range(start=Position(0, 10), end=Position(0, 15))),
+    )
@@ -0,0 +1,58 @@
+"""Test the slow request log."""
+
+import json
+import os
+import tempfile
+import time
+
+from hamcrest import assert_that, greater_than, has_entries, is_, less_than
+
+from jedi_language_server.slow_requests import SlowRequestLog
+
+
+def _sleep_in_handler(seconds: float) -> None:
+    time.sleep(seconds)
+
+
+def test_slow_request_log() -> None:
+    """Only handlers slower than the threshold are logged, with stacks."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "slow.log")
+        slow_request_log = SlowRequestLog(path, threshold_s=0.05)
+        try:
+            with slow_request_log.watch("fast", {}):
+                pass
+            with slow_request_log.watch("slow", {"uri": "file:///slow.py"}):
+                _sleep_in_handler(0.3)
+        finally:
+            slow_request_log.close()
+
+        with open(path) as log_file:
+            records = [json.loads(line) for line in log_file]
+        assert_that(len(records), is_(1))
+        record = records[0]
+        assert_that(
+            record, has_entries({"method": "slow", "uri": "file:///slow.py"})
+        )
+        assert_that(record["durationMs"], greater_than(300))
+        assert_that(len(record["stacks"]), greater_than(0))
+        assert all("_sleep_in_handler" in stack for stack in record["stacks"])
+
+
+def test_sampler_waits_without_requests() -> None:
+    """The sampler only wakes up while handlers run, and stops on close."""
+    with tempfile.TemporaryDirectory() as directory:
+        slow_request_log = SlowRequestLog(
+            os.path.join(directory, "slow.log"), threshold_s=0.05
+        )
+        try:
+            with slow_request_log._condition:
+                assert_that(slow_request_log._next_sample_s(), is_(None))
+            with slow_request_log.watch("slow", {}):
+                with slow_request_log._condition:
+                    assert_that(
+                        slow_request_log._next_sample_s(), less_than(0.06)
+                    )
+        finally:
+            slow_request_log.close()
+        assert_that(slow_request_log._sampler.is_alive(), is_(False))
@@ -0,0 +1,65 @@
+"""Test the diagnostics of the Python files of a workspace."""
+
+import os
+from concurrent.futures import BrokenExecutor
+
+import pytest
+from hamcrest import assert_that, is_
+
+from jedi_language_server.workspace_diagnostics import (
+    WorkspaceDiagnostics,
+    python_files,
+)
+
+
+def test_python_files_skip_folders(tmp_path) -> None:
+    """Test that ignored and skipped folders are not entered."""
+    for path in [
+        "main.py",
+        "notes.txt",
+        os.path.join("package", "module.py"),
+        os.path.join("nested", "module.py"),
+        os.path.join(".venv", "module.py"),
+    ]:
+        (tmp_path / path).parent.mkdir(exist_ok=True)
+        (tmp_path / path).write_text("")
+    root = str(tmp_path)
+    files = python_files(root, [".venv"], [root, os.path.join(root, "nested")])
+    assert_that(
+        sorted(os.path.relpath(path, root) for path in files),
+        is_(["main.py", os.path.join("package", "module.py")]),
+    )
+
+
+def test_check_drops_files_not_found(tmp_path) -> None:
+    """Test that deleted files and removed roots leave the cache."""
+    for name in ["a", "b"]:
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "module.py").write_text("x = (\n")
+    roots = [str(tmp_path / "a"), str(tmp_path / "b")]
+    diagnostics = WorkspaceDiagnostics(max_workers=1)
+    try:
+        assert_that(len(list(diagnostics.check(roots, []))), is_(2))
+        (tmp_path / "a" / "module.py").unlink()
+        assert_that(len(list(diagnostics.check(roots, []))), is_(1))
+        assert_that(
+            sorted(diagnostics._cache),
+            is_([str(tmp_path / "b" / "module.py")]),
+        )
+        assert_that(list(diagnostics.check(roots[:1], [])), is_([]))
+        assert_that(diagnostics._cache, is_({}))
+    finally:
+        diagnostics.shutdown()
+
+
+def test_check_replaces_broken_pool(tmp_path) -> None:
+    """Test that a pool whose worker crashed is replaced on the next check."""
+    (tmp_path / "module.py").write_text("x = (\n")
+    diagnostics = WorkspaceDiagnostics(max_workers=1)
+    try:
+        with pytest.raises(BrokenExecutor):
+            diagnostics._get_executor().submit(os._exit, 1).result()
+        (result,) = diagnostics.check([str(tmp_path)], [])
+        assert_that(len(result.diagnostics), is_(1))
+    finally:
+        diagnostics.shutdown()